@@ -0,0 +1,90 @@
+"""
+Benchmark de checkouts concorrentes: vazão (pedidos/s) com 8 threads.
+
+- separado: salvar_produto + salvar_cupom + salvar_pedido, cada um com a
+  própria conexão e transação (como os chamadores faziam), sem checagem
+  atômica de estoque;
+- transacional: registrar_checkout, tudo em um BEGIN IMMEDIATE.
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_checkout
+"""
+from __future__ import annotations
+
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from loja.persistence import db
+from loja.src.carrinho import Carrinho
+from loja.src.cliente import Cliente
+from loja.src.cupom import Cupom
+from loja.src.pedido import Pedido
+from loja.src.produto import Produto
+
+N_THREADS = 8
+PEDIDOS_POR_THREAD = 200
+
+
+def _preparar(diretorio: Path, nome: str):
+    db.DB_PATH = diretorio / f"{nome}.db"
+    db.init_db()
+    cliente = Cliente("Pedro", "pedro@example.com", "12345678901")
+    db.salvar_cliente(cliente)
+    produtos = [Produto(f"P{i}", "CASA", 20.0 + i, 10 ** 6) for i in range(20)]
+    for produto in produtos:
+        db.salvar_produto(produto)
+    cupom = Cupom("DEZ", "VALOR", 5.0, None, uso_maximo=10 ** 6, usos_realizados=0)
+    db.salvar_cupom(cupom)
+    return cliente, produtos, cupom
+
+
+def _pedido(cliente, produtos, cupom, n):
+    carrinho = Carrinho(cliente=cliente)
+    for produto in (produtos[n % 20], produtos[(n * 7 + 3) % 20]):
+        carrinho.adicionar_item(produto, quantidade=1)
+    return Pedido.criar_de_carrinho(carrinho, cupom=cupom)
+
+
+def _separado(pedido, produtos_por_sku, cupom):
+    for item in pedido.itens:
+        produto = produtos_por_sku[int(item.sku)]
+        db.salvar_produto(produto)
+    db.salvar_cupom(cupom)
+    db.salvar_pedido(pedido)
+
+
+def _medir(nome, diretorio, executar):
+    cliente, produtos, cupom = _preparar(diretorio, nome)
+    produtos_por_sku = {p.sku: p for p in produtos}
+    pedidos = [
+        [_pedido(cliente, produtos, cupom, t * PEDIDOS_POR_THREAD + i) for i in range(PEDIDOS_POR_THREAD)]
+        for t in range(N_THREADS)
+    ]
+
+    def trabalhar(lista):
+        for pedido in lista:
+            executar(pedido, produtos_por_sku, cupom)
+
+    threads = [threading.Thread(target=trabalhar, args=(lista,)) for lista in pedidos]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    decorrido = time.perf_counter() - inicio
+    total = N_THREADS * PEDIDOS_POR_THREAD
+    print(f"{nome:<13} {total / decorrido:8.0f} pedidos/s ({total} pedidos, {N_THREADS} threads)")
+    db.fechar_pool()
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        diretorio = Path(tmp)
+        _medir("separado", diretorio, _separado)
+        _medir("transacional", diretorio, lambda pedido, _p, _c: db.registrar_checkout(pedido))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark da elegibilidade de cupons por categoria: conjuntos vs. máscaras.
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_elegibilidade
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from loja.src.cliente import Cliente
+from loja.src.cupom import Cupom, compilar_cupons
+from loja.src.item_pedido import ItemPedido
+from loja.src.pedido import Pedido
+from loja.src.produto import Produto
+
+N_CUPONS = 10_000
+CATEGORIAS = [f"CATEGORIA_{i}" for i in range(200)]
+
+
+def _elegivel_com_conjuntos(cupom: Cupom, pedido: Pedido) -> bool:
+    """Regra antiga: monta o conjunto de categorias do pedido a cada chamada."""
+    if not cupom.esta_valido():
+        return False
+    if not cupom.categorias_elegiveis:
+        return True
+    categorias_itens = set()
+    for item in pedido.itens:
+        categoria = getattr(item.produto, "categoria", None)
+        if isinstance(categoria, str):
+            categorias_itens.add(categoria.strip().upper())
+    return any(cat in cupom.categorias_elegiveis for cat in categorias_itens)
+
+
+def main() -> None:
+    gerador = random.Random(3)
+    cupons = [
+        Cupom(f"C{i}", "VALOR", 5.0, None, uso_maximo=10,
+              categ_elegiveis=gerador.sample(CATEGORIAS, gerador.randint(0, 5)))
+        for i in range(N_CUPONS)
+    ]
+    itens = []
+    for categoria in gerador.sample(CATEGORIAS, 8):
+        produto = Produto("Item", categoria, 10.0, 1)
+        itens.append(ItemPedido(str(produto.sku), "Item", 1, 10.0, produto=produto))
+    pedido = Pedido(cliente=Cliente("Pedro", "pedro@example.com", "12345678901"), itens=itens)
+
+    inicio = time.perf_counter()
+    antigo = [c for c in cupons if _elegivel_com_conjuntos(c, pedido)]
+    t_antigo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    novo = [c for c in cupons if c.esta_valido_para_pedido(pedido)]
+    t_metodo = time.perf_counter() - inicio
+
+    compilados = compilar_cupons(cupons)
+    inicio = time.perf_counter()
+    lote = compilados.elegiveis(pedido.mascara_categorias)
+    t_compilado = time.perf_counter() - inicio
+
+    print(f"{N_CUPONS:,} cupons, {len(antigo)} elegíveis")
+    print(f"conjuntos:              {t_antigo * 1000:8.2f} ms")
+    print(f"esta_valido_para_pedido:{t_metodo * 1000:8.2f} ms")
+    print(f"CuponsCompilados:       {t_compilado * 1000:8.2f} ms")
+    print(f"mesmo resultado: {antigo == novo == lote}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark de baixas de estoque concorrentes: 8 threads pagando pedidos
+de 3 SKUs sorteados entre 200.
+
+- lock global: GerenciadorEstoque(n_listras=1), tudo serializado;
+- listras: GerenciadorEstoque() (64 listras), só SKUs em comum disputam.
+
+A leitura do estoque espera 0,2 ms (produto "lento"), simulando o
+trabalho feito com o lock preso; a espera solta o GIL, como I/O faria.
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_estoque
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+
+from loja.src.estoque import GerenciadorEstoque
+
+N_THREADS = 8
+PEDIDOS_POR_THREAD = 150
+N_SKUS = 200
+ITENS_POR_PEDIDO = 3
+
+
+class _ProdutoLento:
+    __slots__ = ("sku", "nome", "_estoque")
+
+    def __init__(self, sku: int, estoque: int):
+        self.sku = sku
+        self.nome = f"P{sku}"
+        self._estoque = estoque
+
+    @property
+    def estoque(self) -> int:
+        time.sleep(0.0002)
+        return self._estoque
+
+    @estoque.setter
+    def estoque(self, valor: int) -> None:
+        self._estoque = valor
+
+
+def _medir(nome: str, gerenciador: GerenciadorEstoque) -> None:
+    produtos = [_ProdutoLento(sku, 10 ** 6) for sku in range(N_SKUS)]
+    rnd = random.Random(7)
+    pedidos = [
+        [
+            [(p, 1) for p in rnd.sample(produtos, ITENS_POR_PEDIDO)]
+            for _ in range(PEDIDOS_POR_THREAD)
+        ]
+        for _ in range(N_THREADS)
+    ]
+
+    def trabalhar(lista):
+        for itens in lista:
+            gerenciador.baixar(itens)
+
+    threads = [threading.Thread(target=trabalhar, args=(lista,)) for lista in pedidos]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    decorrido = time.perf_counter() - inicio
+
+    total = N_THREADS * PEDIDOS_POR_THREAD
+    baixado = sum(10 ** 6 - p._estoque for p in produtos)
+    assert baixado == total * ITENS_POR_PEDIDO
+    print(
+        f"{nome:<12} {total / decorrido:8.0f} pedidos/s "
+        f"(esperas por listra: {gerenciador.metricas().esperas})"
+    )
+
+
+def main() -> None:
+    _medir("lock global", GerenciadorEstoque(n_listras=1))
+    _medir("listras", GerenciadorEstoque())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark de "estoque no instante T" sobre o livro de movimentos.
+
+- varredura: soma todos os movimentos do SKU com ts <= T (sem checkpoints);
+- checkpoint: db.estoque_em, último checkpoint até T + movimentos depois.
+
+Também mede a gravação em lote (registrar_movimentos_estoque).
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_estoque_historico
+"""
+from __future__ import annotations
+
+import datetime
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from loja.persistence import db
+from loja.src.produto import Produto
+
+N_SKUS = 50
+N_MOVIMENTOS = 200_000
+N_CONSULTAS = 2_000
+
+
+def _varredura(sku: int, momento: datetime.datetime) -> int:
+    with db.connection() as conn:
+        return conn.execute(
+            "SELECT COALESCE(SUM(delta), 0) FROM estoque_movimentos WHERE sku = ? AND ts <= ?",
+            (sku, momento.isoformat(timespec="microseconds")),
+        ).fetchone()[0]
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "historico.db"
+        db.init_db()
+        produtos = [Produto(f"P{i}", "CASA", 10.0, 10 ** 6) for i in range(N_SKUS)]
+        db.salvar_produtos_em_lote(produtos)
+        skus = [p.sku for p in produtos]
+        # o livro não aceita ts anterior aos saldos iniciais que acabaram de entrar
+        inicio_ts = datetime.datetime.now() + datetime.timedelta(seconds=1)
+
+        rnd = random.Random(42)
+        movimentos = (
+            db.MovimentoEstoque(
+                rnd.choice(skus),
+                rnd.choice((-3, -2, -1, 1, 2)),
+                db.MOTIVO_AJUSTE,
+                ts=inicio_ts + datetime.timedelta(seconds=i),
+            )
+            for i in range(N_MOVIMENTOS)
+        )
+        inicio = time.perf_counter()
+        db.registrar_movimentos_estoque(movimentos)
+        decorrido = time.perf_counter() - inicio
+        print(f"gravação     {N_MOVIMENTOS / decorrido:10.0f} movimentos/s")
+
+        consultas = [
+            (rnd.choice(skus), inicio_ts + datetime.timedelta(seconds=rnd.randrange(N_MOVIMENTOS)))
+            for _ in range(N_CONSULTAS)
+        ]
+        for nome, consultar in (("varredura", _varredura), ("checkpoint", db.estoque_em)):
+            inicio = time.perf_counter()
+            resultados = [consultar(sku, momento) for sku, momento in consultas]
+            decorrido = time.perf_counter() - inicio
+            print(f"{nome:<12} {N_CONSULTAS / decorrido:10.0f} consultas/s")
+            if nome == "varredura":
+                esperado = resultados
+            else:
+                assert resultados == esperado
+        db.fechar_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark da cotação de frete por UF: settings em cache lido com cadeia de
+dict.get e conversões a cada cotação (como era) x tabela compilada.
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_frete
+"""
+from __future__ import annotations
+
+import json
+import random
+import time
+
+from loja import settings as configuracao
+from loja.src import frete
+from loja.src.frete import Frete
+
+N_COTACOES = 200_000
+UFS = ["AC", "BA", "CE", "MG", "RJ", "SP", "RS", "XX"]
+
+
+def _cotar_legado(settings, uf_destino):
+    cfg_frete = settings.get("frete", {})
+    tabela_por_uf = cfg_frete.get("tabela_por_uf", {})
+    default_cfg = cfg_frete.get("default", {})
+    dados_uf = tabela_por_uf.get(uf_destino, default_cfg)
+    valor = float(dados_uf.get("valor", default_cfg.get("valor", 0.0)))
+    prazo = int(dados_uf.get("prazo", default_cfg.get("prazo", 0)))
+    return valor, prazo
+
+
+def _medir(nome, funcao, ufs, repeticoes=5):
+    decorrido = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for uf in ufs:
+            funcao(uf)
+        decorrido = min(decorrido, time.perf_counter() - inicio)
+    print(f"{nome:<32} {decorrido * 1e9 / len(ufs):8.0f} ns/cotação")
+
+
+def main() -> None:
+    gerador = random.Random(17)
+    ufs = [gerador.choice(UFS) for _ in range(N_COTACOES)]
+    settings = frete.carregar_settings()
+
+    def legado_com_leitura(uf):
+        with open(configuracao.SETTINGS_PATH, "r", encoding="utf-8") as f:
+            return _cotar_legado(json.load(f), uf)
+
+    _medir("legado (lê o arquivo)", legado_com_leitura, ufs[: N_COTACOES // 100])
+    _medir("legado (dict.get em cadeia)", lambda uf: _cotar_legado(settings, uf), ufs)
+    _medir("tabela_frete().cotar", lambda uf: frete.tabela_frete().cotar(uf), ufs)
+    _medir("Frete.from_uf_destino", Frete.from_uf_destino, ufs)
+    print(frete.metricas_settings())
+
+
+if __name__ == "__main__":
+    main()
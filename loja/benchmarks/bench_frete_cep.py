@@ -0,0 +1,63 @@
+"""
+Benchmark da busca de frete por faixa de CEP: 50k faixas, bisect na
+TabelaFaixasCep x varredura linear da lista de faixas.
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_frete_cep
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from loja.src.frete import compilar_faixas_cep
+
+N_FAIXAS = 50_000
+N_BUSCAS = 20_000
+
+
+def _gerar_linhas(gerador):
+    linhas, inicio = [], 1_000_000
+    largura = (99_999_999 - inicio) // N_FAIXAS
+    for _ in range(N_FAIXAS):
+        fim = inicio + gerador.randint(largura // 2, largura - 1)
+        linhas.append({
+            "cep_inicio": f"{inicio:08d}", "cep_fim": f"{fim:08d}", "uf": "SP",
+            "valor": f"{gerador.uniform(8, 40):.2f}", "prazo": str(gerador.randint(2, 15)),
+        })
+        inicio += largura
+    return linhas
+
+
+def main() -> None:
+    gerador = random.Random(18)
+    linhas = _gerar_linhas(gerador)
+    ceps = [gerador.randint(1_000_000, 99_999_999) for _ in range(N_BUSCAS)]
+
+    inicio = time.perf_counter()
+    tabela = compilar_faixas_cep(linhas)
+    print(f"compilação de {N_FAIXAS} faixas: {(time.perf_counter() - inicio) * 1e3:.1f} ms")
+
+    faixas = [(int(l["cep_inicio"]), int(l["cep_fim"])) for l in linhas]
+
+    def linear(cep):
+        for i, (ini, fim) in enumerate(faixas):
+            if ini <= cep <= fim:
+                return i
+        return None
+
+    inicio = time.perf_counter()
+    esperado = [linear(c) for c in ceps[:200]]
+    t_linear = (time.perf_counter() - inicio) / 200
+
+    inicio = time.perf_counter()
+    obtido = [tabela.buscar(c) for c in ceps]
+    t_bisect = (time.perf_counter() - inicio) / len(ceps)
+
+    assert obtido[:200] == esperado
+    print(f"varredura linear: {t_linear * 1e6:10.1f} us/busca")
+    print(f"bisect:           {t_bisect * 1e6:10.2f} us/busca")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark da escolha de origem: 8 centros de distribuição x 27 UFs.
+Matriz precompilada (uma busca por cotação) x varredura da tabela de
+linhas (origem, destino, valor, prazo).
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_frete_origens
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from loja.src.frete import compilar_tabela_frete
+
+UFS = [
+    "AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", "MA", "MT", "MS", "MG", "PA",
+    "PB", "PR", "PE", "PI", "RJ", "RN", "RS", "RO", "RR", "SC", "SP", "SE", "TO",
+]
+ORIGENS = ["CE", "SP", "MG", "PR", "BA", "PE", "GO", "RS"]
+N_COTACOES = 100_000
+
+
+def main() -> None:
+    gerador = random.Random(20)
+
+    def tabela_por_uf():
+        return {
+            uf: {"valor": round(gerador.uniform(10, 40), 2), "prazo": gerador.randint(2, 14)}
+            for uf in UFS
+        }
+
+    settings = {
+        "frete": {
+            "uf_origem": ORIGENS[0],
+            "tabela_por_uf": tabela_por_uf(),
+            "default": {"valor": 30.0, "prazo": 10},
+            "origens_adicionais": {uf: {"tabela_por_uf": tabela_por_uf()} for uf in ORIGENS[1:]},
+        }
+    }
+    tabela = compilar_tabela_frete(settings)
+
+    linhas = [
+        (origem.uf_origem, uf, valor, prazo)
+        for origem in tabela.origens
+        for uf, (valor, prazo) in origem.por_uf.items()
+    ]
+    destinos = [gerador.choice(UFS) for _ in range(N_COTACOES)]
+
+    def por_varredura(uf_destino):
+        melhor = None
+        for origem, uf, valor, prazo in linhas:
+            if uf == uf_destino and (melhor is None or (valor, prazo) < melhor[1:]):
+                melhor = (origem, valor, prazo)
+        return melhor
+
+    def por_matriz(uf_destino):
+        melhor = None
+        for origem, (valor, prazo) in zip(tabela.origens, tabela.cotar_origens(uf_destino)):
+            if melhor is None or (valor, prazo) < melhor[1:]:
+                melhor = (origem.uf_origem, valor, prazo)
+        return melhor
+
+    assert [por_varredura(uf) for uf in UFS] == [por_matriz(uf) for uf in UFS]
+
+    for nome, funcao in (("varredura das linhas", por_varredura), ("matriz precompilada", por_matriz)):
+        inicio = time.perf_counter()
+        for uf in destinos:
+            funcao(uf)
+        decorrido = time.perf_counter() - inicio
+        print(f"{nome:<22} {decorrido * 1e6 / N_COTACOES:7.2f} us/cotação ({len(linhas)} linhas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark do MotorFrete: cotação de frete por peso no checkout, com e sem
+os caches de peso por SKU e de cotação por (UF, faixa).
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_frete_peso
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from loja.src.frete import Frete, tabela_frete
+from loja.src.frete_peso import MotorFrete
+from loja.src.item_pedido import ItemPedido
+from loja.src.produto_digital import ProdutoDigital
+from loja.src.produto_fisico import ProdutoFisico
+
+N_PRODUTOS = 2_000
+N_PEDIDOS = 20_000
+UFS = ["CE", "SP", "RJ", "MG", "BA", "RS", "AM"]
+
+
+def _sem_cache(itens, uf):
+    """Cálculo direto, refeito a cada cotação (referência)."""
+    tabela = tabela_frete()
+    real = cubico = 0.0
+    for item in itens:
+        produto = item.produto
+        if isinstance(produto, ProdutoFisico):
+            real += produto.peso * item.quantidade
+            cubico += produto.calcular_cubagem() / tabela.fator_cubagem * item.quantidade
+    peso = max(real, cubico)
+    valor, prazo = tabela.cotar(uf)
+    if peso <= 0:
+        valor, prazo = 0.0, 0
+    else:
+        faixas = tabela.faixas_peso_de(uf)
+        valor = faixas.valor_da_faixa(faixas.faixa(peso))
+    return Frete(tabela.uf_origem, uf, valor, prazo)
+
+
+def main() -> None:
+    gerador = random.Random(19)
+    produtos = [
+        ProdutoFisico(
+            f"P{i}", "CASA", 50.0, 100, True, round(gerador.uniform(0.1, 8), 2),
+            gerador.uniform(5, 60), gerador.uniform(5, 60), gerador.uniform(5, 60),
+        )
+        if i % 5 else ProdutoDigital(f"D{i}", "LIVROS", 30.0, 100, True, "https://x/y")
+        for i in range(N_PRODUTOS)
+    ]
+    pedidos = [
+        (
+            [
+                ItemPedido(str(p.sku), p.nome, gerador.randint(1, 3), 10.0, produto=p)
+                for p in gerador.sample(produtos, gerador.randint(1, 6))
+            ],
+            gerador.choice(UFS),
+        )
+        for _ in range(N_PEDIDOS)
+    ]
+
+    motor = MotorFrete()
+    for itens, uf in pedidos[:200]:
+        assert motor.cotar(itens, uf) == _sem_cache(itens, uf)
+
+    inicio = time.perf_counter()
+    for itens, uf in pedidos:
+        _sem_cache(itens, uf)
+    t_direto = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for itens, uf in pedidos:
+        motor.cotar(itens, uf)
+    t_motor = time.perf_counter() - inicio
+
+    print(f"cálculo direto: {t_direto * 1e6 / N_PEDIDOS:7.2f} us/pedido")
+    print(f"MotorFrete:     {t_motor * 1e6 / N_PEDIDOS:7.2f} us/pedido  ({motor})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark do gerador de IDs: colisões e vazão.
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_gerador_id
+"""
+from __future__ import annotations
+
+import multiprocessing
+import threading
+import time
+import uuid
+
+from loja.src.gerador_id import GeradorId, gerar_id
+
+N_IDS = 200_000
+N_THREADS = 8
+N_PROCESSOS = 4
+
+
+def _colisoes(ids) -> int:
+    return len(ids) - len(set(ids))
+
+
+def bench_legado() -> None:
+    """Esquema antigo: uuid4().int % 10000."""
+    n = 1_000
+    ids = [uuid.uuid4().int % 10000 for _ in range(n)]
+    print(f"[legado]    {n} ids -> {_colisoes(ids)} colisões")
+
+
+def bench_uma_thread() -> None:
+    gerador = GeradorId(no=1)
+    inicio = time.perf_counter()
+    ids = [gerador.proximo() for _ in range(N_IDS)]
+    segundos = time.perf_counter() - inicio
+    print(
+        f"[1 thread]  {N_IDS} ids em {segundos:.3f}s "
+        f"({N_IDS / segundos:,.0f} ids/s) -> {_colisoes(ids)} colisões, "
+        f"ordenados={ids == sorted(ids)}"
+    )
+
+
+def bench_threads() -> None:
+    gerador = GeradorId(no=2)
+    por_thread = N_IDS // N_THREADS
+    resultados = [[] for _ in range(N_THREADS)]
+
+    def gerar(lista):
+        for _ in range(por_thread):
+            lista.append(gerador.proximo())
+
+    threads = [threading.Thread(target=gerar, args=(r,)) for r in resultados]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    segundos = time.perf_counter() - inicio
+
+    ids = [i for r in resultados for i in r]
+    print(
+        f"[{N_THREADS} threads] {len(ids)} ids em {segundos:.3f}s "
+        f"({len(ids) / segundos:,.0f} ids/s) -> {_colisoes(ids)} colisões"
+    )
+
+
+def _gerar_no_processo(n: int):
+    return [gerar_id() for _ in range(n)]
+
+
+def bench_processos() -> None:
+    por_processo = N_IDS // N_PROCESSOS
+    inicio = time.perf_counter()
+    with multiprocessing.get_context("fork").Pool(N_PROCESSOS) as pool:
+        resultados = pool.map(_gerar_no_processo, [por_processo] * N_PROCESSOS)
+    segundos = time.perf_counter() - inicio
+
+    ids = [i for r in resultados for i in r]
+    print(
+        f"[{N_PROCESSOS} processos] {len(ids)} ids em {segundos:.3f}s "
+        f"-> {_colisoes(ids)} colisões"
+    )
+
+
+if __name__ == "__main__":
+    bench_legado()
+    bench_uma_thread()
+    bench_threads()
+    bench_processos()
@@ -0,0 +1,135 @@
+"""
+Benchmark de hidratação: construtor + sobrescrita (antigo) vs. from_row.
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_hidratacao
+"""
+from __future__ import annotations
+
+import json
+import time
+from datetime import datetime
+from typing import Callable, List
+
+from loja.src.cliente import Cliente
+from loja.src.cupom import Cupom
+from loja.src.item_pedido import ItemPedido
+from loja.src.pedido import Pedido
+from loja.src.produto import Produto
+
+N_LINHAS = 50_000
+
+LINHA_PRODUTO = {
+    "sku": 1, "nome": "Caneta", "categoria": "PAPELARIA",
+    "preco": 3.5, "estoque": 10, "ativo": 1,
+}
+LINHA_CLIENTE = {"id": 1, "nome": "Pedro", "email": "pedro@example.com", "cpf": "12345678901"}
+LINHA_CUPOM = {
+    "codigo": "DEZ", "tipo": "VALOR", "valor": 10.0, "data_validade": None,
+    "uso_maximo": 10 ** 9, "usos_realizados": 0, "categorias_elegiveis": None,
+}
+LINHA_PEDIDO = {
+    "id": 1, "status": "PAGO", "subtotal": 100.0, "descontos": 10.0,
+    "valor_frete": 0.0, "total": 90.0, "criado_em": "2025-03-01T10:00:00",
+    "pago_em": "2025-03-01T11:00:00", "enviado_em": None, "entregue_em": None,
+    "cancelado_em": None, "codigo_rastreio": None,
+    "endereco_entrega_json": '{"uf": "CE"}',
+}
+
+
+def _dt(s):
+    return datetime.fromisoformat(s) if s else None
+
+
+# ---------- caminho antigo (construtor + sobrescrita) ----------
+
+def _produto_legado(row) -> Produto:
+    produto = Produto(row["nome"], row["categoria"], row["preco"], row["estoque"], bool(row["ativo"]))
+    produto._Produto__sku = row["sku"]
+    return produto
+
+
+def _cliente_legado(row) -> Cliente:
+    cliente = Cliente(row["nome"], row["email"], row["cpf"])
+    cliente._Cliente__id = row["id"]
+    return cliente
+
+
+def _cupom_legado(row) -> Cupom:
+    return Cupom(
+        row["codigo"], row["tipo"], row["valor"], row["data_validade"],
+        row["uso_maximo"], row["usos_realizados"],
+        json.loads(row["categorias_elegiveis"]) if row["categorias_elegiveis"] else None,
+    )
+
+
+def _pedido_legado(row, cliente, itens, cupom) -> Pedido:
+    pedido = Pedido(
+        cliente=cliente,
+        itens=itens,
+        cupom=cupom,  # reaplica o cupom e registra um uso a mais
+        endereco_entrega=json.loads(row["endereco_entrega_json"]),
+        status=row["status"],
+        criado_em=_dt(row["criado_em"]),
+    )
+    pedido._Pedido__id = row["id"]
+    pedido.subtotal = row["subtotal"]
+    pedido.descontos = row["descontos"]
+    pedido.valor_frete = row["valor_frete"]
+    pedido.total = row["total"]
+    pedido.pago_em = _dt(row["pago_em"])
+    pedido.enviado_em = _dt(row["enviado_em"])
+    pedido.entregue_em = _dt(row["entregue_em"])
+    pedido.cancelado_em = _dt(row["cancelado_em"])
+    pedido.codigo_rastreio = row["codigo_rastreio"]
+    return pedido
+
+
+def _medir(fabrica: Callable[[], object], n: int = N_LINHAS) -> float:
+    inicio = time.perf_counter()
+    objetos: List[object] = [fabrica() for _ in range(n)]
+    segundos = time.perf_counter() - inicio
+    del objetos
+    return segundos
+
+
+def main() -> None:
+    cliente = Cliente.from_row(LINHA_CLIENTE)
+    itens = [ItemPedido("1", "Caneta", 10, 10.0)]
+    cupom_legado = Cupom.from_row(LINHA_CUPOM)
+    cupom = Cupom.from_row(LINHA_CUPOM)
+
+    casos = {
+        "Produto": (
+            lambda: _produto_legado(LINHA_PRODUTO),
+            lambda: Produto.from_row(LINHA_PRODUTO),
+        ),
+        "Cliente": (
+            lambda: _cliente_legado(LINHA_CLIENTE),
+            lambda: Cliente.from_row(LINHA_CLIENTE),
+        ),
+        "Cupom": (
+            lambda: _cupom_legado(LINHA_CUPOM),
+            lambda: Cupom.from_row(LINHA_CUPOM),
+        ),
+        "Pedido": (
+            lambda: _pedido_legado(LINHA_PEDIDO, cliente, itens, cupom_legado),
+            lambda: Pedido.from_row(LINHA_PEDIDO, cliente, itens, cupom),
+        ),
+    }
+
+    print(f"{N_LINHAS:,} linhas por classe")
+    print(f"{'classe':<10}{'antigo':>10}{'from_row':>10}{'ganho':>8}")
+    for nome, (legado, from_row) in casos.items():
+        antes = _medir(legado)
+        depois = _medir(from_row)
+        print(f"{nome:<10}{antes:>9.3f}s{depois:>9.3f}s{antes / depois:>7.1f}x")
+
+    print(
+        f"usos do cupom: antigo={cupom_legado.usos_realizados}, "
+        f"from_row={cupom.usos_realizados}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark do checkout idempotente: custo de uma requisição repetida.
+
+- checkout: fechar_pedido com chave nova (estoque, cupom, pedido gravados);
+- repetida (LRU): mesma chave, resposta do cache em memória;
+- repetida (banco): mesma chave com o LRU vazio (outro processo), lida da
+  tabela chaves_idempotencia.
+
+As repetidas recarregam o pedido original pelo id (buscar_pedido_por_id).
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_idempotencia
+"""
+from __future__ import annotations
+
+import tempfile
+import time
+from pathlib import Path
+
+from loja import services
+from loja.persistence import db
+from loja.src.carrinho import Carrinho
+from loja.src.cliente import Cliente
+from loja.src.endereco import Endereco
+from loja.src.idempotencia import CacheIdempotencia
+from loja.src.produto import Produto
+
+N_PEDIDOS = 500
+
+
+def _medir(nome: str, chamar) -> None:
+    inicio = time.perf_counter()
+    for i in range(N_PEDIDOS):
+        chamar(i)
+    decorrido = time.perf_counter() - inicio
+    print(f"{nome:<18} {decorrido / N_PEDIDOS * 1e6:8.0f} µs/requisição")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "idempotencia.db"
+        db.init_db()
+        endereco = Endereco("60115000", "Fortaleza", "CE", "Rua A", "10", None)
+        cliente = Cliente("Pedro", "pedro@example.com", "12345678901", [endereco])
+        db.salvar_cliente(cliente)
+        caneca = Produto("Caneca", "CASA", 50.0, 10 ** 6)
+        db.salvar_produto(caneca)
+
+        def fechar(i):
+            carrinho = Carrinho(cliente=cliente)
+            carrinho.adicionar_item(caneca, quantidade=1)
+            return services.fechar_pedido(
+                carrinho, cliente, persistir=True, chave_idempotencia=f"req-{i}"
+            )
+
+        _medir("checkout", fechar)
+        _medir("repetida (LRU)", fechar)
+        services.IDEMPOTENCIA = CacheIdempotencia()
+        _medir("repetida (banco)", fechar)
+
+        assert len(db.listar_pedidos()) == N_PEDIDOS
+        assert db.buscar_produto_por_sku(caneca.sku).estoque == 10 ** 6 - N_PEDIDOS
+        db.fechar_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark de memória: bytes por objeto com __slots__ vs. __dict__.
+
+O layout "antes" é simulado copiando os mesmos atributos (_Classe__attr)
+para o __dict__ de um objeto comum, como as classes guardavam antes.
+Os dois lados contam o objeto e os valores criados por ele (id, floats...).
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_memoria
+"""
+from __future__ import annotations
+
+import gc
+import sys
+import tracemalloc
+from typing import Callable, List
+
+from loja.persistence.db import _atributos_para_json
+from loja.src.cliente import Cliente
+from loja.src.endereco import Endereco
+from loja.src.item_carrinho import ItemCarrinho
+from loja.src.item_pedido import ItemPedido
+from loja.src.pedido import Pedido
+from loja.src.produto import Produto
+from loja.src.produto_fisico import ProdutoFisico
+
+N_OBJETOS = 20_000
+
+
+def _com_dict(fabrica: Callable[[], object]) -> Callable[[], object]:
+    """Fábrica do mesmo objeto, mas com os atributos num __dict__."""
+    # classe nova por caso: o dict de chaves compartilhadas de uma classe
+    # só é aproveitado quando todas as instâncias têm os mesmos atributos
+    legado_cls = type("Legado", (), {})
+
+    def criar() -> object:
+        legado = legado_cls()
+        for nome, valor in _atributos_para_json(fabrica()).items():
+            setattr(legado, sys.intern(nome), valor)
+        return legado
+
+    return criar
+
+
+def _bytes_por_objeto(fabrica: Callable[[], object], n: int = N_OBJETOS) -> float:
+    """Memória retida por objeto, medida com tracemalloc."""
+    objetos: List[object] = [None] * n
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    for i in range(n):
+        objetos[i] = fabrica()
+    gc.collect()
+    depois = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (depois - antes) / n
+
+
+def main() -> None:
+    produto = Produto("Caneta", "PAPELARIA", 3.5, 10)
+    cliente = Cliente("Pedro", "pedro@example.com", "12345678901")
+    itens = [ItemPedido("1", "Caneta", 2, 3.5)]
+
+    casos = {
+        "Produto": lambda: Produto("Caneta", "PAPELARIA", 3.5, 10),
+        "ProdutoFisico": lambda: ProdutoFisico(
+            "Livro", "LIVROS", 50.0, 5, True, 0.5, 20.0, 14.0, 3.0
+        ),
+        "ItemCarrinho": lambda: ItemCarrinho(produto, 2, 3.5),
+        "ItemPedido": lambda: ItemPedido("1", "Caneta", 2, 3.5),
+        "Endereco": lambda: Endereco("63000000", "Juazeiro", "CE", "Rua A", "1", None),
+        "Pedido": lambda: Pedido(cliente=cliente, itens=itens),
+    }
+
+    print(f"{'classe':<15}{'__dict__':>10}{'__slots__':>11}{'economia':>10}")
+    for nome, fabrica in casos.items():
+        com_dict = _bytes_por_objeto(_com_dict(fabrica))
+        com_slots = _bytes_por_objeto(fabrica)
+        economia = 1 - com_slots / com_dict
+        print(f"{nome:<15}{com_dict:>9.0f}B{com_slots:>10.0f}B{economia:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark do OtimizadorCupons: 10k cupons ativos, tempo por carrinho.
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_otimizador_cupons
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from loja.src.carrinho import Carrinho
+from loja.src.cupom import Cupom
+from loja.src.otimizador_cupons import OtimizadorCupons
+from loja.src.produto import Produto
+
+N_CUPONS = 10_000
+N_CARRINHOS = 2_000
+CATEGORIAS = [f"CATEGORIA_{i}" for i in range(100)]
+TIPOS = [Cupom.TIPO_VALOR, Cupom.TIPO_PERCENTUAL, Cupom.TIPO_FRETE_GRATIS]
+
+
+def main() -> None:
+    gerador = random.Random(5)
+    cupons = [
+        Cupom(
+            f"C{i}", gerador.choice(TIPOS), round(gerador.uniform(1, 50), 2), None,
+            uso_maximo=10,
+            categ_elegiveis=gerador.sample(CATEGORIAS, gerador.choice([0, 1, 1, 2, 3])),
+        )
+        for i in range(N_CUPONS)
+    ]
+
+    inicio = time.perf_counter()
+    otimizador = OtimizadorCupons(cupons)
+    indexacao = time.perf_counter() - inicio
+
+    carrinhos = []
+    for _ in range(N_CARRINHOS):
+        carrinho = Carrinho(cliente=None)
+        for categoria in gerador.sample(CATEGORIAS, gerador.randint(1, 5)):
+            carrinho.adicionar_item(
+                Produto("Item", categoria, round(gerador.uniform(5, 300), 2), 10),
+                quantidade=gerador.randint(1, 3),
+            )
+        carrinhos.append((carrinho, gerador.choice([0.0, 15.0, 30.0])))
+
+    inicio = time.perf_counter()
+    for carrinho, frete in carrinhos:
+        otimizador.melhor_cupom(carrinho, valor_frete=frete)
+    frio = (time.perf_counter() - inicio) / N_CARRINHOS
+
+    inicio = time.perf_counter()
+    for carrinho, frete in carrinhos:
+        otimizador.melhor_cupom(carrinho, valor_frete=frete)
+    quente = (time.perf_counter() - inicio) / N_CARRINHOS
+
+    carrinho, frete = carrinhos[0]
+    inicio = time.perf_counter()
+    for cupom in cupons:
+        cupom.calcular_desconto(carrinho.calcular_subtotal(), None, None, frete)
+    forca_bruta = time.perf_counter() - inicio
+
+    print(f"{N_CUPONS:,} cupons, {N_CARRINHOS:,} carrinhos")
+    print(f"indexação:              {indexacao * 1000:8.2f} ms")
+    print(f"por carrinho (sem cache): {frio * 1000:6.3f} ms")
+    print(f"por carrinho (cache):     {quente * 1000:6.3f} ms")
+    print(f"força bruta, 1 carrinho:  {forca_bruta * 1000:6.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
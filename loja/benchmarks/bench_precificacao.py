@@ -0,0 +1,72 @@
+"""
+Benchmark da precificação: Pedido a Pedido (escalar) vs. precificar_lote.
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_precificacao
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from loja.src.cliente import Cliente
+from loja.src.cupom import Cupom
+from loja.src.frete import Frete
+from loja.src.item_pedido import ItemPedido
+from loja.src.pedido import Pedido
+from loja.src.precificacao_lote import precificar_lote
+
+N_PEDIDOS = 100_000
+UFS = ["CE", "SP", "RJ", "AM", "RS", "BA", "PE", None]
+
+
+def main() -> None:
+    gerador = random.Random(42)
+    cliente = Cliente("Pedro", "pedro@example.com", "12345678901")
+    cupons = [
+        Cupom("VALOR10", "VALOR", 10.0, None, uso_maximo=10 ** 9),
+        Cupom("PCT15", "PERCENTUAL", 15.0, None, uso_maximo=10 ** 9),
+        Cupom("FRETE", "FRETE_GRATIS", 0.0, None, uso_maximo=10 ** 9),
+    ]
+
+    pedido_por_item, quantidades, precos = [], [], []
+    ufs, cupom_por_pedido, itens_por_pedido = [], [], []
+    for i in range(N_PEDIDOS):
+        itens = []
+        for _ in range(gerador.randint(1, 5)):
+            qtd = gerador.randint(1, 10)
+            preco = round(gerador.uniform(1.0, 500.0), 2)
+            itens.append(ItemPedido(str(i), "Item", qtd, preco))
+            pedido_por_item.append(i)
+            quantidades.append(qtd)
+            precos.append(preco)
+        itens_por_pedido.append(itens)
+        ufs.append(gerador.choice(UFS))
+        cupom_por_pedido.append(gerador.randint(-1, len(cupons) - 1))
+
+    inicio = time.perf_counter()
+    totais_escalar = []
+    for itens, uf, idx in zip(itens_por_pedido, ufs, cupom_por_pedido):
+        pedido = Pedido(
+            cliente=cliente,
+            itens=itens,
+            frete=Frete.from_uf_destino(uf) if uf else None,
+            cupom=cupons[idx] if idx >= 0 else None,
+        )
+        totais_escalar.append(pedido.total)
+    escalar = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    resultado = precificar_lote(
+        pedido_por_item, quantidades, precos, ufs, cupom_por_pedido, cupons
+    )
+    lote = time.perf_counter() - inicio
+
+    print(f"{N_PEDIDOS:,} pedidos, {len(pedido_por_item):,} itens")
+    print(f"escalar: {escalar:.3f}s")
+    print(f"lote:    {lote:.3f}s ({escalar / lote:.1f}x)")
+    print(f"totais idênticos: {resultado.total.tolist() == totais_escalar}")
+
+
+if __name__ == "__main__":
+    main()
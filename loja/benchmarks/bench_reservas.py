@@ -0,0 +1,88 @@
+"""
+Benchmark do LivroReservas: 100k reservas ativas em 1k SKUs.
+
+- disponível por SKU: total mantido (O(1)) x somar a lista de reservas;
+- vencimento periódico: varredura pelo heap x percorrer todas as reservas.
+
+Rode a partir da raiz do repositório:
+    python -m loja.benchmarks.bench_reservas
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from loja.src.produto import Produto
+from loja.src.reservas import LivroReservas
+
+N_SKUS = 1_000
+N_RESERVAS = 100_000
+N_CONSULTAS = 20_000
+N_TICKS = 100
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def main() -> None:
+    gerador = random.Random(22)
+    relogio = Relogio()
+    livro = LivroReservas(ttl=2000.0, relogio=relogio)
+    produtos = [Produto(f"P{i}", "CASA", 10.0, 10 ** 6) for i in range(N_SKUS)]
+
+    lista = []   # o que uma implementação sem índice guardaria
+    inicio = time.perf_counter()
+    for dono in range(N_RESERVAS):
+        relogio.agora = dono * 0.01
+        produto = gerador.choice(produtos)
+        reserva = livro.reservar(produto, gerador.randint(1, 3), dono=dono)
+        lista.append(reserva)
+    t_reservar = time.perf_counter() - inicio
+    print(f"reservar:                {t_reservar * 1e6 / N_RESERVAS:8.2f} us/reserva")
+
+    consultas = [gerador.choice(produtos) for _ in range(N_CONSULTAS)]
+
+    inicio = time.perf_counter()
+    for produto in consultas[:200]:
+        produto.estoque - sum(r.quantidade for r in lista if r.sku == produto.sku)
+    t_lista = (time.perf_counter() - inicio) / 200
+
+    inicio = time.perf_counter()
+    for produto in consultas:
+        livro.disponivel(produto)
+    t_livro = (time.perf_counter() - inicio) / N_CONSULTAS
+
+    print(f"disponível (soma lista): {t_lista * 1e6:8.2f} us/consulta")
+    print(f"disponível (livro):      {t_livro * 1e6:8.2f} us/consulta")
+
+    # varreduras periódicas: a cada "segundo" vencem ~100 reservas
+    relogio.agora = N_RESERVAS * 0.01 / 2 + 2000.0
+    livro.varrer()
+    ativas = [r for r in lista if r.expira_em > relogio.agora]
+
+    t_scan = t_heap = 0.0
+    for _ in range(N_TICKS):
+        relogio.agora += 1.0
+
+        inicio = time.perf_counter()
+        vencidas_scan = [r for r in ativas if r.expira_em <= relogio.agora]
+        ativas = [r for r in ativas if r.expira_em > relogio.agora]
+        t_scan += time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        vencidas = livro.varrer()
+        t_heap += time.perf_counter() - inicio
+        assert vencidas == len(vencidas_scan)
+
+    print(f"varredura (scan):        {t_scan * 1e6 / N_TICKS:8.1f} us/tick ({len(ativas)} ativas)")
+    print(f"varredura (heap):        {t_heap * 1e6 / N_TICKS:8.1f} us/tick")
+    print(livro.metricas())
+
+
+if __name__ == "__main__":
+    main()
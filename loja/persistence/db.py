@@ -4,10 +4,18 @@
 # db.py
 from __future__ import annotations
 
+import base64
+import os
+import random
 import sqlite3
+import threading
+import time
 import datetime
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
 import json
 
 from loja.src.produto import Produto
@@ -15,6 +23,12 @@ from loja.src.cliente import Cliente
 from loja.src.pedido import Pedido
 from loja.src.item_pedido import ItemPedido
 from loja.src.cupom import Cupom
+from loja.src.estoque import ESTOQUE
+from loja.persistence.pool import ConnectionPool, PoolMetrics
+from loja.persistence.migrations import aplicar_migracoes
+from loja.persistence.pragmas import aplicar_perfil, perfil_configurado
+
+T = TypeVar("T")
 
 # Caminho do arquivo do banco
 DB_PATH = Path(__file__).resolve().parent / "loja.db"
@@ -27,99 +41,104 @@ sqlite3.register_converter("TIMESTAMP", lambda b: datetime.datetime.fromisoforma
 
 # ========== CONEXÃO ==========
 
-def get_connection() -> sqlite3.Connection:
+# Tamanho do pool e tempo máximo (s) de espera por uma conexão livre
+POOL_TAMANHO_MAXIMO = 5
+POOL_TIMEOUT = 5.0
+
+_POOL: Optional[ConnectionPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
     """
-    Abre uma conexão com o SQLite.
+    Retorna o pool de conexões do processo atual.
+    O pool é recriado se DB_PATH mudar (ex.: testes) ou após um fork.
+    """
+    global _POOL
+
+    pool = _POOL
+    if pool is not None and pool.database == DB_PATH and pool.pid == os.getpid():
+        return pool
+
+    with _POOL_LOCK:
+        pool = _POOL
+        if pool is None or pool.database != DB_PATH or pool.pid != os.getpid():
+            if pool is not None and pool.pid == os.getpid():
+                pool.close_all()
+            pool = ConnectionPool(
+                DB_PATH,
+                tamanho_maximo=POOL_TAMANHO_MAXIMO,
+                timeout=POOL_TIMEOUT,
+            )
+            _POOL = pool
+        return pool
+
+
+def get_connection(perfil: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Empresta uma conexão do pool.
     row_factory = sqlite3.Row permite acessar colunas por nome.
+    conn.close() devolve a conexão ao pool em vez de fechá-la.
+
+    `perfil` escolhe os PRAGMAs da conexão (ver pragmas.PERFIS_PRAGMA);
+    sem ele, usa o perfil configurado em settings.json. Os PRAGMAs só são
+    reaplicados quando a conexão emprestada estava com outro perfil.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    alvo = perfil if perfil is not None else perfil_configurado()
+    conn = get_pool().acquire()
+    if conn.perfil != alvo:
+        try:
+            aplicar_perfil(conn, alvo)
+        except BaseException:
+            conn.perfil = None
+            conn.close()
+            raise
+        conn.perfil = alvo
     return conn
 
 
+@contextmanager
+def connection(perfil: Optional[str] = None) -> Iterator[sqlite3.Connection]:
+    """
+    Context manager para uma conexão do pool:
+
+        with connection() as conn:
+            conn.execute(...)
+            conn.commit()
+    """
+    conn = get_connection(perfil)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def pool_metrics() -> PoolMetrics:
+    """Métricas do pool atual (checkouts, esperas, tamanho...)."""
+    return get_pool().metrics()
+
+
+def fechar_pool() -> None:
+    """Fecha as conexões ociosas do pool (ex.: no encerramento da aplicação)."""
+    global _POOL
+
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.close_all()
+
+
 # Criação de tabelas
 
 def init_db() -> None:
     """
-    Cria as tabelas básicas se ainda não existirem.
+    Cria as tabelas e aplica as migrações pendentes (ver migrations.py).
     Rode uma vez no início da aplicação (ex.: comando 'loja init-db').
+    Pode ser chamada de novo sem problemas: só aplica o que faltar.
     """
-    ddl = """
-    CREATE TABLE IF NOT EXISTS produtos (
-        sku INTEGER PRIMARY KEY,
-        nome TEXT NOT NULL,
-        categoria TEXT,
-        preco REAL NOT NULL,
-        estoque INTEGER NOT NULL,
-        ativo INTEGER NOT NULL CHECK (ativo IN (0,1))
-    );
-
-    CREATE TABLE IF NOT EXISTS clientes (
-        id INTEGER PRIMARY KEY,
-        nome TEXT NOT NULL,
-        email TEXT NOT NULL UNIQUE,
-        cpf TEXT NOT NULL UNIQUE
-    );
-
-    -- Endereços podem ser modelados em tabela própria ou JSON;
-    -- aqui deixo uma tabela simples para futuro uso (opcional)
-    CREATE TABLE IF NOT EXISTS enderecos (
-        id INTEGER PRIMARY KEY,
-        cliente_id INTEGER NOT NULL,
-        cep TEXT NOT NULL,
-        cidade TEXT NOT NULL,
-        uf TEXT NOT NULL,
-        logradouro TEXT NOT NULL,
-        numero TEXT NOT NULL,
-        complemento TEXT,
-        FOREIGN KEY (cliente_id) REFERENCES clientes(id)
-    );
-
-    CREATE TABLE IF NOT EXISTS cupons (
-        codigo TEXT PRIMARY KEY,
-        tipo TEXT NOT NULL,
-        valor REAL NOT NULL,
-        data_validade TEXT,
-        uso_maximo INTEGER NOT NULL,
-        usos_realizados INTEGER NOT NULL,
-        categorias_elegiveis TEXT
-    );
-
-    CREATE TABLE IF NOT EXISTS pedidos (
-        id INTEGER PRIMARY KEY,
-        cliente_id INTEGER NOT NULL,
-        status TEXT NOT NULL,
-        subtotal REAL NOT NULL,
-        descontos REAL NOT NULL,
-        valor_frete REAL NOT NULL,
-        total REAL NOT NULL,
-        criado_em TEXT NOT NULL,
-        pago_em TEXT,
-        enviado_em TEXT,
-        entregue_em TEXT,
-        cancelado_em TEXT,
-        codigo_rastreio TEXT,
-        endereco_entrega_json TEXT NOT NULL,
-        cupom_codigo TEXT,
-        FOREIGN KEY (cliente_id) REFERENCES clientes(id),
-        FOREIGN KEY (cupom_codigo) REFERENCES cupons(codigo)
-    );
-
-    CREATE TABLE IF NOT EXISTS itens_pedido (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        pedido_id INTEGER NOT NULL,
-        sku TEXT NOT NULL,
-        nome TEXT NOT NULL,
-        quantidade INTEGER NOT NULL,
-        preco_unitario REAL NOT NULL,
-        FOREIGN KEY (pedido_id) REFERENCES pedidos(id)
-    );
-    """
-
     conn = get_connection()
     try:
-        conn.executescript(ddl)
-        conn.commit()
+        aplicar_migracoes(conn)
     finally:
         conn.close()
 
@@ -132,73 +151,248 @@ def _dt_to_str(dt: Optional[datetime.datetime]) -> Optional[str]:
     return dt.isoformat(timespec="seconds")
 
 
-def _str_to_dt(s: Optional[str]) -> Optional[datetime.datetime]:
-    if not s:
-        return None
-    return datetime.fromisoformat(s)
+# Linhas lidas por fetchmany() nos iteradores. Também é o número de
+# parâmetros do "IN (...)" de cada lote, por isso fica abaixo do limite
+# de variáveis do SQLite (999 nas versões antigas).
+TAMANHO_LOTE_LEITURA = 500
+
+
+def _validar_tamanho_lote(tamanho_lote: int) -> None:
+    if not isinstance(tamanho_lote, int):
+        raise TypeError("Error: tamanho_lote must be an integer.")
+    if not 1 <= tamanho_lote <= 900:
+        raise ValueError("Error: tamanho_lote must be between 1 and 900.")
+
+
+# Linhas por executemany() nas funções salvar_*_em_lote
+TAMANHO_LOTE_ESCRITA = 1000
+
+
+@dataclass(frozen=True)
+class EstatisticaLote:
+    """
+    Resultado de um lote gravado por salvar_*_em_lote.
+
+    Atributos:
+    - numero: posição do lote (começa em 1)
+    - linhas: registros principais gravados no lote
+    - segundos: tempo gasto no executemany do lote
+    """
+    numero: int
+    linhas: int
+    segundos: float
+
+
+def _agrupar(registros: Iterable[T], tamanho_lote: int) -> Iterator[List[T]]:
+    """Agrupa qualquer iterável em listas de até `tamanho_lote` elementos."""
+    it = iter(registros)
+    while True:
+        lote = list(islice(it, tamanho_lote))
+        if not lote:
+            return
+        yield lote
+
+
+def _validar_tamanho_lote_escrita(tamanho_lote: int) -> None:
+    if not isinstance(tamanho_lote, int):
+        raise TypeError("Error: tamanho_lote must be an integer.")
+    if tamanho_lote < 1:
+        raise ValueError("Error: tamanho_lote must be at least 1.")
+
+
+def _salvar_em_lotes(
+    sql: str,
+    registros: Iterable[T],
+    params: Callable[[T], tuple],
+    tamanho_lote: int,
+    antes: Optional[Tuple[str, Callable[[T], object]]] = None,
+    chave: Optional[Callable[[T], object]] = None,
+) -> List[EstatisticaLote]:
+    """
+    Grava `registros` com executemany em lotes de `tamanho_lote`, todos
+    dentro de uma única transação (um único commit/fsync no final).
+    Se qualquer lote falhar, nada é gravado.
+    A conexão usa o perfil de PRAGMAs "bulk_load".
+
+    `antes` = (sql, params) roda com executemany em cada lote antes do
+    comando principal (ex.: o movimento de estoque do upsert de produto).
+    Com `chave`, só o último registro de cada chave fica no lote: `antes`
+    compara com o banco de antes do lote, então um registro repetido
+    geraria um movimento contra um valor que o próprio lote já trocou.
+    """
+    _validar_tamanho_lote_escrita(tamanho_lote)
+
+    estatisticas: List[EstatisticaLote] = []
+    conn = get_connection(perfil="bulk_load")
+    try:
+        for numero, lote in enumerate(_agrupar(registros, tamanho_lote), start=1):
+            inicio = time.perf_counter()
+            if chave is not None:
+                lote = list({chave(r): r for r in lote}.values())
+            if antes is not None:
+                sql_antes, params_antes = antes
+                conn.executemany(sql_antes, [params_antes(r) for r in lote])
+            conn.executemany(sql, [params(r) for r in lote])
+            if antes is not None:
+                _checkpoint_se_preciso(conn)
+            estatisticas.append(
+                EstatisticaLote(numero, len(lote), time.perf_counter() - inicio)
+            )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return estatisticas
+
+
+def _ler_em_lotes(cur: sqlite3.Cursor, tamanho_lote: int) -> Iterator[List[sqlite3.Row]]:
+    """Lê o cursor em blocos de fetchmany() até esgotar."""
+    while True:
+        rows = cur.fetchmany(tamanho_lote)
+        if not rows:
+            return
+        yield rows
 
 
 # ====================================
 #   PRODUTO
 # ====================================
 
+_SQL_UPSERT_PRODUTO = """
+    INSERT INTO produtos (sku, nome, categoria, preco, estoque, ativo)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(sku) DO UPDATE SET
+        nome = excluded.nome,
+        categoria = excluded.categoria,
+        preco = excluded.preco,
+        estoque = excluded.estoque,
+        ativo = excluded.ativo
+"""
+
+
+def _params_produto(produto: Produto) -> tuple:
+    return (
+        produto.sku,
+        produto.nome,
+        produto.categoria,
+        produto.preco,
+        produto.estoque,
+        1 if produto.ativo else 0,
+    )
+
+
+# Diferença entre o estoque gravado e o que está no banco vira um movimento
+# AJUSTE (produto novo: o estoque inteiro), para o livro fechar com a coluna
+_SQL_MOVIMENTO_DO_UPSERT = """
+    INSERT INTO estoque_movimentos (sku, delta, motivo, pedido_id, ts)
+    SELECT
+        novo.sku,
+        novo.estoque - COALESCE(p.estoque, 0),
+        'AJUSTE',
+        NULL,
+        MAX(novo.ts, COALESCE((SELECT ts FROM estoque_movimentos ORDER BY id DESC LIMIT 1), ''))
+    FROM (SELECT ? AS sku, ? AS estoque, ? AS ts) AS novo
+    LEFT JOIN produtos AS p ON p.sku = novo.sku
+    WHERE novo.estoque <> COALESCE(p.estoque, 0)
+"""
+
+
+def _params_movimento_do_upsert(produto: Produto) -> tuple:
+    return (produto.sku, produto.estoque, _ts_movimento(None))
+
+
 def salvar_produto(produto: Produto) -> None:
     """
     Insere ou atualiza um produto no banco.
-    Usa sku como chave primária.
+    Usa sku como chave primária. Se o estoque mudou, a diferença é
+    registrada em estoque_movimentos (motivo AJUSTE).
     """
     conn = get_connection()
     try:
-        conn.execute(
-            """
-            INSERT INTO produtos (sku, nome, categoria, preco, estoque, ativo)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ON CONFLICT(sku) DO UPDATE SET
-                nome = excluded.nome,
-                categoria = excluded.categoria,
-                preco = excluded.preco,
-                estoque = excluded.estoque,
-                ativo = excluded.ativo
-            """,
-            (
-                produto.sku,
-                produto.nome,
-                produto.categoria,
-                produto.preco,
-                produto.estoque,
-                1 if produto.ativo else 0,
-            ),
-        )
+        conn.execute(_SQL_MOVIMENTO_DO_UPSERT, _params_movimento_do_upsert(produto))
+        conn.execute(_SQL_UPSERT_PRODUTO, _params_produto(produto))
+        _checkpoint_se_preciso(conn)
         conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
     finally:
         conn.close()
 
 
-def listar_produtos() -> List[Produto]:
+def salvar_produtos_em_lote(
+    produtos: Iterable[Produto],
+    tamanho_lote: int = TAMANHO_LOTE_ESCRITA,
+) -> List[EstatisticaLote]:
     """
-    Retorna todos os produtos do banco como objetos Produto.
+    Insere ou atualiza vários produtos em uma única transação.
+    Aceita qualquer iterável (lista, gerador...) e retorna as
+    estatísticas de cada lote.
     """
-    conn = get_connection()
+    return _salvar_em_lotes(
+        _SQL_UPSERT_PRODUTO,
+        produtos,
+        _params_produto,
+        tamanho_lote,
+        antes=(_SQL_MOVIMENTO_DO_UPSERT, _params_movimento_do_upsert),
+        chave=lambda produto: produto.sku,
+    )
+
+
+def iterar_produtos(
+    categoria: Optional[str] = None,
+    ativo: Optional[bool] = None,
+    tamanho_lote: int = TAMANHO_LOTE_LEITURA,
+) -> Iterator[Produto]:
+    """
+    Percorre os produtos do banco sem carregar a tabela inteira:
+    as linhas são lidas em blocos de `tamanho_lote` e cada Produto só é
+    criado quando o consumidor pede o próximo.
+
+    Filtros opcionais:
+    - categoria: apenas produtos dessa categoria
+    - ativo: apenas ativos (True) ou inativos (False)
+
+    A conexão (perfil "readonly_reports") fica emprestada até o gerador
+    terminar (ou ser fechado).
+    """
+    _validar_tamanho_lote(tamanho_lote)
+
+    condicoes: List[str] = []
+    params: List[object] = []
+    if categoria is not None:
+        condicoes.append("categoria = ?")
+        params.append(categoria)
+    if ativo is not None:
+        condicoes.append("ativo = ?")
+        params.append(1 if ativo else 0)
+    filtro = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+    conn = get_connection(perfil="readonly_reports")
     try:
         cur = conn.execute(
-            "SELECT sku, nome, categoria, preco, estoque, ativo FROM produtos"
+            f"""
+            SELECT sku, nome, categoria, preco, estoque, ativo
+            FROM produtos {filtro}
+            ORDER BY sku
+            """,
+            params,
         )
-        rows = cur.fetchall()
+        for rows in _ler_em_lotes(cur, tamanho_lote):
+            for row in rows:
+                yield Produto.from_row(row)
     finally:
         conn.close()
 
-    produtos: List[Produto] = []
-    for row in rows:
-        p = Produto(
-            sku=row["sku"],
-            nome=row["nome"],
-            categoria=row["categoria"],
-            preco=row["preco"],
-            estoque=row["estoque"],
-            ativo=bool(row["ativo"]),
-        )
-        produtos.append(p)
-    return produtos
+
+def listar_produtos() -> List[Produto]:
+    """
+    Retorna todos os produtos do banco como objetos Produto.
+    Para tabelas grandes prefira iterar_produtos().
+    """
+    return list(iterar_produtos())
 
 
 def buscar_produto_por_sku(sku: int) -> Optional[Produto]:
@@ -215,20 +409,27 @@ def buscar_produto_por_sku(sku: int) -> Optional[Produto]:
     if row is None:
         return None
 
-    return Produto(
-        sku=row["sku"],
-        nome=row["nome"],
-        categoria=row["categoria"],
-        preco=row["preco"],
-        estoque=row["estoque"],
-        ativo=bool(row["ativo"]),
-    )
+    return Produto.from_row(row)
 
 
 # ====================================
 #   CLIENTE (básico)
 # ====================================
 
+_SQL_UPSERT_CLIENTE = """
+    INSERT INTO clientes (id, nome, email, cpf)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        nome = excluded.nome,
+        email = excluded.email,
+        cpf = excluded.cpf
+"""
+
+
+def _params_cliente(cliente: Cliente) -> tuple:
+    return (cliente.id, cliente.nome, cliente.email, cliente.cpf)
+
+
 def salvar_cliente(cliente: Cliente) -> None:
     """
     Insere ou atualiza um cliente.
@@ -237,42 +438,39 @@ def salvar_cliente(cliente: Cliente) -> None:
     """
     conn = get_connection()
     try:
-        conn.execute(
-            """
-            INSERT INTO clientes (id, nome, email, cpf)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(id) DO UPDATE SET
-                nome = excluded.nome,
-                email = excluded.email,
-                cpf = excluded.cpf
-            """,
-            (cliente.id, cliente.nome, cliente.email, cliente.cpf),
-        )
+        conn.execute(_SQL_UPSERT_CLIENTE, _params_cliente(cliente))
         conn.commit()
     finally:
         conn.close()
 
 
-def listar_clientes() -> List[Cliente]:
-    conn = get_connection()
+def salvar_clientes_em_lote(
+    clientes: Iterable[Cliente],
+    tamanho_lote: int = TAMANHO_LOTE_ESCRITA,
+) -> List[EstatisticaLote]:
+    """Insere ou atualiza vários clientes em uma única transação."""
+    return _salvar_em_lotes(_SQL_UPSERT_CLIENTE, clientes, _params_cliente, tamanho_lote)
+
+
+def iterar_clientes(tamanho_lote: int = TAMANHO_LOTE_LEITURA) -> Iterator[Cliente]:
+    """
+    Percorre os clientes do banco em blocos de `tamanho_lote` linhas,
+    criando cada Cliente sob demanda.
+    """
+    _validar_tamanho_lote(tamanho_lote)
+
+    conn = get_connection(perfil="readonly_reports")
     try:
-        cur = conn.execute("SELECT id, nome, email, cpf FROM clientes")
-        rows = cur.fetchall()
+        cur = conn.execute("SELECT id, nome, email, cpf FROM clientes ORDER BY id")
+        for rows in _ler_em_lotes(cur, tamanho_lote):
+            for row in rows:
+                yield Cliente.from_row(row)
     finally:
         conn.close()
 
-    clientes: List[Cliente] = []
-    for row in rows:
-        # Aqui estou assumindo que o construtor aceita endereco=None
-        c = Cliente(
-            id=row["id"],
-            nome=row["nome"],
-            email=row["email"],
-            cpf=row["cpf"],
-            endereco=None,
-        )
-        clientes.append(c)
-    return clientes
+
+def listar_clientes() -> List[Cliente]:
+    return list(iterar_clientes())
 
 
 def buscar_cliente_por_id(cliente_id: int) -> Optional[Cliente]:
@@ -289,22 +487,33 @@ def buscar_cliente_por_id(cliente_id: int) -> Optional[Cliente]:
     if row is None:
         return None
 
-    return Cliente(
-        id=row["id"],
-        nome=row["nome"],
-        email=row["email"],
-        cpf=row["cpf"],
-        endereco=None,
-    )
+    return Cliente.from_row(row)
 
 
 # ====================================
 #   CUPOM
 # ====================================
 
-def salvar_cupom(cupom: Cupom) -> None:
+_SQL_UPSERT_CUPOM = """
+    INSERT INTO cupons (
+        codigo, tipo, valor, data_validade,
+        uso_maximo, usos_realizados, categorias_elegiveis
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(codigo) DO UPDATE SET
+        tipo = excluded.tipo,
+        valor = excluded.valor,
+        data_validade = excluded.data_validade,
+        uso_maximo = excluded.uso_maximo,
+        -- nunca volta o contador: resgates feitos por outros processos
+        -- (resgatar_cupom) não podem ser apagados por um objeto desatualizado
+        usos_realizados = MAX(cupons.usos_realizados, excluded.usos_realizados),
+        categorias_elegiveis = excluded.categorias_elegiveis
+"""
+
+
+def _params_cupom(cupom: Cupom) -> tuple:
     """
-    Salva ou atualiza um cupom.
     categorias_elegiveis vai como JSON em texto.
     data_validade vai em ISO (YYYY-MM-DD).
     """
@@ -316,39 +525,37 @@ def salvar_cupom(cupom: Cupom) -> None:
     data_validade_str = (
         cupom.data_validade.isoformat() if cupom.data_validade is not None else None
     )
+    return (
+        cupom.codigo,
+        cupom.tipo,
+        cupom.valor,
+        data_validade_str,
+        cupom.uso_maximo,
+        cupom.usos_realizados,
+        categorias_json,
+    )
+
 
+def salvar_cupom(cupom: Cupom) -> None:
+    """
+    Salva ou atualiza um cupom.
+    """
     conn = get_connection()
     try:
-        conn.execute(
-            """
-            INSERT INTO cupons (
-                codigo, tipo, valor, data_validade,
-                uso_maximo, usos_realizados, categorias_elegiveis
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(codigo) DO UPDATE SET
-                tipo = excluded.tipo,
-                valor = excluded.valor,
-                data_validade = excluded.data_validade,
-                uso_maximo = excluded.uso_maximo,
-                usos_realizados = excluded.usos_realizados,
-                categorias_elegiveis = excluded.categorias_elegiveis
-            """,
-            (
-                cupom.codigo,
-                cupom.tipo,
-                cupom.valor,
-                data_validade_str,
-                cupom.uso_maximo,
-                cupom.usos_realizados,
-                categorias_json,
-            ),
-        )
+        conn.execute(_SQL_UPSERT_CUPOM, _params_cupom(cupom))
         conn.commit()
     finally:
         conn.close()
 
 
+def salvar_cupons_em_lote(
+    cupons: Iterable[Cupom],
+    tamanho_lote: int = TAMANHO_LOTE_ESCRITA,
+) -> List[EstatisticaLote]:
+    """Salva ou atualiza vários cupons em uma única transação."""
+    return _salvar_em_lotes(_SQL_UPSERT_CUPOM, cupons, _params_cupom, tamanho_lote)
+
+
 def buscar_cupom_por_codigo(codigo: str) -> Optional[Cupom]:
     conn = get_connection()
     try:
@@ -368,118 +575,902 @@ def buscar_cupom_por_codigo(codigo: str) -> Optional[Cupom]:
     if row is None:
         return None
 
-    data_validade = (
-        datetime.fromisoformat(row["data_validade"]).date()
-        if row["data_validade"]
-        else None
-    )
-    categorias = (
-        json.loads(row["categorias_elegiveis"])
-        if row["categorias_elegiveis"]
-        else None
-    )
+    return Cupom.from_row(row)
 
-    return Cupom(
-        codigo=row["codigo"],
-        tipo=row["tipo"],
-        valor=row["valor"],
-        data_validade=data_validade,
-        uso_maximo=row["uso_maximo"],
-        usos_realizados=row["usos_realizados"],
-        categ_elegiveis=categorias,
-    )
+
+# ---------- Resgate atômico ----------
+# O limite é conferido e o contador incrementado no mesmo UPDATE: o SQLite
+# serializa as escritas, então dois workers nunca passam do uso_maximo,
+# sem lock no Python.
+
+_SQL_RESGATAR_CUPOM = """
+    UPDATE cupons SET usos_realizados = usos_realizados + 1
+    WHERE codigo = ? AND usos_realizados < uso_maximo
+"""
+
+_SQL_DEVOLVER_USO_CUPOM = """
+    UPDATE cupons SET usos_realizados = usos_realizados - 1
+    WHERE codigo = ? AND usos_realizados > 0
+"""
+
+
+def _atualizar_usos_cupom(
+    sql: str,
+    codigo: str,
+    conn: Optional[sqlite3.Connection],
+) -> bool:
+    if not isinstance(codigo, str):
+        raise TypeError("Error: codigo must be a string.")
+    # mesma normalização do Cupom.codigo
+    params = (codigo.strip().upper(),)
+
+    if conn is not None:
+        return conn.execute(sql, params).rowcount == 1
+
+    conn = get_connection()
+    try:
+        alterado = conn.execute(sql, params).rowcount == 1
+        conn.commit()
+    finally:
+        conn.close()
+    return alterado
+
+
+def resgatar_cupom(codigo: str, conn: Optional[sqlite3.Connection] = None) -> bool:
+    """
+    Consome um uso do cupom no banco, de forma atômica.
+    Retorna False se o cupom não existe ou já atingiu o uso_maximo.
+
+    Sem `conn`, grava na hora (conexão própria + commit). Com `conn`, roda
+    dentro da transação do chamador: um rollback do checkout desfaz o resgate.
+    """
+    return _atualizar_usos_cupom(_SQL_RESGATAR_CUPOM, codigo, conn)
+
+
+def devolver_uso_cupom(codigo: str, conn: Optional[sqlite3.Connection] = None) -> bool:
+    """Desfaz um resgate (ex.: pedido cancelado). Nunca deixa o contador negativo."""
+    return _atualizar_usos_cupom(_SQL_DEVOLVER_USO_CUPOM, codigo, conn)
+
+
+@contextmanager
+def resgate_de_cupom(codigo: str) -> Iterator[bool]:
+    """
+    Resgata o cupom e devolve o uso se o bloco falhar:
+
+        with resgate_de_cupom("DEZ") as resgatado:
+            if not resgatado:
+                ...  # esgotado: fecha o pedido sem o cupom
+            ...      # exceção aqui -> devolver_uso_cupom("DEZ")
+
+    O resgate é gravado antes do bloco, então a conexão não fica presa
+    (nem o banco travado para escrita) durante o checkout.
+    """
+    resgatado = resgatar_cupom(codigo)
+    try:
+        yield resgatado
+    except BaseException:
+        if resgatado:
+            devolver_uso_cupom(codigo)
+        raise
 
 
 # ====================================
 #   PEDIDO + ITENS
 # ====================================
 
-def salvar_pedido(pedido: Pedido) -> None:
+_SQL_UPSERT_PEDIDO = """
+    INSERT INTO pedidos (
+        id, cliente_id, status,
+        subtotal, descontos, valor_frete, total,
+        criado_em, pago_em, enviado_em, entregue_em, cancelado_em,
+        codigo_rastreio, endereco_entrega_json, cupom_codigo
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        cliente_id = excluded.cliente_id,
+        status = excluded.status,
+        subtotal = excluded.subtotal,
+        descontos = excluded.descontos,
+        valor_frete = excluded.valor_frete,
+        total = excluded.total,
+        criado_em = excluded.criado_em,
+        pago_em = excluded.pago_em,
+        enviado_em = excluded.enviado_em,
+        entregue_em = excluded.entregue_em,
+        cancelado_em = excluded.cancelado_em,
+        codigo_rastreio = excluded.codigo_rastreio,
+        endereco_entrega_json = excluded.endereco_entrega_json,
+        cupom_codigo = excluded.cupom_codigo
+"""
+
+_SQL_INSERT_ITEM_PEDIDO = """
+    INSERT INTO itens_pedido (
+        pedido_id, sku, nome, quantidade, preco_unitario
+    ) VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def _atributos_para_json(obj: object) -> object:
     """
-    Salva ou atualiza um pedido + seus itens.
-    - Usa pedido.id como chave primária.
-    - Sempre apaga os itens antigos e insere os atuais.
+    default= do json.dumps para objetos de domínio (ex.: Endereco).
+    Classes com __slots__ não têm __dict__: lê os slots de toda a hierarquia,
+    com as mesmas chaves (_Classe__attr) que o __dict__ gerava antes.
     """
+    if hasattr(obj, "__dict__"):
+        return obj.__dict__
+
+    atributos = {}
+    for classe in type(obj).__mro__:
+        for nome in classe.__dict__.get("__slots__", ()):
+            if nome.startswith("__") and not nome.endswith("__"):
+                nome = f"_{classe.__name__.lstrip('_')}{nome}"
+            if hasattr(obj, nome):
+                atributos[nome] = getattr(obj, nome)
+    return atributos or str(obj)
+
 
+def _params_pedido(pedido: Pedido) -> tuple:
     endereco_json = json.dumps(
         getattr(pedido, "endereco_entrega", None),
-        default=lambda o: getattr(o, "__dict__", str(o)),
+        default=_atributos_para_json,
         ensure_ascii=False,
     )
 
     cupom_codigo = pedido.cupom.codigo if pedido.cupom is not None else None
 
+    return (
+        pedido.id,
+        pedido.cliente.id,
+        pedido.status,
+        pedido.subtotal,
+        pedido.descontos,
+        pedido.valor_frete,
+        pedido.total,
+        _dt_to_str(pedido.criado_em),
+        _dt_to_str(pedido.pago_em),
+        _dt_to_str(pedido.enviado_em),
+        _dt_to_str(pedido.entregue_em),
+        _dt_to_str(pedido.cancelado_em),
+        pedido.codigo_rastreio,
+        endereco_json,
+        cupom_codigo,
+    )
+
+
+def _params_itens_pedido(pedido: Pedido) -> List[tuple]:
+    return [
+        (
+            pedido.id,
+            item.sku,
+            item.nome,
+            item.quantidade,
+            item.preco_unitario(),  # no seu código é método, não @property
+        )
+        for item in pedido.itens
+    ]
+
+
+# Colunas de pedidos na mesma ordem de _params_pedido()
+_CAMPOS_PEDIDO = (
+    "id", "cliente_id", "status",
+    "subtotal", "descontos", "valor_frete", "total",
+    "criado_em", "pago_em", "enviado_em", "entregue_em", "cancelado_em",
+    "codigo_rastreio", "endereco_entrega_json", "cupom_codigo",
+)
+
+
+def _itens_por_sku(pedido: Pedido) -> Optional[Dict[str, tuple]]:
+    """
+    sku -> (nome, quantidade, preco_unitario) dos itens do pedido.
+    None se houver sku repetido (aí o diff por sku não se aplica).
+    """
+    itens = {
+        item.sku: (item.nome, item.quantidade, item.preco_unitario())
+        for item in pedido.itens
+    }
+    return itens if len(itens) == len(pedido.itens) else None
+
+
+def _marcar_persistido(pedido: Pedido, cabecalho: tuple, itens: Optional[Dict[str, tuple]]) -> None:
+    """Guarda no pedido o que está gravado no banco (base do próximo diff)."""
+    pedido._estado_persistido = (cabecalho, itens)
+
+
+def _gravar_pedido_completo(conn: sqlite3.Connection, pedido: Pedido, cabecalho: tuple) -> None:
+    conn.execute(_SQL_UPSERT_PEDIDO, cabecalho)
+    conn.execute("DELETE FROM itens_pedido WHERE pedido_id = ?", (pedido.id,))
+    conn.executemany(_SQL_INSERT_ITEM_PEDIDO, _params_itens_pedido(pedido))
+
+
+def _gravar_diferencas_itens(
+    conn: sqlite3.Connection,
+    pedido_id: int,
+    anteriores: Dict[str, tuple],
+    atuais: Dict[str, tuple],
+) -> None:
+    inserir = [
+        (pedido_id, sku, *valores)
+        for sku, valores in atuais.items()
+        if sku not in anteriores
+    ]
+    atualizar = [
+        (*valores, pedido_id, sku)
+        for sku, valores in atuais.items()
+        if sku in anteriores and anteriores[sku] != valores
+    ]
+    remover = [(pedido_id, sku) for sku in anteriores if sku not in atuais]
+
+    if remover:
+        conn.executemany(
+            "DELETE FROM itens_pedido WHERE pedido_id = ? AND sku = ?", remover
+        )
+    if atualizar:
+        conn.executemany(
+            """
+            UPDATE itens_pedido
+            SET nome = ?, quantidade = ?, preco_unitario = ?
+            WHERE pedido_id = ? AND sku = ?
+            """,
+            atualizar,
+        )
+    if inserir:
+        conn.executemany(_SQL_INSERT_ITEM_PEDIDO, inserir)
+
+
+def salvar_pedido(pedido: Pedido) -> None:
+    """
+    Salva ou atualiza um pedido + seus itens, gravando só o que mudou.
+
+    - Pedido novo (nunca salvo/carregado): insere cabeçalho e itens.
+    - Pedido já persistido: compara com o estado da última gravação/carga.
+      Só o cabeçalho mudou (ex.: marcar_enviado) -> um único UPDATE das
+      colunas alteradas. Itens mudaram -> insert/update/delete apenas dos
+      skus diferentes, com executemany. Nada mudou -> não acessa o banco.
+    """
+    cabecalho = _params_pedido(pedido)
+    itens = _itens_por_sku(pedido)
+    estado = pedido._estado_persistido
+
+    diff_possivel = estado is not None and itens is not None and estado[1] is not None
+    if diff_possivel:
+        cabecalho_anterior, itens_anteriores = estado
+        colunas_alteradas = [
+            (campo, novo)
+            for campo, antigo, novo in zip(_CAMPOS_PEDIDO, cabecalho_anterior, cabecalho)
+            if antigo != novo
+        ]
+        if not colunas_alteradas and itens == itens_anteriores:
+            return
+
     conn = get_connection()
     try:
-        conn.execute(
-            """
-            INSERT INTO pedidos (
-                id, cliente_id, status,
-                subtotal, descontos, valor_frete, total,
-                criado_em, pago_em, enviado_em, entregue_em, cancelado_em,
-                codigo_rastreio, endereco_entrega_json, cupom_codigo
+        if not diff_possivel:
+            _gravar_pedido_completo(conn, pedido, cabecalho)
+        else:
+            atualizado = True
+            if colunas_alteradas:
+                sets = ", ".join(f"{campo} = ?" for campo, _ in colunas_alteradas)
+                cur = conn.execute(
+                    f"UPDATE pedidos SET {sets} WHERE id = ?",
+                    (*(valor for _, valor in colunas_alteradas), pedido.id),
+                )
+                atualizado = cur.rowcount == 1
+
+            if atualizado:
+                _gravar_diferencas_itens(conn, pedido.id, itens_anteriores, itens)
+            else:
+                # a linha sumiu do banco por fora: grava tudo de novo
+                _gravar_pedido_completo(conn, pedido, cabecalho)
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    _marcar_persistido(pedido, cabecalho, itens)
+
+
+def salvar_pedidos_em_lote(
+    pedidos: Iterable[Pedido],
+    tamanho_lote: int = TAMANHO_LOTE_ESCRITA,
+) -> List[EstatisticaLote]:
+    """
+    Salva ou atualiza vários pedidos (e seus itens) em uma única transação.
+    Cada lote faz 3 executemany: cabeçalhos, remoção dos itens antigos e
+    inserção dos itens atuais. `linhas` nas estatísticas conta pedidos.
+    """
+    _validar_tamanho_lote_escrita(tamanho_lote)
+
+    estatisticas: List[EstatisticaLote] = []
+    gravados: List[tuple] = []
+    conn = get_connection(perfil="bulk_load")
+    try:
+        for numero, lote in enumerate(_agrupar(pedidos, tamanho_lote), start=1):
+            inicio = time.perf_counter()
+            cabecalhos = [_params_pedido(p) for p in lote]
+            conn.executemany(_SQL_UPSERT_PEDIDO, cabecalhos)
+            conn.executemany(
+                "DELETE FROM itens_pedido WHERE pedido_id = ?",
+                [(p.id,) for p in lote],
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(id) DO UPDATE SET
-                cliente_id = excluded.cliente_id,
-                status = excluded.status,
-                subtotal = excluded.subtotal,
-                descontos = excluded.descontos,
-                valor_frete = excluded.valor_frete,
-                total = excluded.total,
-                criado_em = excluded.criado_em,
-                pago_em = excluded.pago_em,
-                enviado_em = excluded.enviado_em,
-                entregue_em = excluded.entregue_em,
-                cancelado_em = excluded.cancelado_em,
-                codigo_rastreio = excluded.codigo_rastreio,
-                endereco_entrega_json = excluded.endereco_entrega_json,
-                cupom_codigo = excluded.cupom_codigo
+            conn.executemany(
+                _SQL_INSERT_ITEM_PEDIDO,
+                [params for p in lote for params in _params_itens_pedido(p)],
+            )
+            estatisticas.append(
+                EstatisticaLote(numero, len(lote), time.perf_counter() - inicio)
+            )
+            gravados.extend(zip(lote, cabecalhos))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    for pedido, cabecalho in gravados:
+        _marcar_persistido(pedido, cabecalho, _itens_por_sku(pedido))
+    return estatisticas
+
+
+# ====================================
+#   LIVRO DE MOVIMENTOS DE ESTOQUE
+# ====================================
+#
+# estoque_movimentos só recebe INSERT (triggers barram UPDATE/DELETE).
+# produtos.estoque é o saldo atual materializado: cada movimento soma o
+# delta na coluna na mesma transação, sem reler o histórico.
+#
+# O ts dos movimentos nunca diminui (relógio que volta é nivelado ao
+# último ts gravado), então id e ts andam juntos.
+#
+# Checkpoints guardam o saldo de cada SKU até um movimento. "Estoque no
+# instante T" = último checkpoint com ts <= T (busca no índice, O(log n))
+# + soma dos movimentos do SKU entre o ts do checkpoint e T (um intervalo
+# curto do índice (sku, ts)).
+
+MOTIVO_SALDO_INICIAL = "SALDO_INICIAL"
+MOTIVO_AJUSTE = "AJUSTE"
+MOTIVO_VENDA = "VENDA"
+MOTIVO_ESTORNO = "ESTORNO"
+
+# Movimentos novos (no banco todo) que disparam uma rodada de checkpoints
+# na transação que os gravou; limita o trecho a repetir nas consultas
+INTERVALO_CHECKPOINT = 1000
+
+
+@dataclass(frozen=True)
+class MovimentoEstoque:
+    """
+    Entrada ou saída de estoque de um SKU.
+
+    Atributos:
+    - sku: sku do produto
+    - delta: unidades (positivo entra, negativo sai; nunca 0)
+    - motivo: MOTIVO_AJUSTE, MOTIVO_VENDA, MOTIVO_ESTORNO...
+    - pedido_id: pedido que causou o movimento, se houver
+    - ts: instante do movimento (None = agora); não pode ser anterior ao
+      último movimento já gravado
+    """
+    sku: int
+    delta: int
+    motivo: str
+    pedido_id: Optional[int] = None
+    ts: Optional[datetime.datetime] = None
+
+
+def _ts_movimento(ts: Optional[datetime.datetime]) -> str:
+    # microssegundos: vários movimentos por segundo precisam ficar em ordem
+    return (ts or datetime.datetime.now()).isoformat(timespec="microseconds")
+
+
+_SQL_ULTIMO_TS = "SELECT ts FROM estoque_movimentos ORDER BY id DESC LIMIT 1"
+
+_SQL_INSERT_MOVIMENTO = f"""
+    INSERT INTO estoque_movimentos (sku, delta, motivo, pedido_id, ts)
+    VALUES (?, ?, ?, ?, MAX(?, COALESCE(({_SQL_ULTIMO_TS}), '')))
+"""
+
+# Saldo nunca fica negativo (mesma regra de Produto.ajustar_estoque)
+_SQL_APLICAR_DELTA = """
+    UPDATE produtos SET estoque = estoque + ?
+    WHERE sku = ? AND estoque + ? >= 0
+"""
+
+# Cada rodada cobre os movimentos depois da anterior: o maior movimento_id
+# já coberto é justamente o último movimento que a rodada anterior viu
+_SQL_CRIAR_CHECKPOINTS = """
+    INSERT INTO estoque_checkpoints (sku, movimento_id, ts, estoque)
+    SELECT
+        m.sku,
+        MAX(m.id),
+        MAX(m.ts),
+        SUM(m.delta) + COALESCE(anterior.estoque, 0)
+    FROM estoque_movimentos AS m
+    LEFT JOIN estoque_checkpoints AS anterior
+        ON anterior.sku = m.sku
+        AND anterior.movimento_id = (
+            SELECT MAX(c.movimento_id) FROM estoque_checkpoints AS c WHERE c.sku = m.sku
+        )
+    WHERE m.id > ?
+    GROUP BY m.sku
+"""
+
+
+def _validar_movimento(movimento: MovimentoEstoque) -> None:
+    if not isinstance(movimento, MovimentoEstoque):
+        raise TypeError("Error: every item must be a MovimentoEstoque object.")
+    if not isinstance(movimento.delta, int):
+        raise TypeError("Error: delta must be an integer.")
+    if movimento.delta == 0:
+        raise ValueError("Error: delta cannot be zero.")
+    if not movimento.motivo:
+        raise ValueError("Error: motivo cannot be empty.")
+
+
+def _params_movimento(movimento: MovimentoEstoque) -> tuple:
+    return (
+        movimento.sku,
+        movimento.delta,
+        movimento.motivo,
+        movimento.pedido_id,
+        _ts_movimento(movimento.ts),
+    )
+
+
+def _ultimo_checkpoint(conn: sqlite3.Connection) -> int:
+    """Último movimento coberto pelos checkpoints (0 se não há nenhum)."""
+    return conn.execute(
+        "SELECT COALESCE(MAX(movimento_id), 0) FROM estoque_checkpoints"
+    ).fetchone()[0]
+
+
+def _criar_checkpoints(conn: sqlite3.Connection) -> int:
+    return conn.execute(_SQL_CRIAR_CHECKPOINTS, (_ultimo_checkpoint(conn),)).rowcount
+
+
+def _checkpoint_se_preciso(conn: sqlite3.Connection) -> None:
+    """Cria checkpoints se já há INTERVALO_CHECKPOINT movimentos descobertos."""
+    ultimo_movimento = conn.execute("SELECT COALESCE(MAX(id), 0) FROM estoque_movimentos").fetchone()[0]
+    if ultimo_movimento - _ultimo_checkpoint(conn) >= INTERVALO_CHECKPOINT:
+        _criar_checkpoints(conn)
+
+
+def registrar_movimentos_estoque(
+    movimentos: Iterable[MovimentoEstoque],
+    tamanho_lote: int = TAMANHO_LOTE_ESCRITA,
+) -> List[EstatisticaLote]:
+    """
+    Grava os movimentos no livro (executemany por lote) e soma os deltas
+    em produtos.estoque, tudo em uma transação BEGIN IMMEDIATE.
+
+    Como o banco recebe deltas e não o estoque final, cópias diferentes do
+    mesmo Produto em memória não sobrescrevem o trabalho umas das outras;
+    releia o saldo com buscar_produto_por_sku.
+
+    Se algum SKU não existe ou ficaria negativo, ou um ts informado é
+    anterior ao último movimento, nada é gravado e sobe ValueError.
+    """
+    _validar_tamanho_lote_escrita(tamanho_lote)
+
+    estatisticas: List[EstatisticaLote] = []
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        ultimo = conn.execute(_SQL_ULTIMO_TS).fetchone()
+        ultimo_ts = ultimo[0] if ultimo else ""
+        for numero, lote in enumerate(_agrupar(movimentos, tamanho_lote), start=1):
+            inicio = time.perf_counter()
+            deltas: Dict[int, int] = {}
+            for movimento in lote:
+                _validar_movimento(movimento)
+                if movimento.ts is not None:
+                    ts = _ts_movimento(movimento.ts)
+                    if ts < ultimo_ts:
+                        raise ValueError(
+                            f"Error: ts {ts} is earlier than the last recorded movement ({ultimo_ts})."
+                        )
+                    ultimo_ts = ts
+                deltas[movimento.sku] = deltas.get(movimento.sku, 0) + movimento.delta
+
+            conn.executemany(_SQL_INSERT_MOVIMENTO, [_params_movimento(m) for m in lote])
+            for sku, delta in deltas.items():
+                if conn.execute(_SQL_APLICAR_DELTA, (delta, sku, delta)).rowcount != 1:
+                    raise ValueError(
+                        f"Error: unknown sku {sku} or resulting estoque would be negative."
+                    )
+            # por lote: numa carga grande o trecho a repetir continua curto
+            _checkpoint_se_preciso(conn)
+            estatisticas.append(
+                EstatisticaLote(numero, len(lote), time.perf_counter() - inicio)
+            )
+        conn.commit()
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return estatisticas
+
+
+def criar_checkpoints_estoque() -> int:
+    """
+    Grava o saldo de cada SKU que teve movimentos desde a última rodada.
+    Retorna quantos checkpoints foram criados. As gravações já chamam isso
+    sozinhas a cada INTERVALO_CHECKPOINT movimentos.
+    """
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        criados = _criar_checkpoints(conn)
+        conn.commit()
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return criados
+
+
+def estoque_em(sku: int, momento: datetime.datetime) -> int:
+    """
+    Estoque do SKU no instante `momento`, pelo livro de movimentos:
+    checkpoint mais recente até o instante + movimentos depois dele.
+    """
+    if not isinstance(momento, datetime.datetime):
+        raise TypeError("Error: momento must be a datetime.")
+    ts = _ts_movimento(momento)
+
+    conn = get_connection(perfil="readonly_reports")
+    try:
+        checkpoint = conn.execute(
+            """
+            SELECT movimento_id, ts, estoque FROM estoque_checkpoints
+            WHERE sku = ? AND ts <= ?
+            ORDER BY ts DESC LIMIT 1
+            """,
+            (sku, ts),
+        ).fetchone()
+        movimento_id, ts_checkpoint, estoque = checkpoint if checkpoint else (0, "", 0)
+
+        # ts >= (e não >): outros movimentos podem ter o mesmo ts do checkpoint
+        repeticao = conn.execute(
+            """
+            SELECT SUM(delta) FROM estoque_movimentos
+            WHERE sku = ? AND ts >= ? AND ts <= ? AND id > ?
+            """,
+            (sku, ts_checkpoint, ts, movimento_id),
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    return estoque + (repeticao or 0)
+
+
+def listar_movimentos_estoque(sku: int) -> List[MovimentoEstoque]:
+    """Histórico completo do SKU, em ordem de gravação."""
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            """
+            SELECT sku, delta, motivo, pedido_id, ts FROM estoque_movimentos
+            WHERE sku = ? ORDER BY id
             """,
-            (
-                pedido.id,
-                pedido.cliente.id,
-                pedido.status,
-                pedido.subtotal,
-                pedido.descontos,
-                pedido.valor_frete,
-                pedido.total,
-                _dt_to_str(pedido.criado_em),
-                _dt_to_str(pedido.pago_em),
-                _dt_to_str(pedido.enviado_em),
-                _dt_to_str(pedido.entregue_em),
-                _dt_to_str(pedido.cancelado_em),
-                pedido.codigo_rastreio,
-                endereco_json,
-                cupom_codigo,
-            ),
+            (sku,),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        MovimentoEstoque(
+            sku=row["sku"],
+            delta=row["delta"],
+            motivo=row["motivo"],
+            pedido_id=row["pedido_id"],
+            ts=datetime.datetime.fromisoformat(row["ts"]),
         )
+        for row in rows
+    ]
+
+
+# ====================================
+#   CHECKOUT TRANSACIONAL
+# ====================================
 
-        # Apaga itens antigos e insere os atuais
-        conn.execute(
-            "DELETE FROM itens_pedido WHERE pedido_id = ?",
-            (pedido.id,),
+# Validade (s) de uma chave de idempotência: repetições dentro dela
+# devolvem o pedido original
+VALIDADE_CHAVE_IDEMPOTENCIA = 24 * 60 * 60
+
+_SQL_PEDIDO_DA_CHAVE = """
+    SELECT pedido_id FROM chaves_idempotencia WHERE chave = ? AND expira_em > ?
+"""
+
+# Só chega ao DO UPDATE se a chave existente já venceu (a busca vem antes,
+# na mesma transação)
+_SQL_GRAVAR_CHAVE = """
+    INSERT INTO chaves_idempotencia (chave, pedido_id, criado_em, expira_em)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(chave) DO UPDATE SET
+        pedido_id = excluded.pedido_id,
+        criado_em = excluded.criado_em,
+        expira_em = excluded.expira_em
+"""
+
+# Tentativas do checkout quando o banco continua travado (SQLITE_BUSY)
+# mesmo depois do busy_timeout, e a espera (s) antes da 2ª tentativa;
+# ela dobra a cada nova tentativa, com um sorteio para espalhar os workers
+CHECKOUT_TENTATIVAS = 5
+CHECKOUT_ESPERA_INICIAL = 0.02
+
+# Pedido com estoque baixado pelo checkout e ainda não devolvido
+_SQL_MARCAR_ESTOQUE_NO_BANCO = "UPDATE pedidos SET estoque_no_banco = 1 WHERE id = ?"
+_SQL_DESMARCAR_ESTOQUE_NO_BANCO = (
+    "UPDATE pedidos SET estoque_no_banco = 0 WHERE id = ? AND estoque_no_banco = 1"
+)
+
+# Estoque conferido e baixado no mesmo UPDATE (como no resgate de cupom)
+_SQL_BAIXAR_ESTOQUE = """
+    UPDATE produtos SET estoque = estoque - ?
+    WHERE sku = ? AND ativo = 1 AND estoque >= ?
+"""
+
+
+# SQLITE_BUSY e SQLITE_LOCKED (sqlite3 só expõe as constantes no 3.11+)
+_CODIGOS_BANCO_OCUPADO = (5, 6)
+
+
+def _banco_ocupado(erro: sqlite3.OperationalError) -> bool:
+    codigo = getattr(erro, "sqlite_errorcode", None)
+    if codigo is not None:
+        return codigo & 0xFF in _CODIGOS_BANCO_OCUPADO
+    mensagem = str(erro).lower()
+    return "locked" in mensagem or "busy" in mensagem
+
+
+def _quantidades_por_sku(pedido: Pedido) -> Dict[int, int]:
+    quantidades: Dict[int, int] = {}
+    for item in pedido.itens:
+        sku = int(item.sku)
+        quantidades[sku] = quantidades.get(sku, 0) + item.quantidade
+    return quantidades
+
+
+def _saldos_no_banco(conn: sqlite3.Connection, skus: Iterable[int]) -> Dict[int, int]:
+    """sku -> estoque na tabela produtos (SKUs ausentes ficam de fora)."""
+    saldos: Dict[int, int] = {}
+    for lote in _agrupar({int(sku) for sku in skus}, TAMANHO_LOTE_LEITURA):
+        rows = conn.execute(
+            f"SELECT sku, estoque FROM produtos WHERE sku IN ({', '.join('?' * len(lote))})",
+            lote,
         )
+        saldos.update((row[0], row[1]) for row in rows)
+    return saldos
+
+
+def _atualizar_estoque_em_memoria(produtos: Iterable[Optional[Produto]], saldos: Dict[int, int]) -> None:
+    """Copia o saldo do banco para os objetos Produto, com as listras do ESTOQUE presas."""
+    produtos = [p for p in produtos if p is not None and int(p.sku) in saldos]
+    with ESTOQUE.travar(p.sku for p in produtos):
+        for produto in produtos:
+            produto.estoque = saldos[int(produto.sku)]
+
+
+def sincronizar_estoque(produtos: Iterable[Produto]) -> None:
+    """
+    Traz para os objetos Produto o estoque atual do banco (ex.: antes do
+    checkout, para as reservas conferirem o disponível contra o banco).
+    Produtos que não estão no banco ficam como estão.
+    """
+    produtos = list(produtos)
+    conn = get_connection()
+    try:
+        saldos = _saldos_no_banco(conn, (p.sku for p in produtos))
+    finally:
+        conn.close()
+    _atualizar_estoque_em_memoria(produtos, saldos)
+
+
+def _produtos_do_pedido(pedido: Pedido) -> List[Optional[Produto]]:
+    return [getattr(item, "produto", None) for item in pedido.itens]
+
+
+def _executar_checkout(conn: sqlite3.Connection, pedido: Pedido, cabecalho: tuple) -> None:
+    """Corpo do checkout; o chamador abre a transação e faz commit/rollback."""
+    quantidades = _quantidades_por_sku(pedido)
+    for sku, quantidade in quantidades.items():
+        if conn.execute(_SQL_BAIXAR_ESTOQUE, (quantidade, sku, quantidade)).rowcount != 1:
+            raise ValueError(f"Error: insufficient stock (or inactive product) for sku {sku}.")
+    ts = _ts_movimento(None)
+    conn.executemany(
+        _SQL_INSERT_MOVIMENTO,
+        [(sku, -quantidade, MOTIVO_VENDA, pedido.id, ts) for sku, quantidade in quantidades.items()],
+    )
+
+    if pedido.cupom is not None and pedido.descontos > 0:
+        if not resgatar_cupom(pedido.cupom.codigo, conn=conn):
+            raise ValueError(f"Error: cupom {pedido.cupom.codigo} is exhausted or does not exist.")
 
-        for item in pedido.itens:
+    _gravar_pedido_completo(conn, pedido, cabecalho)
+    conn.execute(_SQL_MARCAR_ESTOQUE_NO_BANCO, (pedido.id,))
+    _checkpoint_se_preciso(conn)
+
+
+def _transacao_imediata(corpo: Callable[[sqlite3.Connection], T], tentativas: int) -> T:
+    """
+    Roda corpo(conn) numa transação BEGIN IMMEDIATE e faz commit (se o
+    corpo não encerrou a transação). SQLITE_BUSY após o busy_timeout faz a
+    transação inteira ser repetida, até `tentativas` vezes, com espera
+    exponencial; qualquer outro erro desfaz tudo e sobe.
+    """
+    if not isinstance(tentativas, int):
+        raise TypeError("Error: tentativas must be an integer.")
+    if tentativas < 1:
+        raise ValueError("Error: tentativas must be at least 1.")
+
+    espera = CHECKOUT_ESPERA_INICIAL
+    conn = get_connection()
+    try:
+        for tentativa in range(1, tentativas + 1):
+            if conn.in_transaction:
+                conn.commit()
+            try:
+                # IMMEDIATE: pega o lock de escrita já no início, então duas
+                # transações nunca leem e depois disputam o upgrade do lock
+                conn.execute("BEGIN IMMEDIATE")
+                resultado = corpo(conn)
+                if conn.in_transaction:
+                    conn.commit()
+                return resultado
+            except sqlite3.OperationalError as erro:
+                if conn.in_transaction:
+                    conn.rollback()
+                if not _banco_ocupado(erro) or tentativa == tentativas:
+                    raise
+                time.sleep(espera * (0.5 + random.random()))
+                espera *= 2
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+    finally:
+        conn.close()
+
+
+def registrar_checkout(
+    pedido: Pedido,
+    tentativas: int = CHECKOUT_TENTATIVAS,
+    chave_idempotencia: Optional[str] = None,
+) -> int:
+    """
+    Fecha o pedido no banco em uma única transação BEGIN IMMEDIATE:
+
+    1. baixa o estoque de cada sku com UPDATE condicional (estoque >= qtd)
+       e registra a saída em estoque_movimentos (motivo VENDA);
+    2. resgata o cupom (se deu desconto) com o UPDATE de resgatar_cupom;
+    3. grava o pedido e os itens (itens com executemany);
+    4. com chave_idempotencia, grava chave -> id do pedido.
+
+    Retorna o id do pedido gravado. Se a chave já foi usada (e não
+    venceu), nada é gravado e volta o id do pedido original.
+
+    Se faltar estoque ou o cupom estiver esgotado, nada é gravado e sobe
+    ValueError. SQLITE_BUSY após o busy_timeout faz a transação inteira
+    ser repetida, até `tentativas` vezes.
+
+    O banco é a fonte da verdade: depois do commit, os objetos Produto dos
+    itens recebem o saldo lido na transação (não uma baixa em memória). O
+    pedido fica marcado (_estoque_no_banco, coluna pedidos.estoque_no_banco)
+    para o pagamento não baixar as mesmas unidades de novo em memória; a
+    devolução dessas unidades é de estornar_pedido.
+    """
+    cabecalho = _params_pedido(pedido)
+    saldos: Dict[int, int] = {}
+
+    def checkout(conn: sqlite3.Connection) -> int:
+        if chave_idempotencia is not None:
+            agora = datetime.datetime.now()
+            original = conn.execute(
+                _SQL_PEDIDO_DA_CHAVE, (chave_idempotencia, _dt_to_str(agora))
+            ).fetchone()
+            if original is not None:
+                conn.rollback()
+                return original[0]
+        _executar_checkout(conn, pedido, cabecalho)
+        saldos.clear()
+        saldos.update(_saldos_no_banco(conn, _quantidades_por_sku(pedido)))
+        if chave_idempotencia is not None:
+            expira_em = agora + datetime.timedelta(seconds=VALIDADE_CHAVE_IDEMPOTENCIA)
             conn.execute(
-                """
-                INSERT INTO itens_pedido (
-                    pedido_id, sku, nome, quantidade, preco_unitario
-                ) VALUES (?, ?, ?, ?, ?)
-                """,
-                (
-                    pedido.id,
-                    item.sku,
-                    item.nome,
-                    item.quantidade,
-                    item.preco_unitario(),  # no seu código é método, não @property
-                ),
+                _SQL_GRAVAR_CHAVE,
+                (chave_idempotencia, pedido.id, _dt_to_str(agora), _dt_to_str(expira_em)),
             )
+        return pedido.id
+
+    pedido_id = _transacao_imediata(checkout, tentativas)
+    if pedido_id == pedido.id:
+        _marcar_persistido(pedido, cabecalho, _itens_por_sku(pedido))
+        pedido._estoque_no_banco = True
+        _atualizar_estoque_em_memoria(_produtos_do_pedido(pedido), saldos)
+    return pedido_id
+
+
+def estornar_pedido(pedido: Pedido, tentativas: int = CHECKOUT_TENTATIVAS) -> bool:
+    """
+    Devolve ao banco o estoque que registrar_checkout baixou para o pedido
+    (ex.: pedido cancelado), numa única transação BEGIN IMMEDIATE:
+
+    1. desmarca pedidos.estoque_no_banco (UPDATE condicional: só um
+       estorno por pedido, mesmo com chamadas repetidas ou simultâneas);
+    2. soma as unidades de volta em produtos e registra a entrada em
+       estoque_movimentos (motivo ESTORNO);
+    3. grava o pedido e os itens (ex.: status CANCELADO).
+
+    Retorna True se devolveu; False se o banco não tinha estoque baixado
+    para o pedido (aí nada é gravado). Como no checkout, os objetos
+    Produto dos itens recebem o saldo do banco.
+    """
+    cabecalho = _params_pedido(pedido)
+    saldos: Dict[int, int] = {}
+
+    def estornar(conn: sqlite3.Connection) -> bool:
+        if conn.execute(_SQL_DESMARCAR_ESTOQUE_NO_BANCO, (pedido.id,)).rowcount != 1:
+            conn.rollback()
+            return False
+        quantidades = _quantidades_por_sku(pedido)
+        conn.executemany(
+            "UPDATE produtos SET estoque = estoque + ? WHERE sku = ?",
+            [(quantidade, sku) for sku, quantidade in quantidades.items()],
+        )
+        ts = _ts_movimento(None)
+        conn.executemany(
+            _SQL_INSERT_MOVIMENTO,
+            [(sku, quantidade, MOTIVO_ESTORNO, pedido.id, ts) for sku, quantidade in quantidades.items()],
+        )
+        _gravar_pedido_completo(conn, pedido, cabecalho)
+        saldos.update(_saldos_no_banco(conn, quantidades))
+        _checkpoint_se_preciso(conn)
+        return True
+
+    estornado = _transacao_imediata(estornar, tentativas)
+    pedido._estoque_no_banco = False
+    if estornado:
+        _marcar_persistido(pedido, cabecalho, _itens_por_sku(pedido))
+        _atualizar_estoque_em_memoria(_produtos_do_pedido(pedido), saldos)
+    return estornado
+
+
+def buscar_pedido_da_chave(chave: str) -> Optional[int]:
+    """Id do pedido gravado com a chave de idempotência (None se não há ou venceu)."""
+    conn = get_connection()
+    try:
+        row = conn.execute(
+            _SQL_PEDIDO_DA_CHAVE, (chave, _dt_to_str(datetime.datetime.now()))
+        ).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row is not None else None
 
+
+def expurgar_chaves_idempotencia() -> int:
+    """Apaga as chaves vencidas. Retorna quantas foram apagadas."""
+    conn = get_connection()
+    try:
+        apagadas = conn.execute(
+            "DELETE FROM chaves_idempotencia WHERE expira_em <= ?",
+            (_dt_to_str(datetime.datetime.now()),),
+        ).rowcount
         conn.commit()
     finally:
         conn.close()
+    return apagadas
+
+
+def _item_pedido_de_row(row: sqlite3.Row) -> ItemPedido:
+    return ItemPedido(
+        sku=row["sku"],
+        nome=row["nome"],
+        quantidade=row["quantidade"],
+        preco_unitario=row["preco_unitario"],
+    )
 
 
 def _carregar_itens_pedido(conn: sqlite3.Connection, pedido_id: int) -> List[ItemPedido]:
@@ -488,91 +1479,330 @@ def _carregar_itens_pedido(conn: sqlite3.Connection, pedido_id: int) -> List[Ite
         SELECT sku, nome, quantidade, preco_unitario
         FROM itens_pedido
         WHERE pedido_id = ?
+        ORDER BY id
         """,
         (pedido_id,),
     )
-    rows = cur.fetchall()
+    return [_item_pedido_de_row(row) for row in cur.fetchall()]
 
-    itens: List[ItemPedido] = []
-    for row in rows:
-        item = ItemPedido(
-            sku=row["sku"],
-            nome=row["nome"],
-            quantidade=row["quantidade"],
-            preco_unitario=row["preco_unitario"],
+
+_COLUNAS_PEDIDO = """
+    id, cliente_id, status,
+    subtotal, descontos, valor_frete, total,
+    criado_em, pago_em, enviado_em, entregue_em, cancelado_em,
+    codigo_rastreio, endereco_entrega_json, cupom_codigo, estoque_no_banco
+"""
+
+
+def _pedido_de_row(
+    row: sqlite3.Row,
+    cliente: Cliente,
+    itens: List[ItemPedido],
+    cupom: Optional[Cupom],
+) -> Pedido:
+    """
+    Monta um Pedido a partir de uma linha da tabela pedidos, com cliente,
+    itens e cupom já carregados, e o marca como igual ao banco.
+    """
+    pedido = Pedido.from_row(row, cliente, itens, cupom)
+    _marcar_persistido(pedido, _params_pedido(pedido), _itens_por_sku(pedido))
+    return pedido
+
+
+def _carregar_pedidos(
+    conn: sqlite3.Connection,
+    filtro: str = "",
+    params: tuple = (),
+) -> List[Pedido]:
+    """
+    Carrega os pedidos que satisfazem `filtro` (trecho SQL sobre a tabela
+    pedidos, ex.: "WHERE status = ?") em um número fixo de consultas:
+    pedidos, itens, clientes e cupons são buscados em conjunto e ligados
+    em memória por dicionários. Cada cliente/cupom vira um único objeto,
+    compartilhado por todos os pedidos que o referenciam.
+    """
+    rows = conn.execute(
+        f"SELECT {_COLUNAS_PEDIDO} FROM pedidos {filtro}", params
+    ).fetchall()
+    return _hidratar_pedidos(conn, rows, filtro, params)
+
+
+def _hidratar_pedidos(
+    conn: sqlite3.Connection,
+    rows: List[sqlite3.Row],
+    filtro: str,
+    params: tuple,
+) -> List[Pedido]:
+    """
+    Transforma linhas de pedidos em objetos Pedido. `filtro`/`params`
+    precisam selecionar (ao menos) os mesmos pedidos de `rows`; são usados
+    para buscar itens, clientes e cupons em uma consulta cada.
+    """
+    if not rows:
+        return []
+
+    itens_por_pedido: Dict[int, List[ItemPedido]] = {}
+    cur = conn.execute(
+        f"""
+        SELECT pedido_id, sku, nome, quantidade, preco_unitario
+        FROM itens_pedido
+        WHERE pedido_id IN (SELECT id FROM pedidos {filtro})
+        ORDER BY pedido_id, id
+        """,
+        params,
+    )
+    for row in cur:
+        itens_por_pedido.setdefault(row["pedido_id"], []).append(
+            _item_pedido_de_row(row)
         )
-        itens.append(item)
-    return itens
+
+    cur = conn.execute(
+        f"""
+        SELECT id, nome, email, cpf
+        FROM clientes
+        WHERE id IN (SELECT cliente_id FROM pedidos {filtro})
+        """,
+        params,
+    )
+    clientes: Dict[int, Cliente] = {row["id"]: Cliente.from_row(row) for row in cur}
+
+    cur = conn.execute(
+        f"""
+        SELECT codigo, tipo, valor, data_validade,
+               uso_maximo, usos_realizados, categorias_elegiveis
+        FROM cupons
+        WHERE codigo IN (SELECT cupom_codigo FROM pedidos {filtro})
+        """,
+        params,
+    )
+    cupons: Dict[str, Cupom] = {row["codigo"]: Cupom.from_row(row) for row in cur}
+
+    pedidos: List[Pedido] = []
+    for row in rows:
+        cliente = clientes.get(row["cliente_id"])
+        if cliente is None:
+            # Se der algum problema, pula
+            continue
+
+        itens = itens_por_pedido.get(row["id"])
+        if not itens:
+            # Pedido precisa de ao menos um item
+            continue
+
+        cupom = cupons.get(row["cupom_codigo"]) if row["cupom_codigo"] else None
+        pedidos.append(_pedido_de_row(row, cliente, itens, cupom))
+
+    return pedidos
 
 
 def listar_pedidos() -> List[Pedido]:
     """
     Carrega todos os pedidos do banco.
-    Observação: para manter a compatibilidade e simplicidade, o frete é
-    reconstruído como None (o valor de frete já está persistido em valor_frete).
-    Se quiser, você pode recalcular com Frete.from_cliente(cliente).
+    São 4 consultas no total (pedidos, itens, clientes, cupons),
+    independente da quantidade de pedidos.
     """
     conn = get_connection()
+    try:
+        return _carregar_pedidos(conn)
+    finally:
+        conn.close()
+
+
+def buscar_pedido_por_id(pedido_id: int) -> Optional[Pedido]:
+    conn = get_connection()
+    try:
+        pedidos = _carregar_pedidos(conn, "WHERE id = ?", (pedido_id,))
+    finally:
+        conn.close()
+    return pedidos[0] if pedidos else None
+
+
+def iterar_pedidos(
+    inicio: Optional[datetime.datetime] = None,
+    fim: Optional[datetime.datetime] = None,
+    status: Optional[str] = None,
+    tamanho_lote: int = TAMANHO_LOTE_LEITURA,
+) -> Iterator[Pedido]:
+    """
+    Percorre os pedidos em ordem de criação sem carregar a tabela inteira.
+
+    Os pedidos são lidos em blocos de `tamanho_lote`; para cada bloco,
+    itens, clientes e cupons são buscados em conjunto (3 consultas) e os
+    objetos Pedido são entregues um a um. A memória usada depende do
+    tamanho do bloco, não do tamanho da tabela.
+
+    Filtros opcionais:
+    - inicio / fim: intervalo fechado [inicio, fim] sobre criado_em
+    - status: apenas pedidos com esse status
+    """
+    _validar_tamanho_lote(tamanho_lote)
+
+    condicoes: List[str] = []
+    params: List[object] = []
+    if inicio is not None:
+        condicoes.append("criado_em >= ?")
+        params.append(_dt_to_str(inicio))
+    if fim is not None:
+        condicoes.append("criado_em <= ?")
+        params.append(_dt_to_str(fim))
+    if status is not None:
+        condicoes.append("status = ?")
+        params.append(status)
+    filtro = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+    conn = get_connection(perfil="readonly_reports")
     try:
         cur = conn.execute(
-            """
-            SELECT
-                id, cliente_id, status,
-                subtotal, descontos, valor_frete, total,
-                criado_em, pago_em, enviado_em, entregue_em, cancelado_em,
-                codigo_rastreio, endereco_entrega_json, cupom_codigo
-            FROM pedidos
-            """
+            f"SELECT {_COLUNAS_PEDIDO} FROM pedidos {filtro} ORDER BY criado_em, id",
+            params,
         )
-        rows = cur.fetchall()
-
-        pedidos: List[Pedido] = []
-
-        for row in rows:
-            cliente = buscar_cliente_por_id(row["cliente_id"])
-            if cliente is None:
-                # Se der algum problema, pula
-                continue
-
-            endereco_entrega = None
-            if row["endereco_entrega_json"]:
-                try:
-                    endereco_entrega = json.loads(row["endereco_entrega_json"])
-                except json.JSONDecodeError:
-                    endereco_entrega = None
-
-            # Cupom é opcional
-            cupom = None
-            if row["cupom_codigo"]:
-                cupom = buscar_cupom_por_codigo(row["cupom_codigo"])
-
-            itens = _carregar_itens_pedido(conn, row["id"])
-
-            # frete = None para simplificar; valor já está em valor_frete
-            pedido = Pedido(
-                cliente=cliente,
-                itens=itens,
-                frete=None,
-                cupom=cupom,
-                endereco_entrega=endereco_entrega,
-                status=row["status"],
-                criado_em=_str_to_dt(row["criado_em"]),
-            )
+        for rows in _ler_em_lotes(cur, tamanho_lote):
+            ids = tuple(row["id"] for row in rows)
+            filtro_lote = f"WHERE id IN ({', '.join('?' * len(ids))})"
+            yield from _hidratar_pedidos(conn, rows, filtro_lote, ids)
+    finally:
+        conn.close()
+
+
+# ====================================
+#   PAGINAÇÃO (keyset)
+# ====================================
+
+TAMANHO_PAGINA = 50
+
+
+@dataclass(frozen=True)
+class Pagina:
+    """
+    Uma página de resultados.
+
+    Atributos:
+    - itens: objetos da página (Produto, Pedido...)
+    - proximo_token: passe para a próxima chamada; None na última página
+    """
+    itens: list
+    proximo_token: Optional[str]
 
-            # Ajusta campos que o __init__ calculou de novo
-            pedido.subtotal = row["subtotal"]
-            pedido.descontos = row["descontos"]
-            pedido.valor_frete = row["valor_frete"]
-            pedido.total = row["total"]
 
-            pedido.pago_em = _str_to_dt(row["pago_em"])
-            pedido.enviado_em = _str_to_dt(row["enviado_em"])
-            pedido.entregue_em = _str_to_dt(row["entregue_em"])
-            pedido.cancelado_em = _str_to_dt(row["cancelado_em"])
-            pedido.codigo_rastreio = row["codigo_rastreio"]
+def _codificar_token(tipo: str, chave: list) -> str:
+    dados = json.dumps({"t": tipo, "k": chave}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip("=")
 
-            pedidos.append(pedido)
 
-        return pedidos
+def _decodificar_token(token: str, tipo: str) -> list:
+    if not isinstance(token, str):
+        raise TypeError("Error: token must be a string.")
+    try:
+        preenchido = token + "=" * (-len(token) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(preenchido.encode()))
+        if dados["t"] != tipo or not isinstance(dados["k"], list):
+            raise ValueError
+        return dados["k"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Error: invalid pagination token.") from exc
+
+
+def _validar_limite(limite: int) -> None:
+    if not isinstance(limite, int):
+        raise TypeError("Error: limite must be an integer.")
+    if not 1 <= limite <= 900:
+        raise ValueError("Error: limite must be between 1 and 900.")
+
+
+def paginar_produtos(
+    limite: int = TAMANHO_PAGINA,
+    token: Optional[str] = None,
+    categoria: Optional[str] = None,
+) -> Pagina:
+    """
+    Retorna uma página de produtos em ordem de sku.
+
+    Usa paginação por chave (WHERE sku > ? ... LIMIT ?) em vez de OFFSET:
+    o token guarda o último sku entregue, então a página 1000 custa o
+    mesmo que a primeira. O filtro por categoria usa idx_produtos_categoria.
+    """
+    _validar_limite(limite)
+
+    condicoes: List[str] = []
+    params: List[object] = []
+    if categoria is not None:
+        condicoes.append("categoria = ?")
+        params.append(categoria)
+    if token is not None:
+        (ultimo_sku,) = _decodificar_token(token, "produtos")
+        condicoes.append("sku > ?")
+        params.append(ultimo_sku)
+    filtro = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+    conn = get_connection()
+    try:
+        # busca um a mais para saber se existe próxima página
+        rows = conn.execute(
+            f"""
+            SELECT sku, nome, categoria, preco, estoque, ativo
+            FROM produtos {filtro}
+            ORDER BY sku
+            LIMIT ?
+            """,
+            (*params, limite + 1),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    tem_mais = len(rows) > limite
+    rows = rows[:limite]
+    proximo = _codificar_token("produtos", [rows[-1]["sku"]]) if tem_mais else None
+    return Pagina([Produto.from_row(row) for row in rows], proximo)
+
+
+def paginar_pedidos(
+    limite: int = TAMANHO_PAGINA,
+    token: Optional[str] = None,
+    status: Optional[str] = None,
+) -> Pagina:
+    """
+    Retorna uma página de pedidos em ordem de (criado_em, id).
+
+    A chave (criado_em, id) é única mesmo com pedidos criados no mesmo
+    segundo. Com ou sem filtro de status, a busca começa direto no ponto
+    do token pelo índice, sem percorrer as páginas anteriores.
+    """
+    _validar_limite(limite)
+
+    condicoes: List[str] = []
+    params: List[object] = []
+    if status is not None:
+        condicoes.append("status = ?")
+        params.append(status)
+    if token is not None:
+        ultimo_criado_em, ultimo_id = _decodificar_token(token, "pedidos")
+        condicoes.append("(criado_em, id) > (?, ?)")
+        params.extend([ultimo_criado_em, ultimo_id])
+    filtro = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            f"""
+            SELECT {_COLUNAS_PEDIDO} FROM pedidos {filtro}
+            ORDER BY criado_em, id
+            LIMIT ?
+            """,
+            (*params, limite + 1),
+        ).fetchall()
+
+        tem_mais = len(rows) > limite
+        rows = rows[:limite]
+        ids = tuple(row["id"] for row in rows)
+        pedidos = _hidratar_pedidos(
+            conn, rows, f"WHERE id IN ({', '.join('?' * len(ids))})", ids
+        )
     finally:
         conn.close()
+
+    proximo = (
+        _codificar_token("pedidos", [rows[-1]["criado_em"], rows[-1]["id"]])
+        if tem_mais
+        else None
+    )
+    return Pagina(pedidos, proximo)
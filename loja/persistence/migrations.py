@@ -0,0 +1,364 @@
+# migrations.py
+# Migrações numeradas do schema SQLite, registradas na tabela schema_version.
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class Migracao:
+    """
+    Uma alteração de schema.
+
+    Atributos:
+    - versao: número sequencial (1, 2, 3...); nunca reutilize um número
+    - descricao: texto curto do que a migração faz
+    - comandos: comandos SQL executados em ordem, na mesma transação
+    """
+    versao: int
+    descricao: str
+    comandos: Tuple[str, ...]
+
+
+# Para evoluir o schema, adicione uma nova Migracao no FINAL da lista.
+# Não edite migrações já publicadas: bancos existentes não as rodam de novo.
+MIGRACOES: List[Migracao] = [
+    Migracao(
+        versao=1,
+        descricao="schema inicial",
+        # IF NOT EXISTS: bancos criados antes das migrações já têm as tabelas
+        comandos=(
+            """
+            CREATE TABLE IF NOT EXISTS produtos (
+                sku INTEGER PRIMARY KEY,
+                nome TEXT NOT NULL,
+                categoria TEXT,
+                preco REAL NOT NULL,
+                estoque INTEGER NOT NULL,
+                ativo INTEGER NOT NULL CHECK (ativo IN (0,1))
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS clientes (
+                id INTEGER PRIMARY KEY,
+                nome TEXT NOT NULL,
+                email TEXT NOT NULL UNIQUE,
+                cpf TEXT NOT NULL UNIQUE
+            )
+            """,
+            # Endereços podem ser modelados em tabela própria ou JSON;
+            # aqui fica uma tabela simples para futuro uso (opcional)
+            """
+            CREATE TABLE IF NOT EXISTS enderecos (
+                id INTEGER PRIMARY KEY,
+                cliente_id INTEGER NOT NULL,
+                cep TEXT NOT NULL,
+                cidade TEXT NOT NULL,
+                uf TEXT NOT NULL,
+                logradouro TEXT NOT NULL,
+                numero TEXT NOT NULL,
+                complemento TEXT,
+                FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS cupons (
+                codigo TEXT PRIMARY KEY,
+                tipo TEXT NOT NULL,
+                valor REAL NOT NULL,
+                data_validade TEXT,
+                uso_maximo INTEGER NOT NULL,
+                usos_realizados INTEGER NOT NULL,
+                categorias_elegiveis TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS pedidos (
+                id INTEGER PRIMARY KEY,
+                cliente_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                subtotal REAL NOT NULL,
+                descontos REAL NOT NULL,
+                valor_frete REAL NOT NULL,
+                total REAL NOT NULL,
+                criado_em TEXT NOT NULL,
+                pago_em TEXT,
+                enviado_em TEXT,
+                entregue_em TEXT,
+                cancelado_em TEXT,
+                codigo_rastreio TEXT,
+                endereco_entrega_json TEXT NOT NULL,
+                cupom_codigo TEXT,
+                FOREIGN KEY (cliente_id) REFERENCES clientes(id),
+                FOREIGN KEY (cupom_codigo) REFERENCES cupons(codigo)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS itens_pedido (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pedido_id INTEGER NOT NULL,
+                sku TEXT NOT NULL,
+                nome TEXT NOT NULL,
+                quantidade INTEGER NOT NULL,
+                preco_unitario REAL NOT NULL,
+                FOREIGN KEY (pedido_id) REFERENCES pedidos(id)
+            )
+            """,
+        ),
+    ),
+    Migracao(
+        versao=2,
+        descricao="índices das buscas de itens, pedidos e endereços",
+        # Índices do SQLite já incluem o rowid (id), então
+        # idx_pedidos_criado_em também serve para ORDER BY criado_em, id
+        comandos=(
+            "CREATE INDEX IF NOT EXISTS idx_itens_pedido_pedido_id ON itens_pedido (pedido_id)",
+            "CREATE INDEX IF NOT EXISTS idx_pedidos_criado_em ON pedidos (criado_em)",
+            "CREATE INDEX IF NOT EXISTS idx_pedidos_status ON pedidos (status)",
+            "CREATE INDEX IF NOT EXISTS idx_pedidos_cliente_id ON pedidos (cliente_id)",
+            "CREATE INDEX IF NOT EXISTS idx_enderecos_cliente_id ON enderecos (cliente_id)",
+        ),
+    ),
+    Migracao(
+        versao=3,
+        descricao="índices da paginação por chave (keyset)",
+        # (status, criado_em) atende filtro por status já na ordem da
+        # paginação de pedidos e substitui idx_pedidos_status (prefixo)
+        comandos=(
+            "CREATE INDEX IF NOT EXISTS idx_produtos_categoria ON produtos (categoria)",
+            "CREATE INDEX IF NOT EXISTS idx_pedidos_status_criado_em ON pedidos (status, criado_em)",
+            "DROP INDEX IF EXISTS idx_pedidos_status",
+        ),
+    ),
+    Migracao(
+        versao=4,
+        descricao="livro de movimentos de estoque e checkpoints",
+        # produtos.estoque continua sendo o saldo atual (materializado);
+        # cada alteração dele grava também uma linha em estoque_movimentos
+        comandos=(
+            """
+            CREATE TABLE IF NOT EXISTS estoque_movimentos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sku INTEGER NOT NULL,
+                delta INTEGER NOT NULL,
+                motivo TEXT NOT NULL,
+                pedido_id INTEGER,
+                ts TEXT NOT NULL
+            )
+            """,
+            # ts nunca volta no livro, então o trecho entre o checkpoint e o
+            # instante consultado é um intervalo contíguo deste índice
+            "CREATE INDEX IF NOT EXISTS idx_estoque_movimentos_sku_ts ON estoque_movimentos (sku, ts)",
+            """
+            CREATE TABLE IF NOT EXISTS estoque_checkpoints (
+                sku INTEGER NOT NULL,
+                movimento_id INTEGER NOT NULL,
+                ts TEXT NOT NULL,
+                estoque INTEGER NOT NULL,
+                PRIMARY KEY (sku, movimento_id)
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_estoque_checkpoints_sku_ts ON estoque_checkpoints (sku, ts)",
+            # MAX(movimento_id): até onde a última rodada de checkpoints foi
+            "CREATE INDEX IF NOT EXISTS idx_estoque_checkpoints_movimento ON estoque_checkpoints (movimento_id)",
+            # só inserção: o histórico não pode ser reescrito
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_estoque_movimentos_sem_update
+            BEFORE UPDATE ON estoque_movimentos
+            BEGIN SELECT RAISE(ABORT, 'estoque_movimentos is append-only'); END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_estoque_movimentos_sem_delete
+            BEFORE DELETE ON estoque_movimentos
+            BEGIN SELECT RAISE(ABORT, 'estoque_movimentos is append-only'); END
+            """,
+            # saldo de abertura dos produtos que já existiam. Mesmo relógio
+            # (hora local) e formato (microssegundos) de db._ts_movimento:
+            # com UTC, num fuso atrás dele o saldo ficaria no futuro e o
+            # MAX(ts) do INSERT arrastaria os movimentos seguintes para lá
+            """
+            INSERT INTO estoque_movimentos (sku, delta, motivo, pedido_id, ts)
+            SELECT sku, estoque, 'SALDO_INICIAL', NULL,
+                   strftime('%Y-%m-%dT%H:%M:%f000', 'now', 'localtime')
+            FROM produtos WHERE estoque <> 0
+            """,
+        ),
+    ),
+    Migracao(
+        versao=5,
+        descricao="chaves de idempotência do checkout",
+        comandos=(
+            """
+            CREATE TABLE IF NOT EXISTS chaves_idempotencia (
+                chave TEXT PRIMARY KEY,
+                pedido_id INTEGER NOT NULL,
+                criado_em TEXT NOT NULL,
+                expira_em TEXT NOT NULL
+            )
+            """,
+            # expurgo das vencidas sem varrer a tabela
+            "CREATE INDEX IF NOT EXISTS idx_chaves_idempotencia_expira_em ON chaves_idempotencia (expira_em)",
+        ),
+    ),
+    Migracao(
+        versao=6,
+        descricao="pedidos.estoque_no_banco (estoque baixado pelo checkout)",
+        comandos=(
+            # 1 enquanto o estoque que o checkout baixou não foi devolvido
+            "ALTER TABLE pedidos ADD COLUMN estoque_no_banco INTEGER NOT NULL DEFAULT 0",
+            """
+            UPDATE pedidos SET estoque_no_banco = 1
+            WHERE id IN (SELECT pedido_id FROM estoque_movimentos WHERE motivo = 'VENDA')
+              AND id NOT IN (SELECT pedido_id FROM estoque_movimentos WHERE motivo = 'ESTORNO'
+                             AND pedido_id IS NOT NULL)
+            """,
+        ),
+    ),
+]
+
+
+_DDL_SCHEMA_VERSION = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        versao INTEGER PRIMARY KEY,
+        descricao TEXT NOT NULL,
+        aplicada_em TEXT NOT NULL DEFAULT (datetime('now'))
+    )
+"""
+
+
+def versao_atual(conn: sqlite3.Connection) -> int:
+    """Maior versão já aplicada no banco (0 se nenhuma)."""
+    conn.execute(_DDL_SCHEMA_VERSION)
+    row = conn.execute("SELECT MAX(versao) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def aplicar_migracoes(
+    conn: sqlite3.Connection,
+    migracoes: Sequence[Migracao] = MIGRACOES,
+) -> List[int]:
+    """
+    Aplica, em ordem, as migrações com versão maior que a atual do banco.
+
+    Tudo roda em uma transação BEGIN IMMEDIATE: dois processos iniciando
+    ao mesmo tempo não aplicam a mesma migração duas vezes, e se uma
+    migração falhar o banco volta ao estado anterior.
+
+    Retorna as versões aplicadas nesta chamada.
+    """
+    versoes = [m.versao for m in migracoes]
+    if versoes != sorted(set(versoes)):
+        raise ValueError("Error: migration versions must be unique and increasing.")
+
+    if conn.in_transaction:
+        conn.commit()
+
+    aplicadas: List[int] = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        atual = versao_atual(conn)
+        for migracao in migracoes:
+            if migracao.versao <= atual:
+                continue
+            for comando in migracao.comandos:
+                conn.execute(comando)
+            conn.execute(
+                "INSERT INTO schema_version (versao, descricao) VALUES (?, ?)",
+                (migracao.versao, migracao.descricao),
+            )
+            aplicadas.append(migracao.versao)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return aplicadas
+
+
+# ====================================
+#   VERIFICAÇÃO DOS PLANOS DE CONSULTA
+# ====================================
+
+# Consultas mais frequentes e o índice que cada uma deve usar.
+CONSULTAS_QUENTES: Dict[str, Tuple[str, tuple, str]] = {
+    "itens_do_pedido": (
+        "SELECT sku, nome, quantidade, preco_unitario FROM itens_pedido "
+        "WHERE pedido_id = ? ORDER BY id",
+        (1,),
+        "idx_itens_pedido_pedido_id",
+    ),
+    "pedidos_por_periodo": (
+        "SELECT id, status FROM pedidos "
+        "WHERE criado_em >= ? AND criado_em <= ? ORDER BY criado_em, id",
+        ("2025-01-01T00:00:00", "2025-01-31T23:59:59"),
+        "idx_pedidos_criado_em",
+    ),
+    "pedidos_por_status": (
+        "SELECT id FROM pedidos WHERE status = ?",
+        ("PAGO",),
+        "idx_pedidos_status_criado_em",
+    ),
+    "pedidos_do_cliente": (
+        "SELECT id FROM pedidos WHERE cliente_id = ?",
+        (1,),
+        "idx_pedidos_cliente_id",
+    ),
+    "pagina_de_pedidos": (
+        "SELECT id FROM pedidos WHERE (criado_em, id) > (?, ?) "
+        "ORDER BY criado_em, id LIMIT ?",
+        ("2025-01-01T00:00:00", 1, 50),
+        "idx_pedidos_criado_em",
+    ),
+    "pagina_de_pedidos_por_status": (
+        "SELECT id FROM pedidos WHERE status = ? AND (criado_em, id) > (?, ?) "
+        "ORDER BY criado_em, id LIMIT ?",
+        ("PAGO", "2025-01-01T00:00:00", 1, 50),
+        "idx_pedidos_status_criado_em",
+    ),
+    "pagina_de_produtos_por_categoria": (
+        "SELECT sku FROM produtos WHERE categoria = ? AND sku > ? ORDER BY sku LIMIT ?",
+        ("LIVROS", 1, 50),
+        "idx_produtos_categoria",
+    ),
+    "movimentos_apos_checkpoint": (
+        "SELECT SUM(delta) FROM estoque_movimentos "
+        "WHERE sku = ? AND ts >= ? AND ts <= ? AND id > ?",
+        (1, "2025-01-01T00:00:00", "2025-01-02T00:00:00", 0),
+        "idx_estoque_movimentos_sku_ts",
+    ),
+    "checkpoint_de_estoque": (
+        "SELECT movimento_id, estoque FROM estoque_checkpoints WHERE sku = ? AND ts <= ? "
+        "ORDER BY ts DESC LIMIT 1",
+        (1, "2025-01-01T00:00:00"),
+        "idx_estoque_checkpoints_sku_ts",
+    ),
+    "pedido_da_chave_idempotencia": (
+        "SELECT pedido_id FROM chaves_idempotencia WHERE chave = ? AND expira_em > ?",
+        ("abc", "2025-01-01T00:00:00"),
+        "sqlite_autoindex_chaves_idempotencia_1",
+    ),
+    "enderecos_do_cliente": (
+        "SELECT id, cep, uf FROM enderecos WHERE cliente_id = ?",
+        (1,),
+        "idx_enderecos_cliente_id",
+    ),
+}
+
+
+def plano_consulta(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[str]:
+    """Retorna as linhas de EXPLAIN QUERY PLAN (coluna 'detail') da consulta."""
+    cur = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+    return [row[3] for row in cur.fetchall()]
+
+
+def verificar_planos(conn: sqlite3.Connection) -> Dict[str, bool]:
+    """
+    Roda EXPLAIN QUERY PLAN nas CONSULTAS_QUENTES e indica, para cada uma,
+    se o SQLite escolheu o índice esperado.
+    """
+    resultado: Dict[str, bool] = {}
+    for nome, (sql, params, indice) in CONSULTAS_QUENTES.items():
+        plano = plano_consulta(conn, sql, params)
+        resultado[nome] = any(indice in linha for linha in plano)
+    return resultado
@@ -0,0 +1,261 @@
+# pool.py
+# Pool de conexões SQLite reutilizáveis usado por db.get_connection().
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Union
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Conexão SQLite que volta para o pool ao ser fechada.
+
+    O código antigo faz `conn = get_connection()` ... `conn.close()`;
+    com esta subclasse o close() devolve a conexão ao pool em vez de
+    destruí-la, então esses chamadores continuam funcionando sem mudanças.
+    """
+
+    _pool: Optional["ConnectionPool"] = None
+    _em_uso: bool = False
+    # perfil de PRAGMAs aplicado por último (ver pragmas.py)
+    perfil: Optional[str] = None
+
+    def close(self) -> None:
+        pool = self._pool
+        if pool is None:
+            super().close()
+            return
+        pool.release(self)
+
+    def fechar_de_verdade(self) -> None:
+        """Fecha a conexão SQLite subjacente (usado pelo próprio pool)."""
+        self._pool = None
+        super().close()
+
+
+@dataclass(frozen=True)
+class PoolMetrics:
+    """
+    Fotografia das métricas do pool.
+
+    Atributos:
+    - tamanho: conexões abertas (ociosas + em uso)
+    - tamanho_maximo: limite de conexões simultâneas
+    - ociosas: conexões disponíveis para checkout imediato
+    - em_uso: conexões emprestadas no momento
+    - checkouts: total de conexões entregues pelo pool
+    - esperas: checkouts que precisaram aguardar uma conexão livre
+    - criadas: total de conexões SQLite abertas pelo pool
+    """
+    tamanho: int
+    tamanho_maximo: int
+    ociosas: int
+    em_uso: int
+    checkouts: int
+    esperas: int
+    criadas: int
+
+
+class ConnectionPool:
+    """
+    Pool limitado de conexões SQLite, seguro para uso entre threads.
+
+    - As conexões são criadas sob demanda até `tamanho_maximo`.
+    - Quando todas estão em uso, o checkout espera até `timeout` segundos.
+    - Conexões devolvidas voltam sem transação aberta (rollback automático),
+      igual ao comportamento de fechar uma conexão sem commit.
+    """
+
+    def __init__(
+        self,
+        database: Union[str, Path],
+        tamanho_maximo: int = 5,
+        timeout: float = 5.0,
+        configurar: Optional[Callable[[sqlite3.Connection], None]] = None,
+    ):
+        if not isinstance(tamanho_maximo, int):
+            raise TypeError("Error: tamanho_maximo must be an integer.")
+        if tamanho_maximo < 1:
+            raise ValueError("Error: tamanho_maximo must be at least 1.")
+        if not isinstance(timeout, (int, float)):
+            raise TypeError("Error: timeout must be a number.")
+        if timeout < 0:
+            raise ValueError("Error: timeout must be >= 0.")
+
+        self.__database = database
+        self.__tamanho_maximo = tamanho_maximo
+        self.__timeout = float(timeout)
+        self.__configurar = configurar
+
+        self.__cond = threading.Condition(threading.Lock())
+        # pilha (LIFO): a conexão usada por último tende a estar "quente"
+        self.__ociosas: List[PooledConnection] = []
+        self.__tamanho = 0
+        self.__checkouts = 0
+        self.__esperas = 0
+        self.__criadas = 0
+        self.__fechado = False
+        self.__pid = os.getpid()
+
+    # ===================== PROPRIEDADES =====================
+
+    @property
+    def database(self) -> Union[str, Path]:
+        return self.__database
+
+    @property
+    def tamanho_maximo(self) -> int:
+        return self.__tamanho_maximo
+
+    @property
+    def pid(self) -> int:
+        return self.__pid
+
+    # ===================== CHECKOUT / DEVOLUÇÃO =====================
+
+    def acquire(self) -> PooledConnection:
+        """
+        Empresta uma conexão do pool.
+        Lança TimeoutError se nenhuma conexão ficar livre dentro do timeout.
+        """
+        with self.__cond:
+            if self.__fechado:
+                raise RuntimeError("Error: connection pool is closed.")
+
+            if not self.__ociosas and self.__tamanho >= self.__tamanho_maximo:
+                self.__esperas += 1
+                limite = time.monotonic() + self.__timeout
+                while not self.__ociosas and self.__tamanho >= self.__tamanho_maximo:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        raise TimeoutError(
+                            f"Error: no connection available after {self.__timeout}s "
+                            f"(pool size {self.__tamanho_maximo})."
+                        )
+                    self.__cond.wait(restante)
+                    if self.__fechado:
+                        raise RuntimeError("Error: connection pool is closed.")
+
+            if self.__ociosas:
+                conn = self.__ociosas.pop()
+            else:
+                # reserva a vaga antes de abrir fora do lock
+                self.__tamanho += 1
+                conn = None
+
+            self.__checkouts += 1
+
+        if conn is None:
+            try:
+                conn = self.__abrir()
+            except BaseException:
+                with self.__cond:
+                    self.__tamanho -= 1
+                    self.__cond.notify()
+                raise
+
+        conn._em_uso = True
+        return conn
+
+    def release(self, conn: PooledConnection) -> None:
+        """
+        Devolve uma conexão ao pool.
+        Devolver duas vezes a mesma conexão não tem efeito.
+        """
+        if conn._pool is not self or not conn._em_uso:
+            return
+
+        conn._em_uso = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+            reutilizavel = True
+        except sqlite3.Error:
+            reutilizavel = False
+
+        with self.__cond:
+            if self.__fechado or not reutilizavel:
+                self.__tamanho -= 1
+                descartar = True
+            else:
+                self.__ociosas.append(conn)
+                descartar = False
+            self.__cond.notify()
+
+        if descartar:
+            conn.fechar_de_verdade()
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        """
+        Context manager que empresta uma conexão e a devolve no final:
+
+            with pool.connection() as conn:
+                conn.execute(...)
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    # ===================== MÉTRICAS / ENCERRAMENTO =====================
+
+    def metrics(self) -> PoolMetrics:
+        with self.__cond:
+            ociosas = len(self.__ociosas)
+            return PoolMetrics(
+                tamanho=self.__tamanho,
+                tamanho_maximo=self.__tamanho_maximo,
+                ociosas=ociosas,
+                em_uso=self.__tamanho - ociosas,
+                checkouts=self.__checkouts,
+                esperas=self.__esperas,
+                criadas=self.__criadas,
+            )
+
+    def close_all(self) -> None:
+        """
+        Fecha as conexões ociosas e impede novos checkouts.
+        Conexões ainda emprestadas são fechadas quando forem devolvidas.
+        """
+        with self.__cond:
+            self.__fechado = True
+            ociosas, self.__ociosas = self.__ociosas, []
+            self.__tamanho -= len(ociosas)
+            self.__cond.notify_all()
+
+        for conn in ociosas:
+            conn.fechar_de_verdade()
+
+    # ===================== INTERNOS =====================
+
+    def __abrir(self) -> PooledConnection:
+        # check_same_thread=False: a conexão pode ser devolvida por uma thread
+        # e emprestada para outra; o pool garante um único usuário por vez.
+        conn = sqlite3.connect(
+            self.__database,
+            factory=PooledConnection,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        if self.__configurar is not None:
+            self.__configurar(conn)
+        conn._pool = self
+        with self.__cond:
+            self.__criadas += 1
+        return conn
+
+    def __repr__(self) -> str:
+        m = self.metrics()
+        return (
+            f"ConnectionPool(database='{self.__database}', tamanho={m.tamanho}, "
+            f"tamanho_maximo={m.tamanho_maximo}, em_uso={m.em_uso})"
+        )
@@ -0,0 +1,103 @@
+# pragmas.py
+# Perfis de PRAGMA do SQLite aplicados pelas conexões de db.get_connection().
+from __future__ import annotations
+
+import sqlite3
+from typing import Any, Dict
+
+from loja.settings import carregar_settings
+
+
+# Todos os perfis definem TODAS as chaves: a mesma conexão do pool pode
+# alternar entre perfis, então nenhum valor pode "vazar" de um para outro.
+#
+# - journal_mode=WAL: leituras (relatórios) não bloqueiam escritas (checkout)
+#   e vice-versa; vale para o arquivo inteiro e persiste entre conexões.
+# - synchronous: NORMAL é seguro em WAL (só perde as últimas transações numa
+#   queda de energia, nunca corrompe); OFF só para cargas que podem ser refeitas.
+# - cache_size negativo = tamanho em KiB.
+# - busy_timeout em ms: espera o lock em vez de falhar na hora com SQLITE_BUSY.
+PERFIS_PRAGMA: Dict[str, Dict[str, Any]] = {
+    "oltp": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        "query_only": 0,
+    },
+    "bulk_load": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -256000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+        "query_only": 0,
+    },
+    "readonly_reports": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        "query_only": 1,
+    },
+}
+
+PERFIL_PADRAO = "oltp"
+
+# journal_mode primeiro: não pode ser trocado dentro de uma transação
+_ORDEM_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+    "busy_timeout",
+    "query_only",
+)
+
+
+def validar_perfil(nome: str) -> str:
+    if not isinstance(nome, str):
+        raise TypeError("Error: perfil must be a string.")
+    if nome not in PERFIS_PRAGMA:
+        raise ValueError(f"Error: perfil must be one of {sorted(PERFIS_PRAGMA)}.")
+    return nome
+
+
+def perfil_configurado() -> str:
+    """
+    Perfil padrão das conexões, lido de settings.json:
+
+        "banco": { "perfil_pragma": "oltp" }
+
+    Sem essa chave, usa PERFIL_PADRAO.
+    """
+    try:
+        settings = carregar_settings()
+    except FileNotFoundError:
+        return PERFIL_PADRAO
+    cfg_banco: Dict[str, Any] = settings.get("banco", {})
+    return validar_perfil(cfg_banco.get("perfil_pragma", PERFIL_PADRAO))
+
+
+def aplicar_perfil(conn: sqlite3.Connection, nome: str) -> None:
+    """
+    Aplica os PRAGMAs do perfil `nome` na conexão.
+    A conexão não pode estar com transação aberta.
+    """
+    perfil = PERFIS_PRAGMA[validar_perfil(nome)]
+    if conn.in_transaction:
+        raise RuntimeError("Error: cannot change pragma profile inside a transaction.")
+
+    for pragma in _ORDEM_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma} = {perfil[pragma]}")
+
+
+def ler_pragmas(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """Valores atuais dos PRAGMAs dos perfis (útil para diagnóstico/testes)."""
+    return {p: conn.execute(f"PRAGMA {p}").fetchone()[0] for p in _ORDEM_PRAGMAS}
@@ -5,7 +5,7 @@ Regras de negócio / Persistência de dados da aplicação.
 
 from __future__ import annotations
 from typing import Optional, List
-from typing import Dict, Any
+from typing import Dict, Any, Mapping
 from datetime import datetime
 from collections import Counter
 
@@ -20,54 +20,152 @@ from loja.persistence.db import (
     salvar_cupom,
     buscar_cupom_por_codigo,
     salvar_pedido,
+    registrar_checkout,
+    estornar_pedido,
+    sincronizar_estoque,
+    buscar_pedido_da_chave,
+    buscar_pedido_por_id,
     _carregar_itens_pedido,
     listar_pedidos,
+    iterar_pedidos,
 )
 
 from loja.src.carrinho import Carrinho
 from loja.src.cupom import Cupom
 from loja.src.frete import Frete
+from loja.src.frete_peso import MOTOR_FRETE
+from loja.src.idempotencia import IDEMPOTENCIA
 from loja.src.pedido import Pedido
 from loja.src.produto import Produto
 from loja.src.item_pedido import ItemPedido
 
-def fechar_pedido(carrinho, cliente, cupom: Cupom | None = None) -> Pedido:
-    # 1) Subtotal dos itens
-    subtotal = carrinho.calcular_subtotal()
-
-    # 2) Calcular frete a partir do cliente (regras isoladas em frete.py)
-    frete = Frete.from_cliente(cliente)  # Frete(uf_origem, uf_destino, valor, prazo_dias)
-
-    # 3) Criar pedido (sem desconto ainda, se você quiser)
-    pedido = Pedido(
-        cliente=cliente,
-        itens=carrinho.itens,
-        frete=frete,
-        cupom=cupom,
-        subtotal=subtotal,
-        desconto=0.0,
-        valor_frete=frete.valor,
-        total=0.0,
-        # ... resto dos campos
+def fechar_pedido(
+    carrinho,
+    cliente,
+    cupom: Cupom | None = None,
+    persistir: bool = False,
+    chave_idempotencia: str | None = None,
+    estoques_por_origem: Mapping[str, Mapping[str, int]] | None = None,
+) -> Pedido:
+    """
+    Fecha o carrinho em um Pedido.
+
+    Subtotal, desconto e total são calculados pelo próprio Pedido (o cupom
+    registra o uso quando dá desconto). Com persistir=True, o pedido é
+    gravado por registrar_checkout: baixa de estoque, resgate do cupom,
+    pedido e itens em uma só transação. Se ela falhar (ex.: sem estoque),
+    nada fica gravado e o uso do cupom em memória é desfeito.
+
+    chave_idempotencia (exige persistir=True): a mesma chave devolve
+    sempre o pedido da primeira chamada, sem baixar estoque nem usar o
+    cupom de novo. Uma chamada simultânea com a mesma chave espera a
+    primeira terminar.
+
+    As reservas do carrinho (RESERVAS, por padrão) passam para o pedido
+    conferidas contra o saldo do banco quando persistir=True; gravado o
+    checkout, o saldo já desconta as unidades e a reserva é liberada.
+
+    O frete sai do centro de distribuição mais barato que tem estoque de
+    todos os itens físicos (estoques_por_origem: uf_origem -> {sku:
+    quantidade}; None = todos atendem).
+    """
+    if chave_idempotencia is None:
+        return _fechar_pedido(carrinho, cliente, cupom, persistir, None, estoques_por_origem)
+    if not persistir:
+        raise ValueError("Error: chave_idempotencia requires persistir=True.")
+
+    criado: List[Pedido] = []
+
+    def executar() -> int:
+        pedido = _fechar_pedido(
+            carrinho, cliente, cupom, True, chave_idempotencia, estoques_por_origem
+        )
+        criado.append(pedido)
+        return pedido.id
+
+    pedido_id, repetido = IDEMPOTENCIA.executar(
+        chave_idempotencia, executar, buscar=buscar_pedido_da_chave
     )
+    return criado[0] if not repetido else _pedido_original(pedido_id)
+
+
+def _fechar_pedido(
+    carrinho,
+    cliente,
+    cupom: Cupom | None,
+    persistir: bool,
+    chave_idempotencia: str | None = None,
+    estoques_por_origem: Mapping[str, Mapping[str, int]] | None = None,
+) -> Pedido:
+    frete = _cotar_frete(carrinho, cliente, estoques_por_origem)
+
+    if persistir:
+        # a passagem da reserva do carrinho para o pedido confere o
+        # disponível contra o saldo do banco, não contra o da memória
+        sincronizar_estoque(item.produto for item in carrinho.itens)
+
+    pedido = Pedido.criar_de_carrinho(carrinho, frete=frete, cupom=cupom, cliente=cliente)
+
+    if persistir:
+        try:
+            pedido_id = registrar_checkout(pedido, chave_idempotencia=chave_idempotencia)
+        except BaseException:
+            pedido._desfazer_uso_cupom()
+            pedido._devolver_reservas(carrinho)
+            raise
+        if pedido_id != pedido.id:
+            # outro processo gravou a mesma chave antes: vale o pedido dele
+            pedido._desfazer_uso_cupom()
+            pedido._liberar_reservas()
+            return _pedido_original(pedido_id)
+        # as unidades já saíram do saldo (que registrar_checkout copiou para
+        # os produtos): segurá-las também na reserva as contaria duas vezes
+        pedido._liberar_reservas()
+
+    return pedido
 
-    # 4) Calcular desconto (cupom usa subtotal + frete do próprio pedido)
-    desconto = 0.0
-    if cupom is not None:
-        desconto = cupom.calcular_desconto_para_pedido(pedido)
 
-    # 5) Calcular total final
-    total = subtotal + frete.valor - desconto
-    if total < 0:
-        total = 0.0
+def cancelar_pedido(pedido: Pedido, persistir: bool = False) -> Pedido:
+    """
+    Cancela o pedido (regras de Pedido.cancelar).
 
-    pedido.desconto = desconto
-    pedido.total = total
+    Se o checkout baixou o estoque no banco (registrar_checkout), as
+    unidades voltam para lá por estornar_pedido, na mesma transação que
+    grava o cancelamento. Senão, com persistir=True, só grava o pedido.
+    """
+    pedido.cancelar()
+    if pedido._estoque_no_banco:
+        estornar_pedido(pedido)
+    elif persistir:
+        salvar_pedido(pedido)
+    return pedido
 
-    # 6) Registrar uso do cupom, se aplicável
-    if cupom is not None and desconto > 0:
-        cupom.registrar_uso()
 
+def _cotar_frete(
+    carrinho,
+    cliente,
+    estoques_por_origem: Mapping[str, Mapping[str, int]] | None = None,
+) -> Frete:
+    """
+    Frete dos itens do carrinho pelo peso real/cúbico (frete_peso.py),
+    saindo da origem mais barata que atende os itens. O destino vem do
+    endereço principal do cliente (Frete.from_cliente): se o CEP está numa
+    faixa da transportadora, o preço e o prazo dela substituem os da UF na
+    origem principal, escalados pelo peso como os da UF.
+    """
+    destino = Frete.from_cliente(cliente)
+    return MOTOR_FRETE.cotar_melhor_origem(
+        carrinho.itens,
+        destino.uf_destino,
+        estoques=estoques_por_origem,
+        cotacao_cep=destino,
+    )
+
+
+def _pedido_original(pedido_id: int) -> Pedido:
+    pedido = buscar_pedido_por_id(pedido_id)
+    if pedido is None:
+        raise ValueError(f"Error: pedido {pedido_id} of idempotency key not found.")
     return pedido
 
 def relatorio_ocupacao_periodo(inicio: datetime, fim: datetime) -> Dict[str, Any]:
@@ -86,23 +184,12 @@ def relatorio_ocupacao_periodo(inicio: datetime, fim: datetime) -> Dict[str, Any
     if inicio > fim:
         raise ValueError("Error: inicial datetime must be smaller than final datetime.")
     
-    #carrega os pedidos do banco de dados
-    pedidos = listar_pedidos()
-
-    pedidos_filtrados = []
-
-    for pedido in pedidos:
-        criado_em = pedido.criado_em #já é datetime
-
-        if criado_em is None :
-            continue
-        
-        #aplicação do filtro de intervalo
-        if inicio <= criado_em <= fim:
-            pedidos_filtrados.append(pedido)
+    #percorre só os pedidos do intervalo, sem carregar todos na memória
+    contador_status: Counter = Counter()
+    for pedido in iterar_pedidos(inicio=inicio, fim=fim):
+        contador_status[pedido.status] += 1
 
-    contador_status = Counter(p.status for p in pedidos_filtrados)
-    total = len(pedidos_filtrados)
+    total = sum(contador_status.values())
 
     #calculando percentuais
     percentual_por_status: Dict[str, float] = {}
@@ -0,0 +1,166 @@
+"""
+Carregamento do settings.json, compartilhado por frete, banco (pragmas) e
+o que mais precisar de configuração.
+
+- o arquivo fica em cache e é relido quando o mtime muda, conferido no
+  máximo a cada INTERVALO_VERIFICACAO segundos;
+- módulos podem registrar um compilador (registrar_compilador) que
+  transforma o settings numa estrutura pronta (ex.: a TabelaFrete). Na
+  recarga tudo é compilado antes da troca: se algum compilador falhar, o
+  settings e as estruturas anteriores continuam valendo.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Caminho para o settings.json, na raiz do repositório (loja/settings.py -> ../)
+SETTINGS_PATH = Path(__file__).resolve().parents[1] / "settings.json"
+
+# De quanto em quanto tempo (s) o mtime do settings.json é conferido.
+# Entre uma conferência e outra, leituras não fazem nenhuma chamada ao sistema.
+INTERVALO_VERIFICACAO = 1.0
+
+
+@dataclass(frozen=True)
+class MetricasSettings:
+    """
+    Contadores do recarregamento do settings.json.
+
+    Atributos:
+    - verificacoes: conferências do mtime do arquivo
+    - recargas: vezes em que o arquivo foi lido e recompilado
+    - falhas: recargas que falharam (JSON inválido); o estado anterior fica
+    - mtime_ns: mtime do arquivo carregado no momento
+    """
+    verificacoes: int
+    recargas: int
+    falhas: int
+    mtime_ns: Optional[int]
+
+
+# Estado carregado: (settings, {nome: compilado}). Trocado por atribuição
+# (atômica): quem já pegou uma estrutura antiga continua com ela inteira.
+_LOCK = threading.Lock()
+_COMPILADORES: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+_ESTADO: Tuple[Dict[str, Any], Dict[str, Any]] | None = None
+_CHAVE_CARREGADA: Tuple[str, int] | None = None  # (caminho, mtime_ns)
+_CAMINHO_VERIFICADO: Path | None = None
+_PROXIMA_VERIFICACAO = 0.0
+_VERIFICACOES = 0
+_RECARGAS = 0
+_FALHAS = 0
+
+
+def _compilar(settings: Dict[str, Any]) -> Dict[str, Any]:
+    return {nome: compilar(settings) for nome, compilar in _COMPILADORES.items()}
+
+
+def _em_dia(agora: float) -> bool:
+    # SETTINGS_PATH trocado (ex.: testes) também força a conferência
+    return (
+        _ESTADO is not None
+        and SETTINGS_PATH is _CAMINHO_VERIFICADO
+        and agora < _PROXIMA_VERIFICACAO
+    )
+
+
+def _atualizar_se_mudou(forcar: bool = False) -> None:
+    """Relê o settings.json se o arquivo (caminho ou mtime) mudou."""
+    global _ESTADO, _CHAVE_CARREGADA, _CAMINHO_VERIFICADO
+    global _PROXIMA_VERIFICACAO, _VERIFICACOES, _RECARGAS, _FALHAS
+
+    with _LOCK:
+        agora = time.monotonic()
+        if not forcar and _em_dia(agora):
+            return
+        _VERIFICACOES += 1
+
+        caminho = SETTINGS_PATH
+        mesmo_arquivo = _CHAVE_CARREGADA is not None and _CHAVE_CARREGADA[0] == str(caminho)
+        try:
+            chave = (str(caminho), os.stat(caminho).st_mtime_ns)
+        except FileNotFoundError:
+            if not mesmo_arquivo:
+                raise FileNotFoundError(f"settings.json not found at: {caminho}")
+            # arquivo sumiu (ex.: sendo substituído): mantém o que já foi lido
+            _CAMINHO_VERIFICADO = caminho
+            _PROXIMA_VERIFICACAO = agora + INTERVALO_VERIFICACAO
+            return
+
+        if forcar or chave != _CHAVE_CARREGADA:
+            try:
+                with open(caminho, "r", encoding="utf-8") as f:
+                    settings = json.load(f)
+                compilados = _compilar(settings)
+            except (ValueError, TypeError, AttributeError):
+                # JSON inválido ou pela metade: sem configuração anterior
+                # deste arquivo não há o que usar; com ela, tenta de novo
+                # na próxima conferência
+                if not mesmo_arquivo:
+                    raise
+                _FALHAS += 1
+            else:
+                _ESTADO, _CHAVE_CARREGADA = (settings, compilados), chave
+                _RECARGAS += 1
+
+        _CAMINHO_VERIFICADO = caminho
+        _PROXIMA_VERIFICACAO = agora + INTERVALO_VERIFICACAO
+
+
+def _estado() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    if not _em_dia(time.monotonic()):
+        _atualizar_se_mudou()
+    return _ESTADO
+
+
+def carregar_settings() -> Dict[str, Any]:
+    """
+    Carrega as configurações do arquivo settings.json.
+    Fica em cache e é relido quando o mtime do arquivo muda
+    (conferido no máximo a cada INTERVALO_VERIFICACAO segundos).
+    """
+    return _estado()[0]
+
+
+def recarregar_settings() -> Dict[str, Any]:
+    """Força a releitura do settings.json agora (ex.: após editar o arquivo)."""
+    _atualizar_se_mudou(forcar=True)
+    return _ESTADO[0]
+
+
+def registrar_compilador(nome: str, compilar: Callable[[Dict[str, Any]], Any]) -> None:
+    """
+    Registra `compilar(settings)`, chamado a cada recarga; o resultado sai
+    em compilado(nome).
+    """
+    with _LOCK:
+        _COMPILADORES[nome] = compilar
+
+
+def compilado(nome: str) -> Any:
+    """Estrutura do compilador `nome` para o settings.json atual."""
+    global _ESTADO
+    settings, compilados = _estado()
+    if nome in compilados:
+        return compilados[nome]
+    # registrado depois que o settings atual foi carregado
+    with _LOCK:
+        if _ESTADO[0] is settings and nome not in _ESTADO[1]:
+            _ESTADO = (settings, {**_ESTADO[1], nome: _COMPILADORES[nome](settings)})
+        return _ESTADO[1][nome]
+
+
+def metricas_settings() -> MetricasSettings:
+    with _LOCK:
+        return MetricasSettings(
+            verificacoes=_VERIFICACOES,
+            recargas=_RECARGAS,
+            falhas=_FALHAS,
+            mtime_ns=_CHAVE_CARREGADA[1] if _CHAVE_CARREGADA else None,
+        )
@@ -1,11 +1,20 @@
-import uuid
+from loja.src.gerador_id import gerar_id
 from loja.src.item_carrinho import ItemCarrinho
+from loja.src.reservas import RESERVAS
 
 class Carrinho:
-    def __init__(self, cliente, criado_em=None, atualizado_em=None, ativo=True):
+    def __init__(self, cliente, criado_em=None, atualizado_em=None, ativo=True, reservas=RESERVAS):
         self.__id = self.gerar__id()
         self.__cliente = cliente
-        self.__itens = []
+        # LivroReservas onde os itens reservam estoque (None: sem reservas)
+        self.__reservas = reservas
+        # sku -> ItemCarrinho; dict mantém a ordem de inserção
+        self.__itens = {}
+        # totais mantidos a cada alteração (evita re-somar todos os itens);
+        # subtotal em centavos inteiros para somas e subtrações não
+        # acumularem erro de ponto flutuante
+        self.__subtotal_centavos = 0
+        self.__quantidade_total = 0
         self.__criado_em = criado_em
         self.__atualizado_em = atualizado_em
         self.__ativo = ativo
@@ -17,7 +26,7 @@ class Carrinho:
         return self.__id
     
     def gerar__id(self):
-        return uuid.uuid4().int % 10000
+        return gerar_id()
 
     #getter e setter: CLIENTE
 
@@ -33,7 +42,13 @@ class Carrinho:
 
     @property
     def itens(self):
-        return self.__itens
+        return list(self.__itens.values())
+
+    #getter: RESERVAS
+
+    @property
+    def reservas(self):
+        return self.__reservas
 
     #getter e setter: CRIAÇÃO / ATUALIZAÇÃO
 
@@ -76,44 +91,69 @@ class Carrinho:
         if quantidade < 1:
             raise ValueError("Quantidade deve ser ≥ 1.")
 
-        for item in self.__itens:
-            if item.produto.sku == produto.sku:
-                item.quantidade += quantidade
-                return
-    
-        novo_item = ItemCarrinho(
-            produto=produto,
-            quantidade=quantidade,
-            preco_unitario=produto.preco
-        )
-        self.__itens.append(novo_item)
+        item = self.__itens.get(produto.sku)
+        if self.__reservas is not None:
+            # reserva antes de alterar: sem disponível, o carrinho fica igual
+            atual = item.quantidade if item is not None else 0
+            self.__reservas.reservar(produto, atual + quantidade, dono=self.__id)
+
+        if item is not None:
+            # o setter avisa o carrinho (_item_alterado)
+            item.quantidade += quantidade
+        else:
+            item = ItemCarrinho(
+                produto=produto,
+                quantidade=quantidade,
+                preco_unitario=produto.preco
+            )
+            self.__itens[produto.sku] = item
+            item._carrinho = self
+            self.__subtotal_centavos += item.subtotal_centavos()
+            self.__quantidade_total += quantidade
+
+    def _item_alterado(self, item, diferenca):
+        """Quantidade de um item mudou (por aqui ou direto em item.quantidade)."""
+        self.__subtotal_centavos += diferenca * item.preco_centavos
+        self.__quantidade_total += diferenca
 
     def remover_item(self, sku):
-        for item in self.__itens:
-            if item.produto.sku == sku:
-                self.__itens.remove(item)
-                return
-        raise ValueError(f"Produto com SKU {sku} não está no carrinho.")
-    
+        item = self.__itens.pop(sku, None)
+        if item is None:
+            raise ValueError(f"Produto com SKU {sku} não está no carrinho.")
+        if self.__reservas is not None:
+            self.__reservas.liberar(self.__id, sku)
+
+        item._carrinho = None
+        self.__quantidade_total -= item.quantidade
+        self.__subtotal_centavos -= item.subtotal_centavos()
+
     def alterar_quantidade(self, sku, nova_quantidade: int):
         if nova_quantidade < 1:
             raise ValueError("Quantidade deve ser maior ou igual a 1.")
 
-        for item in self.__itens:
-            if item.produto.sku == sku:
-                item.quantidade = nova_quantidade
-                return
-        
-        raise ValueError(f"Produto com SKU {sku} não encontrado no carrinho.")
-    
+        item = self.__itens.get(sku)
+        if item is None:
+            raise ValueError(f"Produto com SKU {sku} não encontrado no carrinho.")
+
+        if self.__reservas is not None:
+            self.__reservas.reservar(item.produto, nova_quantidade, dono=self.__id)
+
+        item.quantidade = nova_quantidade
+
     def calcular_subtotal(self):
-        return sum(item.subtotal() for item in self.__itens)
+        return self.__subtotal_centavos / 100
 
     def limpar(self):
+        if self.__reservas is not None:
+            self.__reservas.liberar(self.__id)
+        for item in self.__itens.values():
+            item._carrinho = None
         self.__itens.clear()
+        self.__subtotal_centavos = 0
+        self.__quantidade_total = 0
 
     def __len__(self):
-        return sum(item.quantidade for item in self.__itens)
+        return self.__quantidade_total
 
     def __str__(self):
         return (
@@ -0,0 +1,71 @@
+"""
+Catálogo de categorias internadas em ids inteiros.
+
+Cada categoria (normalizada: sem espaços nas pontas, maiúscula) recebe um
+id fixo e vira o bit `1 << id` de uma máscara. Um conjunto de categorias
+vira um int, e "alguma categoria em comum" vira um único AND:
+
+    mascara_de(["LIVROS", "JOGOS"]) & mascara_de(["livros "]) != 0
+
+Os ids nunca mudam depois de atribuídos, então máscaras calculadas antes
+continuam válidas quando novas categorias aparecem.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Optional
+
+
+def normalizar_categoria(categoria: str) -> str:
+    return categoria.strip().upper()
+
+
+class CatalogoCategorias:
+    """Atribui ids sequenciais (0, 1, 2...) às categorias conhecidas."""
+
+    __slots__ = ("__ids", "__nomes", "__lock")
+
+    def __init__(self):
+        self.__ids: Dict[str, int] = {}
+        self.__nomes: List[str] = []
+        self.__lock = threading.Lock()
+
+    def id_de(self, categoria: str) -> int:
+        """Id da categoria; categorias novas recebem o próximo id livre."""
+        nome = normalizar_categoria(categoria)
+        id_ = self.__ids.get(nome)
+        if id_ is not None:
+            return id_
+        with self.__lock:
+            id_ = self.__ids.get(nome)
+            if id_ is None:
+                id_ = len(self.__nomes)
+                self.__nomes.append(nome)
+                self.__ids[nome] = id_
+            return id_
+
+    def mascara(self, categorias: Iterable[Optional[str]]) -> int:
+        """Máscara com um bit por categoria (None e vazias são ignoradas)."""
+        mascara = 0
+        for categoria in categorias:
+            if isinstance(categoria, str) and categoria.strip():
+                mascara |= 1 << self.id_de(categoria)
+        return mascara
+
+    def categorias(self, mascara: int) -> List[str]:
+        """Operação inversa de mascara(): nomes dos bits ligados."""
+        return [nome for id_, nome in enumerate(self.__nomes) if mascara >> id_ & 1]
+
+    def __len__(self) -> int:
+        return len(self.__nomes)
+
+    def __repr__(self) -> str:
+        return f"CatalogoCategorias({len(self.__nomes)} categorias)"
+
+
+# Catálogo único do processo: máscaras só são comparáveis no mesmo catálogo
+CATALOGO = CatalogoCategorias()
+
+
+def mascara_de(categorias: Iterable[Optional[str]]) -> int:
+    return CATALOGO.mascara(categorias)
@@ -1,4 +1,4 @@
-import uuid
+from loja.src.gerador_id import gerar_id
 from loja.src.endereco import Endereco
 
 
@@ -33,7 +33,21 @@ class Cliente:
         return self.__id
 
     def gerar__id(self) -> int:
-        return uuid.uuid4().int % 10000
+        return gerar_id()
+
+    @classmethod
+    def from_row(cls, row) -> "Cliente":
+        """
+        Reconstrói um Cliente já persistido a partir de uma linha da tabela
+        clientes (sqlite3.Row ou dict), sem validar de novo e sem gerar id.
+        """
+        cliente = cls.__new__(cls)
+        cliente.__id = row["id"]
+        cliente.__nome = row["nome"]
+        cliente.__email = row["email"]
+        cliente.__cpf = row["cpf"]
+        cliente.__enderecos = []
+        return cliente
 
     # -------------------------------------------------------------------------
     # NOME
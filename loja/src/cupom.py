@@ -1,10 +1,29 @@
 from __future__ import annotations
+import json
+from dataclasses import dataclass
 from datetime import date, datetime
-from typing import List, Optional, TYPE_CHECKING
+from typing import Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from loja.src.categorias import mascara_de, normalizar_categoria
 
 if TYPE_CHECKING:
     from pedido import Pedido
 
+def mascara_do_pedido(pedido: "Pedido") -> int:
+    """
+    Máscara das categorias dos itens do pedido.
+    Usa a máscara pré-calculada do Pedido quando existe; para outros objetos
+    monta a partir de item.produto.categoria.
+    """
+    mascara = getattr(pedido, "mascara_categorias", None)
+    if isinstance(mascara, int):
+        return mascara
+    return mascara_de(
+        getattr(getattr(item, "produto", None), "categoria", None)
+        for item in getattr(pedido, "itens", [])
+    )
+
+
 class Cupom:
 
     TIPO_VALOR = "VALOR"
@@ -145,7 +164,38 @@ class Cupom:
         if not all(isinstance(cat, str) for cat in novas_categorias):
             raise TypeError("Error: every categoria must be a string.")
         # normaliza para maiúsculo e tira espaços
-        self.__categ_elegiveis = [cat.strip().upper() for cat in novas_categorias if cat.strip()]
+        self.__categ_elegiveis = [normalizar_categoria(cat) for cat in novas_categorias if cat.strip()]
+        # compila as categorias numa máscara de bits (ver categorias.py)
+        self.__mascara_categorias = mascara_de(self.__categ_elegiveis)
+
+    @property
+    def mascara_categorias(self) -> int:
+        """Máscara das categorias elegíveis (0 = sem restrição)."""
+        return self.__mascara_categorias
+
+    # ============== CONSTRUÇÃO A PARTIR DO BANCO ==============
+
+    @classmethod
+    def from_row(cls, row) -> "Cupom":
+        """
+        Reconstrói um Cupom já persistido a partir de uma linha da tabela
+        cupons (sqlite3.Row ou dict). Atribui direto, sem setters: código e
+        categorias já foram normalizados quando o cupom foi salvo.
+        """
+        cupom = cls.__new__(cls)
+        cupom.__codigo = row["codigo"]
+        cupom.__tipo = row["tipo"]
+        cupom.__valor = float(row["valor"])
+        cupom.__data_validade = (
+            date.fromisoformat(row["data_validade"]) if row["data_validade"] else None
+        )
+        cupom.__uso_maximo = row["uso_maximo"]
+        cupom.__usos_realizados = row["usos_realizados"]
+        cupom.__categ_elegiveis = (
+            json.loads(row["categorias_elegiveis"]) if row["categorias_elegiveis"] else []
+        )
+        cupom.__mascara_categorias = mascara_de(cupom.__categ_elegiveis)
+        return cupom
 
     # ============== MÉTODOS PRINCIPAIS ==============
 
@@ -180,7 +230,7 @@ class Cupom:
             # se há restrição de categorias e nenhuma categoria foi informada, considera não aplicável
             return False
 
-        return categoria.strip().lower() in self.categorias_elegiveis
+        return normalizar_categoria(categoria) in self.categorias_elegiveis
 
     def calcular_desconto(
         self,
@@ -217,6 +267,10 @@ class Cupom:
         if not self.aplicavel(categoria):
             return 0.0
 
+        return self._valor_do_desconto(subtotal, valor_frete)
+
+    def _valor_do_desconto(self, subtotal: float, valor_frete: float) -> float:
+        """Desconto pelo tipo do cupom, com validade e categoria já conferidas."""
         if self.tipo == self.TIPO_VALOR:
             desconto = self.valor
             
@@ -258,19 +312,9 @@ class Cupom:
         
         if not self.categorias_elegiveis:
             return True
-        
-        categorias_itens = set()
-
-        for item in getattr(pedido, "itens", []):
-            produto = getattr(item, "produto", None)
-            categoria = getattr(produto, "categoria", None)
-            if isinstance(categoria, str):
-                categorias_itens.add(categoria.strip().upper())
 
-        if not categorias_itens:
-            return False
-        
-        return any(cat in self.categorias_elegiveis for cat in categorias_itens)
+        # um único AND entre as máscaras do cupom e do pedido
+        return bool(self.__mascara_categorias & mascara_do_pedido(pedido))
     
     def calcular_desconto_para_pedido(
             self,
@@ -309,16 +353,12 @@ class Cupom:
         if not self.esta_valido_para_pedido(pedido, data_referencia=data_referencia):
             return 0.0
 
-        # Calcular desconto sem categoria específica (já validada)
-        desconto = self.calcular_desconto(
-            subtotal=subtotal,
-            categoria=None,
-            data_referencia=data_referencia,
-            valor_frete=valor_frete,
-        )
-
-        return desconto
+        if not isinstance(subtotal, (int, float)):
+            raise TypeError("Error: subtotal must be a number.")
 
+        # Categorias já validadas pelo pedido: não passa por aplicavel(None),
+        # que recusaria todo cupom com categorias_elegiveis
+        return self._valor_do_desconto(float(subtotal), valor_frete)
 
     def registrar_uso(self) -> None:
         """
@@ -337,3 +377,43 @@ class Cupom:
             f"data_validade={self.data_validade}, uso_maximo={self.uso_maximo}, "
             f"usos_realizados={self.usos_realizados}, categorias_elegiveis={self.categorias_elegiveis})"
         )
+
+
+@dataclass(frozen=True)
+class CuponsCompilados:
+    """
+    Cupons preparados para checagem em massa de elegibilidade.
+
+    A máscara de cada cupom fica num tuple paralelo: para um pedido, a
+    checagem de categoria é só `mascara == 0 or mascara & mascara_pedido`.
+    """
+    cupons: Tuple[Cupom, ...]
+    mascaras: Tuple[int, ...]
+
+    def elegiveis(
+        self,
+        mascara_pedido: int,
+        data_referencia: Optional[date] = None,
+    ) -> List[Cupom]:
+        """Cupons válidos (data/uso) cujas categorias casam com o pedido."""
+        if data_referencia is None:
+            data_referencia = date.today()
+        return [
+            cupom
+            for cupom, mascara in zip(self.cupons, self.mascaras)
+            if (mascara == 0 or mascara & mascara_pedido)
+            and cupom.esta_valido(data_referencia=data_referencia)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.cupons)
+
+
+def compilar_cupons(cupons: Iterable[Cupom]) -> CuponsCompilados:
+    cupons = tuple(cupons)
+    if not all(isinstance(c, Cupom) for c in cupons):
+        raise TypeError("Error: every item must be a Cupom object.")
+    return CuponsCompilados(
+        cupons=cupons,
+        mascaras=tuple(c.mascara_categorias for c in cupons),
+    )
@@ -1,6 +1,22 @@
-import uuid #geração de ID
+from loja.src.gerador_id import gerar_id #geração de ID
+
+
+def validar_formato_cep(cep) -> str:
+    """Regras do CEP (8 dígitos, só números); usada pelo setter e pelo frete."""
+    if not isinstance(cep, str):
+        raise TypeError("Error: cep must be a string.")
+    if len(cep) != 8:
+        raise ValueError("Error: cep must have 8 digits.")
+    if not cep.isdigit():
+        raise ValueError("Error: cep must have just numbers.")
+    return cep
+
 
 class Endereco:
+    __slots__ = (
+        "__id", "__cep", "__cidade", "__uf", "__logradouro", "__numero", "__complemento",
+    )
+
     def __init__(self, cep: str, cidade: str, uf: str, logradouro: str, numero: str, complemento: str|None):
         self.__id = self.gerar_id()
         self.__cep = cep
@@ -17,7 +33,7 @@ class Endereco:
         return self.__id
     
     def gerar_id(self):
-        return uuid.uuid4().int % 10000
+        return gerar_id()
     
 
 ###########################CEP##################################
@@ -28,13 +44,7 @@ class Endereco:
     
     @cep.setter
     def cep(self, novo_cep):
-        if not isinstance(novo_cep, str):
-            raise TypeError("Error: cep must be a string.")
-        if len(novo_cep) != 8:
-            raise ValueError("Error: cep must have 8 digits.")
-        if not novo_cep.isdigit():
-            raise ValueError("Error: cep must have just numbers.")
-        self.__cep = novo_cep
+        self.__cep = validar_formato_cep(novo_cep)
         
 ############################CIDADE##############################
         
@@ -0,0 +1,163 @@
+"""
+Alterações de estoque em memória seguras entre threads (lock striping).
+
+Um lock por SKU cresceria sem limite; um lock global serializaria todo o
+checkout. Aqui há um vetor fixo de locks ("listras") e o SKU escolhe a
+sua pelo hash: operações com SKUs diferentes quase sempre pegam listras
+diferentes e correm em paralelo, e só disputam quando há SKU em comum (ou,
+raramente, dois SKUs na mesma listra).
+
+Uma operação com vários SKUs pega todas as listras deles em ordem
+crescente de índice. Como todas as threads seguem a mesma ordem, nenhuma
+fica esperando uma listra que está com outra que espera a sua (deadlock).
+
+A conferência e a baixa acontecem com as listras presas, então duas
+threads pagando pedidos com o mesmo SKU não passam as duas pela
+conferência com o mesmo estoque.
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Listras padrão: potência de 2 bem maior que o número de workers, para
+# que SKUs diferentes raramente caiam na mesma
+N_LISTRAS = 64
+
+
+@dataclass(frozen=True)
+class MetricasEstoque:
+    """
+    Contadores do gerenciador de estoque.
+
+    Atributos:
+    - operacoes: baixas, estornos e ajustes concluídos
+    - recusas: baixas recusadas por estoque insuficiente
+    - esperas: listras que já estavam presas por outra thread ao pedir
+    """
+    operacoes: int
+    recusas: int
+    esperas: int
+
+
+def _estoque_de(produto) -> int:
+    estoque_atual = getattr(produto, "estoque", None)
+    if estoque_atual is None:
+        raise AttributeError("'Produto' doesn't have 'estoque' attribute.")
+    return estoque_atual
+
+
+def _agrupar_por_produto(itens: Iterable[Tuple[object, int]]) -> List[Tuple[object, int]]:
+    """Soma as quantidades do mesmo objeto produto (itens repetidos)."""
+    por_produto: Dict[int, Tuple[object, int]] = {}
+    for produto, quantidade in itens:
+        _estoque_de(produto)
+        _, acumulado = por_produto.get(id(produto), (produto, 0))
+        por_produto[id(produto)] = (produto, acumulado + quantidade)
+    return list(por_produto.values())
+
+
+class GerenciadorEstoque:
+    """Baixa, estorno e ajuste de Produto.estoque com um lock por listra de SKUs."""
+
+    def __init__(self, n_listras: int = N_LISTRAS):
+        if not isinstance(n_listras, int):
+            raise TypeError("Error: n_listras must be an integer.")
+        if n_listras < 1:
+            raise ValueError("Error: n_listras must be at least 1.")
+
+        self.__listras = tuple(threading.Lock() for _ in range(n_listras))
+        self.__lock_metricas = threading.Lock()
+        self.__operacoes = 0
+        self.__recusas = 0
+        self.__esperas = 0
+
+    # ===================== LISTRAS =====================
+
+    def listra(self, sku) -> int:
+        """Índice da listra do SKU."""
+        # hash(int) é o próprio número, e os SKUs do gerador_id têm os bits
+        # baixos (sequência no ms) quase sempre zerados: o hash da tupla
+        # mistura os bits antes do módulo
+        return hash((sku,)) % len(self.__listras)
+
+    @contextmanager
+    def travar(self, skus: Iterable) -> Iterator[None]:
+        """Prende as listras dos SKUs (sem repetir, em ordem crescente)."""
+        indices = sorted({self.listra(sku) for sku in skus})
+        presas: List[threading.Lock] = []
+        esperas = 0
+        try:
+            for indice in indices:
+                lock = self.__listras[indice]
+                if not lock.acquire(blocking=False):
+                    esperas += 1
+                    lock.acquire()
+                presas.append(lock)
+            yield
+        finally:
+            for lock in reversed(presas):
+                lock.release()
+            if esperas:
+                with self.__lock_metricas:
+                    self.__esperas += esperas
+
+    def __contar(self, operacoes: int = 0, recusas: int = 0) -> None:
+        with self.__lock_metricas:
+            self.__operacoes += operacoes
+            self.__recusas += recusas
+
+    # ===================== OPERAÇÕES =====================
+
+    def baixar(self, itens: Iterable[Tuple[object, int]]) -> None:
+        """
+        Tira as quantidades de (produto, quantidade), tudo ou nada: se
+        algum produto não tem estoque suficiente, nenhum muda e sobe
+        ValueError.
+        """
+        itens = _agrupar_por_produto(itens)
+        with self.travar(produto.sku for produto, _ in itens):
+            for produto, quantidade in itens:
+                estoque_atual = produto.estoque
+                if quantidade > estoque_atual:
+                    self.__contar(recusas=1)
+                    raise ValueError(
+                        f"Estoque insuficiente para o produto {produto.nome}: "
+                        f"solicitado {quantidade}, disponível {estoque_atual}."
+                    )
+            for produto, quantidade in itens:
+                produto.estoque = produto.estoque - quantidade
+        self.__contar(operacoes=1)
+
+    def estornar(self, itens: Iterable[Tuple[object, int]]) -> None:
+        """Devolve as quantidades de (produto, quantidade) ao estoque."""
+        itens = _agrupar_por_produto(itens)
+        with self.travar(produto.sku for produto, _ in itens):
+            for produto, quantidade in itens:
+                produto.estoque = produto.estoque + quantidade
+        self.__contar(operacoes=1)
+
+    def ajustar(self, produto, delta: int) -> None:
+        """Produto.ajustar_estoque com a listra do SKU presa."""
+        with self.travar((produto.sku,)):
+            produto.ajustar_estoque(delta)
+        self.__contar(operacoes=1)
+
+    # ===================== MÉTRICAS =====================
+
+    def metricas(self) -> MetricasEstoque:
+        with self.__lock_metricas:
+            return MetricasEstoque(
+                operacoes=self.__operacoes,
+                recusas=self.__recusas,
+                esperas=self.__esperas,
+            )
+
+    def __repr__(self) -> str:
+        return f"GerenciadorEstoque(listras={len(self.__listras)})"
+
+
+# Gerenciador único do processo, usado pelos pedidos
+ESTOQUE = GerenciadorEstoque()
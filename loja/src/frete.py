@@ -1,32 +1,336 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict
-import json
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+import csv
+import math
+import os
+import threading
+import time
 
+from loja import settings as _settings
+# carregar_settings/metricas_settings continuam acessíveis por aqui
+from loja.settings import MetricasSettings, carregar_settings, metricas_settings
+from loja.src.endereco import validar_formato_cep
 
-# Caminho para o settings.json (ajuste se estiver em outro lugar)
-SETTINGS_PATH = Path(__file__).resolve().parent.parent / "settings.json"
 
-# Cache simples em memória
-_SETTINGS_CACHE: Dict[str, Any] | None = None
+# Faixas de CEP da transportadora (CSV), ao lado do settings.json.
+# Sem o arquivo, todo CEP cai na tabela por UF.
+FAIXAS_CEP_PATH = Path(__file__).resolve().parents[2] / "faixas_cep.csv"
 
 
-def carregar_settings() -> Dict[str, Any]:
+@dataclass(frozen=True)
+class FaixasPeso:
     """
-    Carrega as configurações do arquivo settings.json.
-    Usa cache para evitar reabrir o arquivo o tempo todo.
+    Tabela de preço por faixa de peso de uma UF (imutável).
+
+    Atributos:
+    - limites_kg: limite superior (inclusive) de cada faixa, crescente
+    - valores: preço de cada faixa
+    - adicional_por_kg: preço de cada kg (ou fração) acima do último limite
+    """
+    limites_kg: Tuple[float, ...]
+    valores: Tuple[float, ...]
+    adicional_por_kg: float
+
+    def faixa(self, peso_kg: float) -> int:
+        """
+        Índice da faixa do peso. Acima do último limite, cada kg (ou fração)
+        excedente vira uma faixa a mais, então pesos com o mesmo índice têm
+        sempre o mesmo preço.
+        """
+        i = bisect_left(self.limites_kg, peso_kg)
+        if i < len(self.limites_kg):
+            return i
+        excedente = peso_kg - self.limites_kg[-1]
+        return len(self.limites_kg) - 1 + math.ceil(excedente)
+
+    def valor_da_faixa(self, faixa: int) -> float:
+        ultima = len(self.valores) - 1
+        if faixa <= ultima:
+            return self.valores[faixa]
+        return round(self.valores[ultima] + (faixa - ultima) * self.adicional_por_kg, 2)
+
+
+@dataclass(frozen=True)
+class TabelaFrete:
+    """
+    Tabela de frete compilada a partir do settings.json (imutável).
+
+    Atributos:
+    - uf_origem: UF do centro de distribuição
+    - por_uf: UF de destino -> (valor, prazo_dias), já convertidos
+    - padrao: (valor, prazo_dias) para UFs fora da tabela
+    - fator_cubagem: cm³ por kg no cálculo do peso cúbico
+    - faixas_peso: UF de destino -> FaixasPeso (vazio = frete fixo por UF)
+    - faixas_peso_padrao: FaixasPeso das UFs fora da tabela
     """
-    global _SETTINGS_CACHE
+    uf_origem: str
+    por_uf: Mapping[str, Tuple[float, int]]
+    padrao: Tuple[float, int]
+    fator_cubagem: float = 6000.0
+    faixas_peso: Mapping[str, FaixasPeso] = field(default_factory=lambda: MappingProxyType({}))
+    faixas_peso_padrao: Optional[FaixasPeso] = None
+    origens: Tuple[TabelaFrete, ...] = ()
+    matriz: Mapping[str, Tuple[Tuple[float, int], ...]] = field(
+        default_factory=lambda: MappingProxyType({})
+    )
+    matriz_padrao: Tuple[Tuple[float, int], ...] = ()
+
+    def cotar(self, uf_destino: str) -> Tuple[float, int]:
+        return self.por_uf.get(uf_destino, self.padrao)
+
+    def faixas_peso_de(self, uf_destino: str) -> Optional[FaixasPeso]:
+        return self.faixas_peso.get(uf_destino, self.faixas_peso_padrao)
 
-    if _SETTINGS_CACHE is None:
-        if not SETTINGS_PATH.exists():
-            raise FileNotFoundError(f"settings.json not found at: {SETTINGS_PATH}")
+    def cotar_origens(self, uf_destino: str) -> Tuple[Tuple[float, int], ...]:
+        """(valor, prazo_dias) de cada origem, na ordem de `origens`."""
+        return self.matriz.get(uf_destino, self.matriz_padrao)
 
-        with open(SETTINGS_PATH, "r", encoding="utf-8") as f:
-            _SETTINGS_CACHE = json.load(f)
+    def origem(self, uf_origem: str) -> TabelaFrete:
+        """Tabela de uma das origens (centros de distribuição)."""
+        for tabela in self.origens:
+            if tabela.uf_origem == uf_origem:
+                return tabela
+        raise ValueError(f"Error: unknown uf_origem '{uf_origem}'.")
 
-    return _SETTINGS_CACHE
+
+def _compilar_faixas_peso(cfg: Dict[str, Any], valor_base: float) -> FaixasPeso:
+    """Faixas de peso de uma UF: multiplicadores aplicados ao valor da UF."""
+    limites = tuple(float(l) for l in cfg["limites_kg"])
+    multiplicadores = tuple(float(m) for m in cfg["multiplicadores"])
+    if not limites or len(limites) != len(multiplicadores):
+        raise ValueError("Error: faixas_peso needs one multiplicador per limite_kg.")
+    if any(a >= b for a, b in zip(limites, limites[1:])):
+        raise ValueError("Error: faixas_peso limites_kg must be increasing.")
+    return FaixasPeso(
+        limites_kg=limites,
+        valores=tuple(round(valor_base * m, 2) for m in multiplicadores),
+        adicional_por_kg=round(valor_base * float(cfg.get("adicional_por_kg", 0.0)), 2),
+    )
+
+
+def _compilar_origem(cfg_frete: Dict[str, Any]) -> TabelaFrete:
+    """Tabela de uma única origem (sem a matriz)."""
+    tabela_por_uf: Dict[str, Any] = cfg_frete.get("tabela_por_uf", {})
+    default_cfg: Dict[str, Any] = cfg_frete.get("default", {})
+
+    padrao = (float(default_cfg.get("valor", 0.0)), int(default_cfg.get("prazo", 0)))
+    por_uf = {
+        uf.strip().upper(): (
+            float(dados.get("valor", default_cfg.get("valor", 0.0))),
+            int(dados.get("prazo", default_cfg.get("prazo", 0))),
+        )
+        for uf, dados in tabela_por_uf.items()
+    }
+
+    # Faixas de peso: "faixas_peso" vale para todas as UFs, escalado pelo
+    # valor de cada uma; "faixas_peso_por_uf" substitui para UFs específicas
+    cfg_peso: Optional[Dict[str, Any]] = cfg_frete.get("faixas_peso")
+    cfg_peso_por_uf: Dict[str, Any] = {
+        uf.strip().upper(): cfg for uf, cfg in cfg_frete.get("faixas_peso_por_uf", {}).items()
+    }
+    faixas_peso: Dict[str, FaixasPeso] = {}
+    for uf, (valor, _prazo) in por_uf.items():
+        cfg = cfg_peso_por_uf.get(uf, cfg_peso)
+        if cfg is not None:
+            faixas_peso[uf] = _compilar_faixas_peso(cfg, valor)
+
+    return TabelaFrete(
+        uf_origem=cfg_frete.get("uf_origem", "CE").strip().upper(),
+        por_uf=MappingProxyType(por_uf),
+        padrao=padrao,
+        fator_cubagem=float(cfg_frete.get("fator_cubagem", 6000.0)),
+        faixas_peso=MappingProxyType(faixas_peso),
+        faixas_peso_padrao=(
+            _compilar_faixas_peso(cfg_peso, padrao[0]) if cfg_peso is not None else None
+        ),
+    )
+
+
+def compilar_tabela_frete(settings: Dict[str, Any]) -> TabelaFrete:
+    """
+    Converte a seção "frete" do settings em uma TabelaFrete.
+
+    A origem principal (uf_origem) usa as chaves do próprio "frete". Cada
+    entrada de "origens_adicionais" é outro centro de distribuição: herda
+    essas chaves e substitui as que informar (ex.: tabela_por_uf, default,
+    faixas_peso), menos fator_cubagem, que vale para todas.
+    A matriz destino -> (valor, prazo) por origem é montada aqui, então
+    cotar todas as origens é uma busca e uma tupla de tamanho len(origens).
+    """
+    cfg_frete: Dict[str, Any] = dict(settings.get("frete", {}))
+    cfg_adicionais: Dict[str, Any] = cfg_frete.pop("origens_adicionais", {})
+
+    principal = _compilar_origem(cfg_frete)
+    origens = [principal]
+    for uf_origem, cfg_origem in cfg_adicionais.items():
+        uf_origem = uf_origem.strip().upper()
+        if any(o.uf_origem == uf_origem for o in origens):
+            raise ValueError(f"Error: duplicated uf_origem '{uf_origem}'.")
+        # fator_cubagem é um só: o peso do pedido não depende da origem
+        origens.append(_compilar_origem({
+            **cfg_frete, **cfg_origem,
+            "uf_origem": uf_origem,
+            "fator_cubagem": principal.fator_cubagem,
+        }))
+
+    destinos = set().union(*(o.por_uf for o in origens))
+    matriz = {uf: tuple(o.cotar(uf) for o in origens) for uf in sorted(destinos)}
+
+    return TabelaFrete(
+        uf_origem=principal.uf_origem,
+        por_uf=principal.por_uf,
+        padrao=principal.padrao,
+        fator_cubagem=principal.fator_cubagem,
+        faixas_peso=principal.faixas_peso,
+        faixas_peso_padrao=principal.faixas_peso_padrao,
+        origens=tuple(origens),
+        matriz=MappingProxyType(matriz),
+        matriz_padrao=tuple(o.padrao for o in origens),
+    )
+
+
+_settings.registrar_compilador("frete", compilar_tabela_frete)
+
+
+def tabela_frete() -> TabelaFrete:
+    """Tabela de frete compilada do settings.json atual (ver loja/settings.py)."""
+    return _settings.compilado("frete")
+
+
+def recarregar_settings() -> TabelaFrete:
+    """Força a releitura do settings.json agora (ex.: após editar o arquivo)."""
+    _settings.recarregar_settings()
+    return tabela_frete()
+
+
+# ===================== FAIXAS DE CEP =====================
+
+@dataclass(frozen=True)
+class TabelaFaixasCep:
+    """
+    Faixas de CEP compiladas do FAIXAS_CEP_PATH (imutável).
+
+    A faixa i vai de inicios[i] a fins[i] (inclusive, CEPs como inteiros).
+    As faixas ficam ordenadas por início e não se sobrepõem, então a busca
+    é um bisect em `inicios` seguido de uma comparação com `fins`.
+    """
+    inicios: Sequence[int]
+    fins: Sequence[int]
+    ufs: Tuple[str, ...]
+    valores: Sequence[float]
+    prazos: Sequence[int]
+
+    def buscar(self, cep: int) -> Optional[int]:
+        """Posição da faixa que contém o CEP (None se nenhuma contém)."""
+        i = bisect_right(self.inicios, cep) - 1
+        if i >= 0 and cep <= self.fins[i]:
+            return i
+        return None
+
+    def __len__(self) -> int:
+        return len(self.inicios)
+
+
+def compilar_faixas_cep(linhas) -> TabelaFaixasCep:
+    """
+    Converte linhas (dicts com cep_inicio, cep_fim, uf, valor, prazo) em uma
+    TabelaFaixasCep. Faixas sobrepostas são erro: o preço ficaria ambíguo.
+    """
+    faixas = []
+    for linha in linhas:
+        inicio = int(validar_formato_cep(linha["cep_inicio"].strip()))
+        fim = int(validar_formato_cep(linha["cep_fim"].strip()))
+        if fim < inicio:
+            raise ValueError(f"Error: invalid CEP range {inicio:08d}-{fim:08d}.")
+        faixas.append((
+            inicio, fim, linha["uf"].strip().upper(), float(linha["valor"]), int(linha["prazo"]),
+        ))
+    faixas.sort()
+
+    for anterior, atual in zip(faixas, faixas[1:]):
+        if atual[0] <= anterior[1]:
+            raise ValueError(
+                f"Error: overlapping CEP ranges {anterior[0]:08d}-{anterior[1]:08d} "
+                f"and {atual[0]:08d}-{atual[1]:08d}."
+            )
+
+    # arrays compactos: dezenas de milhares de faixas sem um objeto por número
+    return TabelaFaixasCep(
+        inicios=array("l", (f[0] for f in faixas)),
+        fins=array("l", (f[1] for f in faixas)),
+        ufs=tuple(f[2] for f in faixas),
+        valores=array("d", (f[3] for f in faixas)),
+        prazos=array("l", (f[4] for f in faixas)),
+    )
+
+
+_FAIXAS_VAZIAS = compilar_faixas_cep(())
+_LOCK = threading.Lock()
+_FAIXAS: TabelaFaixasCep | None = None
+_CHAVE_FAIXAS: Tuple[str, Optional[int]] | None = None  # (caminho, mtime_ns)
+_CAMINHO_FAIXAS_VERIFICADO: Path | None = None
+_PROXIMA_VERIFICACAO_FAIXAS = 0.0
+
+
+def _atualizar_faixas_se_mudou(forcar: bool = False) -> None:
+    """Relê o arquivo de faixas se ele mudou, apareceu ou sumiu."""
+    global _FAIXAS, _CHAVE_FAIXAS, _CAMINHO_FAIXAS_VERIFICADO, _PROXIMA_VERIFICACAO_FAIXAS
+
+    with _LOCK:
+        agora = time.monotonic()
+        if (
+            not forcar
+            and _FAIXAS is not None
+            and FAIXAS_CEP_PATH is _CAMINHO_FAIXAS_VERIFICADO
+            and agora < _PROXIMA_VERIFICACAO_FAIXAS
+        ):
+            return
+
+        caminho = FAIXAS_CEP_PATH
+        try:
+            chave = (str(caminho), os.stat(caminho).st_mtime_ns)
+        except FileNotFoundError:
+            chave = (str(caminho), None)
+
+        if forcar or chave != _CHAVE_FAIXAS:
+            if chave[1] is None:
+                faixas = _FAIXAS_VAZIAS
+            else:
+                try:
+                    with open(caminho, "r", encoding="utf-8", newline="") as f:
+                        faixas = compilar_faixas_cep(csv.DictReader(f))
+                except (ValueError, KeyError, AttributeError):
+                    # arquivo inválido: mantém as faixas já carregadas dele
+                    if _CHAVE_FAIXAS is None or _CHAVE_FAIXAS[0] != chave[0]:
+                        raise
+                    faixas = _FAIXAS
+                    chave = _CHAVE_FAIXAS
+            _FAIXAS, _CHAVE_FAIXAS = faixas, chave
+
+        _CAMINHO_FAIXAS_VERIFICADO = caminho
+        _PROXIMA_VERIFICACAO_FAIXAS = agora + _settings.INTERVALO_VERIFICACAO
+
+
+def tabela_faixas_cep() -> TabelaFaixasCep:
+    """Faixas de CEP atuais (vazia se o arquivo não existe)."""
+    if (
+        _FAIXAS is None
+        or FAIXAS_CEP_PATH is not _CAMINHO_FAIXAS_VERIFICADO
+        or time.monotonic() >= _PROXIMA_VERIFICACAO_FAIXAS
+    ):
+        _atualizar_faixas_se_mudou()
+    return _FAIXAS
+
+
+def recarregar_faixas_cep() -> TabelaFaixasCep:
+    """Força a releitura do arquivo de faixas agora."""
+    _atualizar_faixas_se_mudou(forcar=True)
+    return _FAIXAS
 
 
 @dataclass
@@ -39,17 +343,20 @@ class Frete:
     - uf_destino: UF do cliente
     - valor: valor do frete em R$
     - prazo_dias: prazo estimado em dias úteis
+    - faixa_cep: (início, fim) da faixa de CEP usada, ou None se veio da UF
     """
     uf_origem: str
     uf_destino: str
     valor: float
     prazo_dias: int
+    faixa_cep: Optional[Tuple[str, str]] = None
 
     @classmethod
-    def from_uf_destino(cls, uf_destino: str) -> Frete:
+    def from_uf_destino(cls, uf_destino: str, uf_origem: Optional[str] = None) -> Frete:
         """
         Cria um objeto Frete apenas com base na UF de destino,
         usando as configurações do settings.json.
+        Sem uf_origem, sai da origem principal.
         """
         if not isinstance(uf_destino, str):
             raise TypeError("Error: uf_destino must be a string.")
@@ -58,23 +365,11 @@ class Frete:
         if len(uf_destino) != 2:
             raise ValueError("Error: uf_destino must have 2 characters (e.g., 'CE').")
 
-        settings = carregar_settings()
-        cfg_frete: Dict[str, Any] = settings.get("frete", {})
-
-        uf_origem = cfg_frete.get("uf_origem", "CE")
-
-        tabela_por_uf: Dict[str, Any] = cfg_frete.get("tabela_por_uf", {})
-        default_cfg: Dict[str, Any] = cfg_frete.get("default", {})
-
-        dados_uf = tabela_por_uf.get(uf_destino)
-
-        if dados_uf is not None:
-            valor = float(dados_uf.get("valor", default_cfg.get("valor", 0.0)))
-            prazo = int(dados_uf.get("prazo", default_cfg.get("prazo", 0)))
-        else:
-            # UF não encontrada, usa valores padrão
-            valor = float(default_cfg.get("valor", 0.0))
-            prazo = int(default_cfg.get("prazo", 0))
+        tabela = tabela_frete()
+        if uf_origem is not None:
+            tabela = tabela.origem(uf_origem.strip().upper())
+        valor, prazo = tabela.cotar(uf_destino)
+        uf_origem = tabela.uf_origem
 
         return cls(
             uf_origem=uf_origem,
@@ -83,37 +378,68 @@ class Frete:
             prazo_dias=prazo,
         )
 
+    @classmethod
+    def from_cep(cls, cep: str, uf_destino: Optional[str] = None) -> Frete:
+        """
+        Cria um objeto Frete pela faixa de CEP da transportadora.
+
+        CEP fora de todas as faixas (ou sem arquivo de faixas) usa a tabela
+        por UF com uf_destino; sem uf_destino, é erro.
+        """
+        cep = validar_formato_cep(cep)
+
+        faixas = tabela_faixas_cep()
+        i = faixas.buscar(int(cep))
+        if i is None:
+            if uf_destino is None:
+                raise ValueError(f"Error: cep {cep} is not in any freight range and uf_destino was not given.")
+            return cls.from_uf_destino(uf_destino)
+
+        return cls(
+            uf_origem=tabela_frete().uf_origem,
+            uf_destino=faixas.ufs[i],
+            valor=faixas.valores[i],
+            prazo_dias=faixas.prazos[i],
+            faixa_cep=(f"{faixas.inicios[i]:08d}", f"{faixas.fins[i]:08d}"),
+        )
+
+    @classmethod
+    def from_endereco(cls, endereco) -> Frete:
+        """Frete pelo CEP do Endereco, com a UF dele como alternativa."""
+        return cls.from_cep(endereco.cep, uf_destino=endereco.uf)
+
     @classmethod
     def from_cliente(cls, cliente) -> Frete:
         """
         Calcula o frete a partir de um objeto Cliente.
 
         Suposições:
-        - cliente.endereco é uma lista de Endereco
+        - cliente.enderecos é uma lista de Endereco
         - Endereco possui atributo/propriedade 'uf'
         """
-        if not hasattr(cliente, "endereco"):
-            raise AttributeError("Error: cliente has no attribute 'endereco'.")
+        if not hasattr(cliente, "enderecos"):
+            raise AttributeError("Error: cliente has no attribute 'enderecos'.")
 
-        enderecos = cliente.endereco
+        enderecos = cliente.enderecos
 
         if not isinstance(enderecos, list) or not enderecos:
-            raise ValueError("Error: cliente.endereco must be a non-empty list of Endereco objects.")
+            raise ValueError("Error: cliente.enderecos must be a non-empty list of Endereco objects.")
 
         endereco_principal = enderecos[0]
 
         if not hasattr(endereco_principal, "uf"):
             raise AttributeError("Error: Endereco object must have attribute 'uf'.")
 
-        uf_destino = endereco_principal.uf
-        return cls.from_uf_destino(uf_destino)
+        return cls.from_endereco(endereco_principal)
 
     def __repr__(self) -> str:
         return (
             f"Frete(uf_origem='{self.uf_origem}', "
             f"uf_destino='{self.uf_destino}', "
             f"valor={self.valor:.2f}, "
-            f"prazo_dias={self.prazo_dias})"
+            f"prazo_dias={self.prazo_dias}"
+            + (f", faixa_cep={self.faixa_cep}" if self.faixa_cep else "")
+            + ")"
         )
 
 
@@ -0,0 +1,266 @@
+"""
+Frete por peso: peso real e peso cúbico dos itens físicos do pedido.
+
+Para cada pedido (ou carrinho):
+- só entram itens cujo produto é ProdutoFisico; ProdutoDigital e itens sem
+  produto não pesam nada;
+- peso real = soma de peso * quantidade;
+- peso cúbico = soma de cubagem (cm³) / fator_cubagem * quantidade;
+- peso taxável = o maior dos dois, procurado nas faixas de peso da UF.
+
+Com vários centros de distribuição, cotar_melhor_origem() escolhe, entre
+as origens com estoque para todos os itens físicos, a mais barata ou a
+mais rápida. A cotação da faixa de CEP da transportadora (Frete.from_cep),
+quando houver, substitui o preço e o prazo da UF na origem dela; as
+faixas de peso escalam esse preço do mesmo jeito que escalam o da UF. A linha da matriz origem x destino (TabelaFrete.matriz) é
+lida uma vez por cotação, então o custo é O(origens).
+
+O peso de envio de cada SKU é calculado uma vez e guardado. As cotações
+ficam em cache por (origem, UF, faixa de peso), já que todo peso da mesma
+faixa tem o mesmo preço. Os dois caches são descartados quando o
+settings.json é recarregado.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+from loja.src.frete import Frete, TabelaFrete, tabela_frete
+from loja.src.produto_fisico import ProdutoFisico
+
+
+CRITERIO_PRECO = "PRECO"
+CRITERIO_PRAZO = "PRAZO"
+
+
+def _sku_do_item(item) -> str:
+    # ItemPedido guarda o sku; ItemCarrinho só tem o produto
+    sku = getattr(item, "sku", None)
+    return sku if sku is not None else str(item.produto.sku)
+
+
+def _atende(estoque: Mapping[str, int], necessidade: Dict[str, int]) -> bool:
+    return all(estoque.get(sku, 0) >= quantidade for sku, quantidade in necessidade.items())
+
+
+class MotorFrete:
+    """
+    Cotação de frete por peso com caches por SKU e por (origem, UF, faixa).
+
+    Ao alterar peso ou medidas de um produto já cotado, chame
+    atualizar_produto() para refazer o peso dele.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__tabela: Optional[TabelaFrete] = None
+        self.__pesos: Dict[object, Tuple[float, float]] = {}
+        self.__cotacoes: Dict[Tuple[str, str, int], Tuple[float, int]] = {}
+        self.__acertos = 0
+        self.__faltas = 0
+
+    def __tabela_atual(self) -> TabelaFrete:
+        tabela = tabela_frete()
+        if tabela is not self.__tabela:
+            # settings recarregado: fator de cubagem e preços podem ter mudado
+            with self.__lock:
+                if tabela is not self.__tabela:
+                    self.__pesos = {}
+                    self.__cotacoes = {}
+                    self.__tabela = tabela
+        return tabela
+
+    # ===================== PESOS =====================
+
+    def peso_envio(self, produto) -> Tuple[float, float]:
+        """(peso real, peso cúbico) de uma unidade; (0.0, 0.0) se não é físico."""
+        return self.__peso_envio(produto, self.__tabela_atual())
+
+    def __peso_envio(self, produto, tabela: TabelaFrete) -> Tuple[float, float]:
+        if not isinstance(produto, ProdutoFisico):
+            return (0.0, 0.0)
+        pesos = self.__pesos.get(produto.sku)
+        if pesos is None:
+            pesos = (produto.peso, produto.calcular_cubagem() / tabela.fator_cubagem)
+            self.__pesos[produto.sku] = pesos
+        return pesos
+
+    def atualizar_produto(self, produto) -> None:
+        """Descarta o peso guardado do produto (após mudar peso/medidas)."""
+        self.__pesos.pop(produto.sku, None)
+
+    def peso_taxavel(self, itens: Iterable) -> float:
+        """Maior entre peso real e peso cúbico dos itens físicos (kg)."""
+        return self.__peso_taxavel(itens, self.__tabela_atual())
+
+    def __peso_taxavel(self, itens: Iterable, tabela: TabelaFrete) -> float:
+        pesos = self.__pesos
+        real = cubico = 0.0
+        for item in itens:
+            produto = getattr(item, "produto", None)
+            if not isinstance(produto, ProdutoFisico):
+                continue
+            peso, peso_cubico = pesos.get(produto.sku) or self.__peso_envio(produto, tabela)
+            quantidade = item.quantidade
+            real += peso * quantidade
+            cubico += peso_cubico * quantidade
+        return max(real, cubico)
+
+    # ===================== COTAÇÃO =====================
+
+    def __cotar_origem(
+        self, origem: TabelaFrete, uf_destino: str, peso: float, base: Tuple[float, int]
+    ) -> Tuple[float, int]:
+        """(valor, prazo) de uma origem; `base` é a entrada dela na matriz."""
+        faixas = origem.faixas_peso_de(uf_destino)
+        faixa = faixas.faixa(peso) if faixas is not None else 0
+        chave = (origem.uf_origem, uf_destino, faixa)
+
+        cotacao = self.__cotacoes.get(chave)
+        if cotacao is None:
+            self.__faltas += 1
+            valor, prazo = base
+            if faixas is not None:
+                valor = faixas.valor_da_faixa(faixa)
+            cotacao = self.__cotacoes[chave] = (valor, prazo)
+        else:
+            self.__acertos += 1
+        return cotacao
+
+    @staticmethod
+    def __aplicar_faixa_cep(
+        valor: float, base: Tuple[float, int], cotacao_cep: Frete
+    ) -> Tuple[float, int]:
+        """
+        (valor, prazo) da origem com a faixa de CEP no lugar da UF: o preço
+        por peso da UF é proporcional ao valor base dela, então a faixa de
+        CEP leva a mesma proporção.
+        """
+        valor_uf = base[0]
+        if valor_uf > 0:
+            valor = round(valor * cotacao_cep.valor / valor_uf, 2)
+        else:
+            valor = cotacao_cep.valor
+        return valor, cotacao_cep.prazo_dias
+
+    @staticmethod
+    def __validar_uf(uf_destino: str) -> str:
+        if not isinstance(uf_destino, str):
+            raise TypeError("Error: uf_destino must be a string.")
+        uf_destino = uf_destino.strip().upper()
+        if len(uf_destino) != 2:
+            raise ValueError("Error: uf_destino must have 2 characters (e.g., 'CE').")
+        return uf_destino
+
+    def cotar(self, itens: Iterable, uf_destino: str, uf_origem: Optional[str] = None) -> Frete:
+        """
+        Frete dos itens para a UF, saindo de uf_origem (padrão: a principal).
+        Sem itens físicos o frete é zero; sem faixas de peso no settings,
+        vale o valor fixo da UF.
+        """
+        uf_destino = self.__validar_uf(uf_destino)
+
+        tabela = self.__tabela_atual()
+        origem = tabela if uf_origem is None else tabela.origem(uf_origem.strip().upper())
+        peso = self.__peso_taxavel(itens, tabela)
+        if peso <= 0:
+            return Frete(uf_origem=origem.uf_origem, uf_destino=uf_destino, valor=0.0, prazo_dias=0)
+
+        valor, prazo = self.__cotar_origem(origem, uf_destino, peso, origem.cotar(uf_destino))
+        return Frete(
+            uf_origem=origem.uf_origem,
+            uf_destino=uf_destino,
+            valor=valor,
+            prazo_dias=prazo,
+        )
+
+    def cotar_melhor_origem(
+        self,
+        itens: Iterable,
+        uf_destino: str,
+        estoques: Optional[Mapping[str, Mapping[str, int]]] = None,
+        criterio: str = CRITERIO_PRECO,
+        cotacao_cep: Optional[Frete] = None,
+    ) -> Frete:
+        """
+        Frete pela melhor origem que atende todos os itens físicos.
+
+        - estoques: uf_origem -> {sku: quantidade}; None = todas atendem
+        - criterio: CRITERIO_PRECO (menor valor, desempate pelo prazo) ou
+          CRITERIO_PRAZO (menor prazo, desempate pelo valor)
+        - cotacao_cep: Frete da faixa de CEP do destino (Frete.from_cep);
+          vale para a origem dele no lugar da tabela por UF. Sem faixa_cep
+          (o CEP caiu na UF), é ignorada
+
+        Empates ficam com a origem que vem antes (a principal primeiro).
+        """
+        if criterio not in (CRITERIO_PRECO, CRITERIO_PRAZO):
+            raise ValueError(f"Error: invalid criterio '{criterio}'.")
+        uf_destino = self.__validar_uf(uf_destino)
+
+        itens = list(itens)
+        tabela = self.__tabela_atual()
+        peso = self.__peso_taxavel(itens, tabela)
+        if peso <= 0:
+            return Frete(uf_origem=tabela.uf_origem, uf_destino=uf_destino, valor=0.0, prazo_dias=0)
+
+        necessidade: Dict[str, int] = {}
+        if estoques is not None:
+            for item in itens:
+                if isinstance(getattr(item, "produto", None), ProdutoFisico):
+                    sku = _sku_do_item(item)
+                    necessidade[sku] = necessidade.get(sku, 0) + item.quantidade
+
+        if cotacao_cep is not None and cotacao_cep.faixa_cep is None:
+            cotacao_cep = None
+
+        melhor = None
+        for origem, base in zip(tabela.origens, tabela.cotar_origens(uf_destino)):
+            if estoques is not None and not _atende(estoques.get(origem.uf_origem, {}), necessidade):
+                continue
+            valor, prazo = self.__cotar_origem(origem, uf_destino, peso, base)
+            faixa_cep = None
+            if cotacao_cep is not None and origem.uf_origem == cotacao_cep.uf_origem:
+                valor, prazo = self.__aplicar_faixa_cep(valor, base, cotacao_cep)
+                faixa_cep = cotacao_cep.faixa_cep
+            chave = (valor, prazo) if criterio == CRITERIO_PRECO else (prazo, valor)
+            if melhor is None or chave < melhor[0]:
+                melhor = (chave, origem.uf_origem, valor, prazo, faixa_cep)
+
+        if melhor is None:
+            raise ValueError("Error: no origin can fulfil every item.")
+
+        _chave, uf_origem, valor, prazo, faixa_cep = melhor
+        return Frete(
+            uf_origem=uf_origem,
+            uf_destino=uf_destino,
+            valor=valor,
+            prazo_dias=prazo,
+            faixa_cep=faixa_cep,
+        )
+
+    # ===================== MÉTRICAS =====================
+
+    @property
+    def acertos_cache(self) -> int:
+        return self.__acertos
+
+    @property
+    def faltas_cache(self) -> int:
+        return self.__faltas
+
+    def limpar_cache(self) -> None:
+        with self.__lock:
+            self.__pesos = {}
+            self.__cotacoes = {}
+
+    def __repr__(self) -> str:
+        return f"MotorFrete(skus={len(self.__pesos)}, cotacoes={len(self.__cotacoes)})"
+
+
+# Motor único do processo, usado pelo checkout
+MOTOR_FRETE = MotorFrete()
+
+
+def cotar_frete(itens: Iterable, uf_destino: str) -> Frete:
+    return MOTOR_FRETE.cotar(itens, uf_destino)
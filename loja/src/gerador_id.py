@@ -0,0 +1,190 @@
+"""
+Geração de IDs únicos e ordenados no tempo para todas as entidades.
+
+Formato (63 bits, sempre positivo, cabe no INTEGER do SQLite):
+
+    | 41 bits: ms desde EPOCH_MS | 10 bits: nó | 12 bits: sequência |
+
+- timestamp: ~69 anos a partir de 2025-01-01
+- nó: identifica o processo gerador (até 1024 simultâneos); vem de
+  LOJA_NODE_ID ou de um arrendamento por lock de arquivo (ver arrendar_no)
+- sequência: até 4096 IDs por milissegundo por nó
+
+Como os IDs crescem com o tempo, os INSERTs no SQLite sempre caem no fim
+da B-tree da chave primária (append), sem dividir páginas no meio.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+from typing import Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+
+BITS_NO = 10
+BITS_SEQUENCIA = 12
+
+MAX_NO = (1 << BITS_NO) - 1
+MAX_SEQUENCIA = (1 << BITS_SEQUENCIA) - 1
+
+_DESLOCAMENTO_NO = BITS_SEQUENCIA
+_DESLOCAMENTO_TEMPO = BITS_SEQUENCIA + BITS_NO
+
+
+# Um arquivo de lock por nó; processos que compartilham o diretório (mesma
+# máquina/volume) nunca ficam com o mesmo nó
+DIRETORIO_NOS = os.environ.get("LOJA_NODE_DIR") or os.path.join(tempfile.gettempdir(), "loja-nos")
+
+# (pid, nó, fd do lock) do arrendamento deste processo
+_arrendamento: Optional[Tuple[int, int, int]] = None
+
+
+def _travar(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def arrendar_no(diretorio: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Arrenda o primeiro nó livre em `diretorio` (padrão DIRETORIO_NOS).
+
+    Retorna (nó, fd). O nó fica com quem arrendou enquanto o fd estiver
+    aberto; o sistema solta o lock quando o processo termina, mesmo se
+    ele morrer sem fechar nada.
+    """
+    diretorio = diretorio or DIRETORIO_NOS
+    os.makedirs(diretorio, exist_ok=True)
+    # começa pelo PID para processos que sobem juntos não disputarem o nó 0
+    inicio = os.getpid() & MAX_NO
+    for i in range(MAX_NO + 1):
+        no = (inicio + i) & MAX_NO
+        fd = os.open(os.path.join(diretorio, f"no-{no:04d}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        if _travar(fd):
+            return no, fd
+        os.close(fd)
+    raise RuntimeError(f"Error: all {MAX_NO + 1} node ids in {diretorio} are leased.")
+
+
+def no_do_processo() -> int:
+    """
+    Nó do processo atual.
+
+    - Variável de ambiente LOJA_NODE_ID (0..1023), quando definida:
+      obrigatória quando os processos rodam em máquinas/containers sem um
+      diretório de nós em comum (cada um precisa de um valor diferente).
+    - Senão, um nó arrendado com arrendar_no, mantido até o processo sair.
+    """
+    global _arrendamento
+    valor = os.environ.get("LOJA_NODE_ID")
+    if valor is not None:
+        no = int(valor)
+        if not 0 <= no <= MAX_NO:
+            raise ValueError(f"Error: LOJA_NODE_ID must be between 0 and {MAX_NO}.")
+        return no
+
+    pid = os.getpid()
+    if _arrendamento is not None:
+        dono, no, fd = _arrendamento
+        if dono == pid:
+            return no
+        # fd herdado num fork: o nó continua sendo do pai
+        os.close(fd)
+    no, fd = arrendar_no()
+    _arrendamento = (pid, no, fd)
+    return no
+
+
+class GeradorId:
+    """
+    Gerador de IDs monotônicos de 64 bits (timestamp + nó + sequência).
+
+    Seguro entre threads (lock interno). Entre processos, a unicidade vem
+    do nó: cada processo precisa de um nó diferente (ver no_do_processo).
+    """
+
+    def __init__(self, no: Optional[int] = None, epoch_ms: int = EPOCH_MS):
+        if no is None:
+            no = no_do_processo()
+        if not isinstance(no, int):
+            raise TypeError("Error: no must be an integer.")
+        if not 0 <= no <= MAX_NO:
+            raise ValueError(f"Error: no must be between 0 and {MAX_NO}.")
+
+        self.__no = no
+        self.__epoch_ms = epoch_ms
+        self.__lock = threading.Lock()
+        self.__ultimo_ms = -1
+        self.__sequencia = 0
+
+    @property
+    def no(self) -> int:
+        return self.__no
+
+    def proximo(self) -> int:
+        """Retorna um novo ID, sempre maior que o anterior deste gerador."""
+        with self.__lock:
+            agora = time.time_ns() // 1_000_000 - self.__epoch_ms
+
+            if agora > self.__ultimo_ms:
+                self.__ultimo_ms = agora
+                self.__sequencia = 0
+            else:
+                # mesmo ms (ou relógio voltou): continua a partir do último ms
+                self.__sequencia += 1
+                if self.__sequencia > MAX_SEQUENCIA:
+                    # sequência esgotada: adianta o ms lógico em vez de esperar
+                    self.__ultimo_ms += 1
+                    self.__sequencia = 0
+
+            return (
+                (self.__ultimo_ms << _DESLOCAMENTO_TEMPO)
+                | (self.__no << _DESLOCAMENTO_NO)
+                | self.__sequencia
+            )
+
+    def _reiniciar_no(self, no: int) -> None:
+        with self.__lock:
+            self.__no = no
+            self.__ultimo_ms = -1
+            self.__sequencia = 0
+
+    def __repr__(self) -> str:
+        return f"GeradorId(no={self.__no})"
+
+
+def decompor_id(id_: int, epoch_ms: int = EPOCH_MS) -> Tuple[int, int, int]:
+    """Separa um ID em (timestamp_ms_unix, nó, sequência)."""
+    if not isinstance(id_, int) or id_ < 0:
+        raise ValueError("Error: id must be a non-negative integer.")
+    return (
+        (id_ >> _DESLOCAMENTO_TEMPO) + epoch_ms,
+        (id_ >> _DESLOCAMENTO_NO) & MAX_NO,
+        id_ & MAX_SEQUENCIA,
+    )
+
+
+_GERADOR = GeradorId()
+
+# Após um fork o filho herda o estado do pai: arrenda outro nó para os dois
+# processos não gerarem os mesmos IDs.
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: _GERADOR._reiniciar_no(no_do_processo()))
+
+
+def gerar_id() -> int:
+    """Novo ID do gerador padrão do processo."""
+    return _GERADOR.proximo()
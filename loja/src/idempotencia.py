@@ -0,0 +1,168 @@
+"""
+Deduplicação de requisições por chave de idempotência.
+
+O cliente (front, app, integração) manda a mesma chave em todas as
+tentativas de uma operação. A primeira executa; as repetições recebem o
+mesmo resultado (aqui, o id do pedido) sem executar de novo.
+
+- resultados recentes ficam num cache LRU limitado em memória, com
+  validade; quem chama pode passar também uma busca no armazenamento
+  durável (a tabela chaves_idempotencia), consultada quando o LRU falha;
+- enquanto uma chave está em execução, as outras threads com a mesma
+  chave esperam ela terminar e usam o resultado. Se a execução falhar,
+  nada é guardado e a próxima da fila executa de novo.
+
+Chaves diferentes nunca esperam umas pelas outras.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+TAMANHO_CACHE = 10_000
+VALIDADE = 24 * 60 * 60.0
+
+
+@dataclass(frozen=True)
+class MetricasIdempotencia:
+    """
+    Contadores do cache de idempotência.
+
+    Atributos:
+    - execucoes: chaves executadas de fato
+    - acertos_cache: repetições respondidas pelo LRU
+    - acertos_banco: repetições respondidas pela busca durável
+    - esperas: threads que esperaram outra com a mesma chave
+    """
+    execucoes: int
+    acertos_cache: int
+    acertos_banco: int
+    esperas: int
+
+
+class CacheIdempotencia:
+    """Chave -> resultado, com LRU limitado e uma execução por chave de cada vez."""
+
+    def __init__(
+        self,
+        tamanho_cache: int = TAMANHO_CACHE,
+        validade: float = VALIDADE,
+        relogio: Callable[[], float] = time.monotonic,
+    ):
+        if not isinstance(tamanho_cache, int):
+            raise TypeError("Error: tamanho_cache must be an integer.")
+        if tamanho_cache < 0:
+            raise ValueError("Error: tamanho_cache must be >= 0.")
+        if not isinstance(validade, (int, float)):
+            raise TypeError("Error: validade must be a number.")
+        if validade <= 0:
+            raise ValueError("Error: validade must be greater than zero.")
+
+        self.__tamanho_cache = tamanho_cache
+        self.__validade = float(validade)
+        self.__relogio = relogio
+        self.__lock = threading.Lock()
+        # chave -> (resultado, expira_em)
+        self.__cache: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self.__em_execucao: Dict[str, threading.Event] = {}
+
+        self.__execucoes = 0
+        self.__acertos_cache = 0
+        self.__acertos_banco = 0
+        self.__esperas = 0
+
+    # ===================== CACHE =====================
+
+    def __do_cache(self, chave: str) -> Optional[int]:
+        """Resultado guardado e ainda válido (chamar com o lock preso)."""
+        entrada = self.__cache.get(chave)
+        if entrada is None:
+            return None
+        resultado, expira_em = entrada
+        if expira_em <= self.__relogio():
+            del self.__cache[chave]
+            return None
+        self.__cache.move_to_end(chave)
+        return resultado
+
+    def __guardar(self, chave: str, resultado: int) -> None:
+        if not self.__tamanho_cache:
+            return
+        self.__cache[chave] = (resultado, self.__relogio() + self.__validade)
+        self.__cache.move_to_end(chave)
+        if len(self.__cache) > self.__tamanho_cache:
+            self.__cache.popitem(last=False)
+
+    # ===================== EXECUÇÃO =====================
+
+    def executar(
+        self,
+        chave: str,
+        operacao: Callable[[], int],
+        buscar: Optional[Callable[[str], Optional[int]]] = None,
+    ) -> Tuple[int, bool]:
+        """
+        Resultado da chave: do LRU, de `buscar(chave)` ou de `operacao()`,
+        nessa ordem. Retorna (resultado, repetido); repetido=False só para
+        quem de fato executou a operação.
+        """
+        if not isinstance(chave, str):
+            raise TypeError("Error: chave must be a string.")
+        if not chave.strip():
+            raise ValueError("Error: chave cannot be empty.")
+
+        while True:
+            with self.__lock:
+                resultado = self.__do_cache(chave)
+                if resultado is not None:
+                    self.__acertos_cache += 1
+                    return resultado, True
+                evento = self.__em_execucao.get(chave)
+                if evento is None:
+                    evento = self.__em_execucao[chave] = threading.Event()
+                    break
+                self.__esperas += 1
+            # outra thread está com a chave: espera e olha o cache de novo
+            evento.wait()
+
+        try:
+            resultado = buscar(chave) if buscar is not None else None
+            repetido = resultado is not None
+            if not repetido:
+                resultado = operacao()
+            with self.__lock:
+                self.__guardar(chave, resultado)
+                if repetido:
+                    self.__acertos_banco += 1
+                else:
+                    self.__execucoes += 1
+            return resultado, repetido
+        finally:
+            with self.__lock:
+                del self.__em_execucao[chave]
+            evento.set()
+
+    # ===================== MÉTRICAS =====================
+
+    def metricas(self) -> MetricasIdempotencia:
+        with self.__lock:
+            return MetricasIdempotencia(
+                execucoes=self.__execucoes,
+                acertos_cache=self.__acertos_cache,
+                acertos_banco=self.__acertos_banco,
+                esperas=self.__esperas,
+            )
+
+    def limpar_cache(self) -> None:
+        with self.__lock:
+            self.__cache.clear()
+
+    def __repr__(self) -> str:
+        return f"CacheIdempotencia(cache={len(self.__cache)}/{self.__tamanho_cache})"
+
+
+# Cache único do processo, usado pelo checkout
+IDEMPOTENCIA = CacheIdempotencia()
@@ -1,10 +1,17 @@
 class ItemCarrinho:
+    __slots__ = ("__produto", "__quantidade", "__preco_unitario", "__preco_centavos", "_carrinho")
+
     def __init__(self, produto, quantidade: int, preco_unitario: float):
         if preco_unitario <= 0:
             raise ValueError("Preço deve ser positivo.")
         self.__produto = produto
         self.__quantidade = quantidade
         self.__preco_unitario = preco_unitario
+        self.__preco_centavos = round(preco_unitario * 100)
+        # Carrinho dono do item (None fora de um carrinho): o setter de
+        # quantidade chama carrinho._item_alterado para manter os totais.
+        # Referência simples (não um método) para o item continuar pickleável
+        self._carrinho = None
 
     #getter: PRODUTO
 
@@ -22,18 +29,28 @@ class ItemCarrinho:
     def quantidade(self, nova_qtd):
         if nova_qtd < 1:
             raise ValueError("Quantidade deve ser ≥ 1.")
+        diferenca = nova_qtd - self.__quantidade
         self.__quantidade = nova_qtd
+        if diferenca and self._carrinho is not None:
+            self._carrinho._item_alterado(self, diferenca)
 
     #getter: PREÇO UNITÁRIO
 
     @property
     def preco_unitario(self):
         return self.__preco_unitario
+
+    @property
+    def preco_centavos(self):
+        return self.__preco_centavos
     
     #Métodos:
 
     def subtotal(self):
         return self.__quantidade * self.__preco_unitario
+
+    def subtotal_centavos(self):
+        return self.__quantidade * self.__preco_centavos
     
 
 """
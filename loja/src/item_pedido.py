@@ -1,11 +1,17 @@
 from loja.src.produto import Produto
 
 class ItemPedido:
-    def __init__(self, sku: str, nome: str, quantidade: int, preco_unitario: float):
+    # __slots__: sem __dict__ por instância; relatórios carregam milhões de itens
+    __slots__ = ("__sku", "__nome", "__quantidade", "__preco_unitario", "__produto")
+
+    def __init__(self, sku: str, nome: str, quantidade: int, preco_unitario: float, produto: Produto | None = None):
         self.__sku = sku
         self.__nome = nome
         self.__quantidade = quantidade
         self.__preco_unitario = preco_unitario
+        # Produto de origem (opcional, não é persistido): dá a categoria
+        # usada na elegibilidade de cupons
+        self.__produto = produto
 
     # SKU
     @property
@@ -20,6 +26,11 @@ class ItemPedido:
             raise ValueError("Error: sku cannot be empty.")
         self.__sku = novo_sku.strip()
 
+    # Produto
+    @property
+    def produto(self):
+        return self.__produto
+
     # Nome
     @property
     def nome(self):
@@ -0,0 +1,223 @@
+"""
+Escolha automática do cupom de maior desconto para um carrinho.
+
+Os cupons ativos são indexados uma vez por tipo (VALOR, PERCENTUAL,
+FRETE_GRATIS) e por categoria, cada lista ordenada pelo "potencial" do
+cupom (o valor que limita o desconto dentro do tipo). Para um carrinho:
+
+- só entram as listas sem restrição e as das categorias do carrinho;
+- cada lista é percorrida em ordem decrescente de limite superior, e a
+  busca para assim que o limite não supera o melhor desconto já achado;
+- o desconto final é sempre o de Cupom.calcular_desconto.
+
+Resultados ficam num cache LRU por carrinho (id + conteúdo + frete + data).
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from loja.src.categorias import CATALOGO
+from loja.src.cupom import Cupom, mascara_do_pedido
+
+TAMANHO_CACHE = 4096
+
+
+@dataclass(frozen=True)
+class MelhorCupom:
+    """Cupom escolhido e o desconto que ele dá no carrinho."""
+    cupom: Cupom
+    desconto: float
+
+
+def _potencial(cupom: Cupom) -> float:
+    """
+    Chave de ordenação dentro do tipo: quanto maior, maior o desconto possível.
+    FRETE_GRATIS com valor <= 0 cobre o frete inteiro (maior de todos).
+    """
+    if cupom.tipo == Cupom.TIPO_FRETE_GRATIS and cupom.valor <= 0:
+        return float("inf")
+    return cupom.valor
+
+
+def _limite_superior(cupom: Cupom, subtotal: float, valor_frete: float) -> float:
+    """Maior desconto que o cupom poderia dar (ignorando validade/categoria)."""
+    if cupom.tipo == Cupom.TIPO_VALOR:
+        limite = cupom.valor
+    elif cupom.tipo == Cupom.TIPO_PERCENTUAL:
+        limite = subtotal * (cupom.valor / 100.0)
+    elif cupom.tipo == Cupom.TIPO_FRETE_GRATIS:
+        limite = valor_frete if cupom.valor <= 0 else min(cupom.valor, valor_frete)
+    else:
+        limite = 0.0
+    return min(limite, max(0.0, subtotal + valor_frete))
+
+
+class OtimizadorCupons:
+    """
+    Índice dos cupons ativos para escolher o melhor por carrinho.
+
+    Validade (data/uso) é conferida na hora da busca, pois muda com o tempo.
+    Ao criar/remover cupons, chame atualizar_cupons().
+    """
+
+    def __init__(self, cupons: Iterable[Cupom] = (), tamanho_cache: int = TAMANHO_CACHE):
+        if not isinstance(tamanho_cache, int):
+            raise TypeError("Error: tamanho_cache must be an integer.")
+        if tamanho_cache < 0:
+            raise ValueError("Error: tamanho_cache must be >= 0.")
+
+        self.__tamanho_cache = tamanho_cache
+        self.__lock = threading.Lock()
+        self.__cache: "OrderedDict[tuple, Optional[MelhorCupom]]" = OrderedDict()
+        self.__acertos = 0
+        self.__faltas = 0
+        self.atualizar_cupons(cupons)
+
+    # ===================== ÍNDICE =====================
+
+    def atualizar_cupons(self, cupons: Iterable[Cupom]) -> None:
+        """Reconstrói o índice e limpa o cache."""
+        cupons = list(cupons)
+        if not all(isinstance(c, Cupom) for c in cupons):
+            raise TypeError("Error: every item must be a Cupom object.")
+
+        sem_restricao: Dict[str, List[Cupom]] = {}
+        por_categoria: Dict[Tuple[str, int], List[Cupom]] = {}
+        for cupom in cupons:
+            mascara = cupom.mascara_categorias
+            if mascara == 0:
+                sem_restricao.setdefault(cupom.tipo, []).append(cupom)
+                continue
+            id_ = 0
+            while mascara:
+                if mascara & 1:
+                    por_categoria.setdefault((cupom.tipo, id_), []).append(cupom)
+                mascara >>= 1
+                id_ += 1
+
+        for lista in (*sem_restricao.values(), *por_categoria.values()):
+            lista.sort(key=_potencial, reverse=True)
+
+        with self.__lock:
+            self.__cupons = cupons
+            self.__sem_restricao = sem_restricao
+            self.__por_categoria = por_categoria
+            self.__cache.clear()
+
+    def __len__(self) -> int:
+        return len(self.__cupons)
+
+    # ===================== BUSCA =====================
+
+    def melhor_cupom(
+        self,
+        carrinho,
+        valor_frete: float = 0.0,
+        data_referencia: Optional[date] = None,
+    ) -> Optional[MelhorCupom]:
+        """
+        Cupom de maior desconto para o carrinho (None se nenhum dá desconto).
+        Empates ficam com o primeiro encontrado (maior potencial).
+        """
+        if not isinstance(valor_frete, (int, float)):
+            raise TypeError("Error: valor_frete must be a number.")
+        if data_referencia is None:
+            data_referencia = date.today()
+
+        subtotal = float(carrinho.calcular_subtotal())
+        valor_frete = float(valor_frete)
+        mascara = mascara_do_pedido(carrinho)
+
+        chave = (getattr(carrinho, "id", None), subtotal, valor_frete, mascara, data_referencia)
+        with self.__lock:
+            if chave in self.__cache:
+                resultado = self.__cache[chave]
+                # usos só aumentam: o escolhido pode ter esgotado desde então
+                if resultado is None or resultado.cupom.esta_valido(data_referencia):
+                    self.__cache.move_to_end(chave)
+                    self.__acertos += 1
+                    return resultado
+                del self.__cache[chave]
+            self.__faltas += 1
+            sem_restricao, por_categoria = self.__sem_restricao, self.__por_categoria
+
+        resultado = self.__buscar(
+            subtotal, valor_frete, mascara, data_referencia, sem_restricao, por_categoria
+        )
+
+        if self.__tamanho_cache:
+            with self.__lock:
+                self.__cache[chave] = resultado
+                if len(self.__cache) > self.__tamanho_cache:
+                    self.__cache.popitem(last=False)
+        return resultado
+
+    def __buscar(
+        self,
+        subtotal: float,
+        valor_frete: float,
+        mascara: int,
+        data_referencia: date,
+        sem_restricao: Dict[str, List[Cupom]],
+        por_categoria: Dict[Tuple[str, int], List[Cupom]],
+    ) -> Optional[MelhorCupom]:
+        ids_carrinho = [i for i in range(mascara.bit_length()) if mascara >> i & 1]
+
+        listas: List[List[Cupom]] = list(sem_restricao.values())
+        for tipo in (Cupom.TIPO_VALOR, Cupom.TIPO_PERCENTUAL, Cupom.TIPO_FRETE_GRATIS):
+            for id_ in ids_carrinho:
+                lista = por_categoria.get((tipo, id_))
+                if lista:
+                    listas.append(lista)
+
+        # listas com maior limite superior primeiro: acham um bom desconto
+        # cedo e podam as demais
+        listas.sort(key=lambda l: _limite_superior(l[0], subtotal, valor_frete), reverse=True)
+
+        melhor: Optional[MelhorCupom] = None
+        melhor_desconto = 0.0
+        for lista in listas:
+            for cupom in lista:
+                if _limite_superior(cupom, subtotal, valor_frete) <= melhor_desconto:
+                    break  # o resto da lista tem limite ainda menor
+                if not cupom.esta_valido(data_referencia=data_referencia):
+                    continue
+
+                categoria = None
+                if cupom.mascara_categorias:
+                    categoria = CATALOGO.categorias(cupom.mascara_categorias & mascara)[0]
+                desconto = cupom.calcular_desconto(
+                    subtotal,
+                    categoria=categoria,
+                    data_referencia=data_referencia,
+                    valor_frete=valor_frete,
+                )
+                if desconto > melhor_desconto:
+                    melhor, melhor_desconto = MelhorCupom(cupom, desconto), desconto
+                # os próximos da lista têm potencial menor ou igual
+                break
+        return melhor
+
+    # ===================== MÉTRICAS =====================
+
+    @property
+    def acertos_cache(self) -> int:
+        return self.__acertos
+
+    @property
+    def faltas_cache(self) -> int:
+        return self.__faltas
+
+    def limpar_cache(self) -> None:
+        with self.__lock:
+            self.__cache.clear()
+
+    def __repr__(self) -> str:
+        return (
+            f"OtimizadorCupons(cupons={len(self.__cupons)}, "
+            f"cache={len(self.__cache)}/{self.__tamanho_cache})"
+        )
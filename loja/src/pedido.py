@@ -1,18 +1,27 @@
 from __future__ import annotations
 
+import json
 import uuid
 from datetime import datetime
-from typing import List, Optional, TYPE_CHECKING
+from typing import Any, List, Optional, TYPE_CHECKING
 
 from loja.src.cliente import Cliente
 from loja.src.carrinho import Carrinho
 from loja.src.item_pedido import ItemPedido
+from loja.src.categorias import mascara_de
 from loja.src.cupom import Cupom
+from loja.src.estoque import ESTOQUE
 from loja.src.frete import Frete
+from loja.src.gerador_id import gerar_id
+from loja.src.reservas import LivroReservas, TTL_CARRINHO, TTL_PEDIDO
 
 # Import só para o type checker (não roda em tempo de execução)
 if TYPE_CHECKING:
-    from pagamento import Pagamento
+    from loja.src.pagamento import Pagamento
+
+
+def _iso_para_datetime(valor: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(valor) if valor else None
 
 
 class Pedido:
@@ -24,6 +33,16 @@ class Pedido:
     STATUS_ENTREGUE = "ENTREGUE"
     STATUS_CANCELADO = "CANCELADO"
 
+    # __slots__: sem __dict__ por instância (ver benchmarks/bench_memoria.py)
+    __slots__ = (
+        "__id", "__cliente", "__itens", "__frete", "__cupom",
+        "__subtotal", "__descontos", "__valor_frete", "__total",
+        "__pagamentos", "__total_pago", "__status", "__endereco_entrega",
+        "__criado_em", "__pago_em", "__enviado_em", "__entregue_em",
+        "__cancelado_em", "__codigo_rastreio", "__mascara_categorias",
+        "__reservas", "_estado_persistido", "_estoque_no_banco",
+    )
+
     def __init__(
         self,
         cliente: Cliente,
@@ -62,6 +81,17 @@ class Pedido:
         self.__cancelado_em: Optional[datetime] = None
         self.__codigo_rastreio: Optional[str] = None
 
+        # Estado gravado no banco na última gravação/carga; a persistência
+        # compara com ele para salvar só o que mudou (None = nunca salvo)
+        self._estado_persistido = None
+        # True quando registrar_checkout já baixou o estoque no banco: o
+        # pagamento não baixa de novo nos Produto em memória (gravado em
+        # pedidos.estoque_no_banco)
+        self._estoque_no_banco = False
+
+        # LivroReservas com as unidades do pedido (ver criar_de_carrinho)
+        self.__reservas = None
+
         # Usa os setters para validar
         self.cliente = cliente
         self.itens = itens
@@ -84,7 +114,7 @@ class Pedido:
         return self.__id
 
     def _gerar_id(self) -> int:
-        return uuid.uuid4().int % 10000
+        return gerar_id()
 
     # ===================== CLIENTE =====================
 
@@ -113,6 +143,19 @@ class Pedido:
         if not all(isinstance(i, ItemPedido) for i in novos_itens):
             raise TypeError("Error: itens must contain only ItemPedido objects.")
         self.__itens = novos_itens
+        self.__mascara_categorias = None
+
+    @property
+    def mascara_categorias(self) -> int:
+        """
+        Máscara das categorias dos itens (ver categorias.py), calculada na
+        primeira consulta. Ao alterar a lista de itens, reatribua pedido.itens.
+        """
+        if self.__mascara_categorias is None:
+            self.__mascara_categorias = mascara_de(
+                getattr(item.produto, "categoria", None) for item in self.__itens
+            )
+        return self.__mascara_categorias
 
     # ===================== FRETE =====================
 
@@ -317,7 +360,18 @@ class Pedido:
         frete: Optional[Frete] = None,
         cupom: Optional[Cupom] = None,
         endereco_entrega: Optional[object] = None,
+        cliente: Optional[Cliente] = None,
+        reservas: Optional[LivroReservas] = None,
     ) -> "Pedido":
+        """
+        Cria o pedido a partir do carrinho.
+
+        Com um LivroReservas (o do carrinho, se não for informado), as
+        unidades passam para uma reserva do pedido, válida por TTL_PEDIDO:
+        as reservas do carrinho contam como disponíveis e são liberadas.
+        Sem disponível para todos os itens, sobe ValueError e nada muda.
+        A reserva do pedido é liberada quando ele é pago ou cancelado.
+        """
         if not carrinho.itens:
             raise ValueError("Error: carrinho vazio não pode virar pedido.")
 
@@ -329,19 +383,93 @@ class Pedido:
 
             itens_pedido.append(
                 ItemPedido(
-                    produto=produto,
+                    sku=str(produto.sku),
+                    nome=produto.nome,
                     quantidade=quantidade,
                     preco_unitario=preco_unitario,
+                    produto=produto,
                 )
             )
 
         pedido = cls(
-            cliente=carrinho.cliente,
+            cliente=cliente if cliente is not None else carrinho.cliente,
             itens=itens_pedido,
             frete=frete,
             cupom=cupom,
             endereco_entrega=endereco_entrega,
         )
+
+        if reservas is None:
+            reservas = getattr(carrinho, "reservas", None)
+        if reservas is not None:
+            try:
+                reservas.reservar_itens(
+                    pedido.id,
+                    [(item.produto, item.quantidade) for item in itens_pedido],
+                    ttl=TTL_PEDIDO,
+                    liberar_de=carrinho.id,
+                )
+            except ValueError:
+                # o construtor já registrou o uso do cupom (aplicar_cupom)
+                pedido._desfazer_uso_cupom()
+                raise
+            pedido.__reservas = reservas
+        return pedido
+
+    @classmethod
+    def from_row(
+        cls,
+        row: Any,
+        cliente: Cliente,
+        itens: List[ItemPedido],
+        cupom: Optional[Cupom] = None,
+    ) -> "Pedido":
+        """
+        Reconstrói um Pedido já persistido a partir de uma linha da tabela
+        pedidos (sqlite3.Row ou dict), com cliente, itens e cupom carregados.
+
+        Os dados já foram validados quando o pedido foi salvo: os campos são
+        atribuídos direto, sem setters, sem recalcular totais e sem reaplicar
+        o cupom (que chamaria cupom.registrar_uso() de novo).
+        O frete volta como None (o valor já está em valor_frete).
+        """
+        endereco_entrega = None
+        if row["endereco_entrega_json"]:
+            try:
+                endereco_entrega = json.loads(row["endereco_entrega_json"])
+            except json.JSONDecodeError:
+                endereco_entrega = None
+
+        pedido = cls.__new__(cls)
+        pedido.__id = row["id"]
+        pedido.__cliente = cliente
+        pedido.__itens = itens
+        pedido.__mascara_categorias = None
+        pedido.__frete = None
+        pedido.__cupom = cupom
+
+        pedido.__subtotal = row["subtotal"]
+        pedido.__descontos = row["descontos"]
+        pedido.__valor_frete = row["valor_frete"]
+        pedido.__total = row["total"]
+
+        pedido.__pagamentos = []
+        pedido.__total_pago = 0.0
+
+        pedido.__status = row["status"]
+        pedido.__endereco_entrega = endereco_entrega
+
+        pedido.__criado_em = _iso_para_datetime(row["criado_em"])
+        pedido.__pago_em = _iso_para_datetime(row["pago_em"])
+        pedido.__enviado_em = _iso_para_datetime(row["enviado_em"])
+        pedido.__entregue_em = _iso_para_datetime(row["entregue_em"])
+        pedido.__cancelado_em = _iso_para_datetime(row["cancelado_em"])
+        pedido.__codigo_rastreio = row["codigo_rastreio"]
+
+        pedido.__reservas = None
+        pedido._estado_persistido = None
+        chaves = row.keys()
+        pedido._estoque_no_banco = bool(row["estoque_no_banco"]) if "estoque_no_banco" in chaves else False
         return pedido
 
     def calcular_subtotal(self) -> float:
@@ -349,6 +477,8 @@ class Pedido:
         for item in self.__itens:
             if hasattr(item, "subtotal"):
                 subtotal += float(item.subtotal)
+            elif hasattr(item, "calcular_total_item"):
+                subtotal += float(item.calcular_total_item())
             else:
                 preco = float(getattr(item, "preco_unitario", 0.0))
                 qtd = int(getattr(item, "quantidade", 0))
@@ -369,6 +499,11 @@ class Pedido:
 
         return self.__descontos
 
+    def _desfazer_uso_cupom(self) -> None:
+        """Devolve o uso que aplicar_cupom registrou (pedido que não foi fechado)."""
+        if self.__cupom is not None and self.__descontos > 0:
+            self.__cupom.usos_realizados = self.__cupom.usos_realizados - 1
+
     def calcular_total(self) -> float:
         total = self.__subtotal - self.__descontos + self.__valor_frete
         if total < 0:
@@ -387,7 +522,7 @@ class Pedido:
     # ===================== PAGAMENTOS: REGISTRO / ESTORNO =====================
 
     def registrar_pagamento(self, pagamento: Pagamento) -> None:
-        from pagamento import Pagamento as PagamentoCls
+        from loja.src.pagamento import Pagamento as PagamentoCls
         if not isinstance(pagamento, PagamentoCls):
             raise TypeError("Error: pagamento must be a Pagamento object.")
 
@@ -403,7 +538,7 @@ class Pedido:
         self.__atualizar_status_pos_pagamento(pagamento.data_pagamento)
 
     def registrar_estorno(self, pagamento: Pagamento) -> None:
-        from pagamento import Pagamento as PagamentoCls
+        from loja.src.pagamento import Pagamento as PagamentoCls
         if not isinstance(pagamento, PagamentoCls):
             raise TypeError("Error: pagamento must be a Pagamento object.")
 
@@ -459,6 +594,7 @@ class Pedido:
 
         if self.__status == self.STATUS_PAGO:
             self._estornar_estoque()
+        self._liberar_reservas()
 
         self.status = self.STATUS_CANCELADO
         self.__cancelado_em = datetime.now()
@@ -526,28 +662,44 @@ class Pedido:
     # ===================== ESTOQUE =====================
 
     def _baixar_estoque(self) -> None:
-        for item in self.__itens:
-            produto = item.produto
-            quantidade = item.quantidade
-
-            estoque_atual = getattr(produto, "estoque", None)
-            if estoque_atual is None:
-                raise AttributeError("'Produto' doesn't have 'estoque' attribute.")
-
-            if quantidade > estoque_atual:
-                raise ValueError(
-                    f"Estoque insuficiente para o produto {produto.nome}: "
-                    f"solicitado {quantidade}, disponível {estoque_atual}."
-                )
-
-        for item in self.__itens:
-            produto = item.produto
-            produto.estoque = produto.estoque - item.quantidade
+        if self._estoque_no_banco:
+            # registrar_checkout já tirou as unidades no banco (na mesma
+            # transação do pedido): baixar aqui contaria a venda duas vezes
+            self._liberar_reservas()
+            return
+        # conferência e baixa com as listras dos SKUs presas (ver estoque.py)
+        ESTOQUE.baixar((item.produto, item.quantidade) for item in self.__itens)
+        # as unidades saíram do estoque: a reserva não precisa mais segurá-las
+        self._liberar_reservas()
+
+    def _liberar_reservas(self) -> None:
+        if self.__reservas is not None:
+            self.__reservas.liberar(self.__id)
+            self.__reservas = None
+
+    def _devolver_reservas(self, carrinho: Carrinho) -> None:
+        """
+        O pedido não foi fechado (ex.: checkout recusado no banco): as
+        unidades voltam para a reserva do carrinho em vez de ficarem presas
+        a um pedido que não existe até o TTL vencer.
+        """
+        reservas, self.__reservas = self.__reservas, None
+        if reservas is None:
+            return
+        try:
+            reservas.reservar_itens(
+                carrinho.id,
+                [(item.produto, item.quantidade) for item in carrinho.itens],
+                ttl=TTL_CARRINHO,
+                liberar_de=self.__id,
+            )
+        except ValueError:
+            # o estoque em memória caiu nesse meio tempo: só solta as unidades
+            reservas.liberar(self.__id)
 
     def _estornar_estoque(self) -> None:
-        for item in self.__itens:
-            produto = item.produto
-            estoque_atual = getattr(produto, "estoque", None)
-            if estoque_atual is None:
-                raise AttributeError("'Produto' doesn't have 'estoque' attribute.")
-            produto.estoque = estoque_atual + item.quantidade
+        if self._estoque_no_banco:
+            # nada foi baixado em memória; no banco, a devolução é de
+            # db.estornar_pedido (ver services.cancelar_pedido)
+            return
+        ESTOQUE.estornar((item.produto, item.quantidade) for item in self.__itens)
@@ -0,0 +1,204 @@
+"""
+Precificação em lote (vetorizada com NumPy) para muitos pedidos de uma vez.
+
+Usada na reprecificação noturna e em simulações de promoção: recebe os
+pedidos em colunas (um array por campo) em vez de objetos Pedido e calcula
+subtotal, desconto, frete e total de todos com operações de array.
+
+Os resultados são idênticos aos do caminho escalar (Pedido.calcular_subtotal,
+Cupom.calcular_desconto_para_pedido, Frete.from_uf_destino e
+Pedido.calcular_total), incluindo o arredondamento de round(x, 2).
+
+Diferença intencional: nada é alterado. Os cupons são avaliados com o
+estado de uso do momento da chamada e registrar_uso() não é chamado.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional, Sequence
+
+import numpy as np
+
+from loja.src.cupom import Cupom
+from loja.src.frete import Frete
+
+# Códigos numéricos dos tipos de cupom dentro dos arrays
+_TIPO_NENHUM = 0
+_TIPO_VALOR = 1
+_TIPO_PERCENTUAL = 2
+_TIPO_FRETE_GRATIS = 3
+
+_CODIGO_TIPO = {
+    Cupom.TIPO_VALOR: _TIPO_VALOR,
+    Cupom.TIPO_PERCENTUAL: _TIPO_PERCENTUAL,
+    Cupom.TIPO_FRETE_GRATIS: _TIPO_FRETE_GRATIS,
+}
+
+
+@dataclass(frozen=True)
+class PrecificacaoLote:
+    """
+    Resultado da precificação, um valor por pedido (arrays float64).
+
+    Atributos:
+    - subtotal: soma quantidade * preço unitário dos itens
+    - descontos: desconto do cupom
+    - valor_frete: frete pela UF de destino (0.0 sem UF)
+    - total: subtotal - descontos + frete, nunca negativo
+    """
+    subtotal: np.ndarray
+    descontos: np.ndarray
+    valor_frete: np.ndarray
+    total: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.total)
+
+
+def _arredondar_2(valores: np.ndarray) -> np.ndarray:
+    """
+    Equivalente vetorizado de round(x, 2) do Python.
+
+    np.round multiplica por 100 antes de arredondar, o que pode errar o lado
+    de empates como 1.005 (que em binário é 1.00499...). Os valores próximos
+    de um empate são refeitos com round() do Python; os demais dão o mesmo
+    inteiro de centavos nos dois métodos e, portanto, o mesmo float.
+    """
+    resultado = np.round(valores, 2)
+    centavos = valores * 100.0
+    fracao = np.abs(centavos - np.trunc(centavos))
+    duvidosos = (np.abs(fracao - 0.5) < 1e-6) | (np.abs(centavos) >= 2.0 ** 52)
+    if duvidosos.any():
+        resultado[duvidosos] = [round(float(v), 2) for v in valores[duvidosos]]
+    return resultado
+
+
+def _fretes_por_uf(ufs_destino: Sequence[Optional[str]]) -> np.ndarray:
+    """Frete de cada pedido; Frete.from_uf_destino só roda uma vez por UF."""
+    ufs = np.asarray(ufs_destino, dtype=object)
+    ufs = np.where(ufs == None, "", ufs).astype(str)  # noqa: E711 (comparação elemento a elemento)
+
+    unicas, posicoes = np.unique(ufs, return_inverse=True)
+    valores = np.array(
+        [Frete.from_uf_destino(uf).valor if uf else 0.0 for uf in unicas],
+        dtype=np.float64,
+    )
+    return valores[posicoes]
+
+
+def precificar_lote(
+    pedido_por_item: Sequence[int],
+    quantidades: Sequence[int],
+    precos_unitarios: Sequence[float],
+    ufs_destino: Sequence[Optional[str]],
+    cupom_por_pedido: Optional[Sequence[int]] = None,
+    cupons: Sequence[Cupom] = (),
+    data_referencia: Optional[date] = None,
+    mascara_por_pedido: Optional[Sequence[int]] = None,
+) -> PrecificacaoLote:
+    """
+    Precifica N pedidos a partir de colunas.
+
+    Colunas por ITEM (mesmo tamanho):
+    - pedido_por_item: índice (0..N-1) do pedido a que o item pertence;
+      os itens de um pedido devem estar na mesma ordem do pedido
+    - quantidades, precos_unitarios
+
+    Colunas por PEDIDO (tamanho N):
+    - ufs_destino: UF de destino (None = pedido sem frete)
+    - cupom_por_pedido: posição do cupom em `cupons` (-1 = sem cupom)
+    - mascara_por_pedido: máscara de categorias do pedido
+      (Pedido.mascara_categorias); sem ela, cupons com categorias_elegiveis
+      não se aplicam
+    """
+    pedido_por_item = np.asarray(pedido_por_item, dtype=np.int64)
+    quantidades = np.asarray(quantidades, dtype=np.float64)
+    precos_unitarios = np.asarray(precos_unitarios, dtype=np.float64)
+    n_pedidos = len(ufs_destino)
+
+    if not (len(pedido_por_item) == len(quantidades) == len(precos_unitarios)):
+        raise ValueError("Error: item columns must have the same length.")
+    if len(pedido_por_item) and (
+        pedido_por_item.min() < 0 or pedido_por_item.max() >= n_pedidos
+    ):
+        raise ValueError("Error: pedido_por_item out of range.")
+
+    if cupom_por_pedido is None:
+        cupom_por_pedido = np.full(n_pedidos, -1, dtype=np.int64)
+    else:
+        cupom_por_pedido = np.asarray(cupom_por_pedido, dtype=np.int64)
+        if len(cupom_por_pedido) != n_pedidos:
+            raise ValueError("Error: cupom_por_pedido must have one entry per pedido.")
+        if len(cupom_por_pedido) and (
+            cupom_por_pedido.min() < -1 or cupom_por_pedido.max() >= len(cupons)
+        ):
+            raise ValueError("Error: cupom_por_pedido out of range.")
+
+    if mascara_por_pedido is not None and len(mascara_por_pedido) != n_pedidos:
+        raise ValueError("Error: mascara_por_pedido must have one entry per pedido.")
+
+    # 1) Subtotal: bincount soma os itens na ordem de entrada, como o laço
+    #    de Pedido.calcular_subtotal
+    subtotal = np.bincount(
+        pedido_por_item,
+        weights=quantidades * precos_unitarios,
+        minlength=n_pedidos,
+    )
+    subtotal = _arredondar_2(subtotal)
+
+    # 2) Frete
+    valor_frete = _fretes_por_uf(ufs_destino)
+
+    # 3) Desconto: atributos de cada cupom em arrays (uma entrada extra no
+    #    fim para "sem cupom", alcançada pelo índice -1)
+    tipos = np.full(len(cupons) + 1, _TIPO_NENHUM, dtype=np.int8)
+    valores = np.zeros(len(cupons) + 1, dtype=np.float64)
+    restritos = np.zeros(len(cupons) + 1, dtype=bool)
+    for i, cupom in enumerate(cupons):
+        if cupom.esta_valido(data_referencia=data_referencia):
+            tipos[i] = _CODIGO_TIPO.get(cupom.tipo, _TIPO_NENHUM)
+        valores[i] = cupom.valor
+        restritos[i] = cupom.mascara_categorias != 0
+
+    tipo = tipos[cupom_por_pedido]
+    valor = valores[cupom_por_pedido]
+
+    # Cupons com categorias: só valem nos pedidos com alguma categoria em
+    # comum (AND das máscaras, que são ints do Python de tamanho livre)
+    com_restricao = np.flatnonzero(restritos[cupom_por_pedido] & (tipo != _TIPO_NENHUM))
+    if len(com_restricao):
+        if mascara_por_pedido is None:
+            tipo[com_restricao] = _TIPO_NENHUM
+        else:
+            elegivel = np.fromiter(
+                (
+                    mascara_por_pedido[j] & cupons[cupom_por_pedido[j]].mascara_categorias != 0
+                    for j in com_restricao
+                ),
+                dtype=bool,
+                count=len(com_restricao),
+            )
+            tipo[com_restricao[~elegivel]] = _TIPO_NENHUM
+
+    desconto = np.zeros(n_pedidos, dtype=np.float64)
+    desconto = np.where(tipo == _TIPO_VALOR, valor, desconto)
+    desconto = np.where(tipo == _TIPO_PERCENTUAL, subtotal * (valor / 100.0), desconto)
+    frete_gratis = np.where(valor <= 0, valor_frete, np.minimum(valor, valor_frete))
+    desconto = np.where(tipo == _TIPO_FRETE_GRATIS, frete_gratis, desconto)
+
+    desconto_maximo = np.maximum(0.0, subtotal + valor_frete)
+    desconto = np.maximum(0.0, np.minimum(desconto, desconto_maximo))
+    desconto[(subtotal <= 0) & (valor_frete <= 0)] = 0.0
+    descontos = _arredondar_2(desconto)
+
+    # 4) Total
+    total = subtotal - descontos + valor_frete
+    total = _arredondar_2(np.where(total < 0, 0.0, total))
+
+    return PrecificacaoLote(
+        subtotal=subtotal,
+        descontos=descontos,
+        valor_frete=valor_frete,
+        total=total,
+    )
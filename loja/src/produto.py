@@ -1,7 +1,10 @@
-import uuid
+from loja.src.gerador_id import gerar_id
 
 
 class Produto:
+    # __slots__: sem __dict__ por instância (bem menos memória em cargas grandes)
+    __slots__ = ("__sku", "__nome", "__categoria", "__preco", "__estoque", "__ativo")
+
     def __init__(self, nome: str, categoria: str, preco: float, estoque: int, ativo: bool = True):
         self.__sku = self._gerar_sku()
         self.nome = nome
@@ -17,7 +20,23 @@ class Produto:
         return self.__sku
 
     def _gerar_sku(self) -> int:
-        return uuid.uuid4().int % 10000
+        return gerar_id()
+
+    @classmethod
+    def from_row(cls, row) -> "Produto":
+        """
+        Reconstrói um Produto já persistido a partir de uma linha da tabela
+        produtos (sqlite3.Row ou dict). Os dados já foram validados ao
+        salvar: atribui direto, sem setters e sem gerar um sku novo.
+        """
+        produto = cls.__new__(cls)
+        produto.__sku = row["sku"]
+        produto.__nome = row["nome"]
+        produto.__categoria = row["categoria"]
+        produto.__preco = float(row["preco"])
+        produto.__estoque = row["estoque"]
+        produto.__ativo = bool(row["ativo"])
+        return produto
 
     # NOME
 
@@ -6,6 +6,8 @@ from loja.src.produto import Produto
 class ProdutoDigital(Produto):
     """Subclasse de Produto para itens digitais (não entram no frete)."""
 
+    __slots__ = ("__url_download", "__chave_licenca")
+
     def __init__(self, nome: str, categoria: str, preco: float, estoque: int, ativo: bool, url_download: str, chave_licenca: str | None = None,):
         super().__init__(nome, categoria, preco, estoque, ativo)
         self.url_download = url_download
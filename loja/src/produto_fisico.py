@@ -4,6 +4,8 @@ from loja.src.produto import Produto
 class ProdutoFisico(Produto):
     """Subclasse de Produto para itens físicos (consideram peso/medidas)."""
 
+    __slots__ = ("__peso", "__altura", "__largura", "__profundidade")
+
     def __init__(self, nome: str, categoria: str, preco: float, estoque: int, ativo: bool, peso: float, altura: float, largura: float, profundidade: float,):
         super().__init__(nome, categoria, preco, estoque, ativo)
         self.peso = peso
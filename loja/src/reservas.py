@@ -0,0 +1,301 @@
+"""
+Reservas de estoque com prazo de validade (TTL) para carrinhos e pedidos.
+
+Enquanto um carrinho ou pedido não pago existir, as unidades dele ficam
+reservadas por um tempo. O disponível para venda de um SKU é:
+
+    disponivel = Produto.estoque - reservado[sku]
+
+`reservado` é um total mantido a cada operação, então a consulta é O(1).
+Quando uma reserva vence, a varredura a libera: as validades ficam num
+heap (mínimo), então a varredura só olha o topo enquanto ele está vencido.
+A varredura roda sozinha no início de cada operação (custo O(1) quando não
+há nada vencido) ou em segundo plano com iniciar_varredura().
+
+Cada dono (id do carrinho ou do pedido) tem no máximo uma reserva por SKU;
+reservar de novo substitui a quantidade e renova a validade. Entradas
+antigas no heap são ignoradas quando chegam ao topo; se passarem a ser
+mais da metade do heap, ele é reconstruído só com as vigentes.
+
+As reservas vivem na memória do processo: com vários processos, cada um
+enxerga só as suas.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Validade padrão (s) das reservas de carrinho e de pedido não pago
+TTL_CARRINHO = 15 * 60.0
+TTL_PEDIDO = 30 * 60.0
+
+
+@dataclass(frozen=True)
+class Reserva:
+    """
+    Unidades de um SKU separadas para um dono.
+
+    Atributos:
+    - dono: id do carrinho ou do pedido
+    - sku: sku do produto
+    - quantidade: unidades reservadas
+    - expira_em: instante (no relógio do livro) em que a reserva vence
+    """
+    dono: int
+    sku: int
+    quantidade: int
+    expira_em: float
+
+
+@dataclass(frozen=True)
+class MetricasReservas:
+    """
+    Contadores do livro de reservas.
+
+    Atributos:
+    - reservas: reservas criadas ou alteradas com sucesso
+    - expiradas: reservas liberadas pela varredura por vencimento
+    - conflitos: pedidos de reserva recusados por falta de disponível
+    - liberadas: reservas liberadas antes de vencer (remoção, pagamento...)
+    - ativas: reservas vigentes no momento
+    - entradas_heap: validades no heap (vigentes + antigas ainda não descartadas)
+    """
+    reservas: int
+    expiradas: int
+    conflitos: int
+    liberadas: int
+    ativas: int
+    entradas_heap: int
+
+
+class LivroReservas:
+    """Registro das reservas ativas, seguro para uso entre threads."""
+
+    def __init__(
+        self,
+        ttl: float = TTL_CARRINHO,
+        relogio: Callable[[], float] = time.monotonic,
+    ):
+        if not isinstance(ttl, (int, float)):
+            raise TypeError("Error: ttl must be a number.")
+        if ttl <= 0:
+            raise ValueError("Error: ttl must be greater than zero.")
+
+        self.__ttl = float(ttl)
+        self.__relogio = relogio
+        self.__lock = threading.RLock()
+
+        self.__por_dono: Dict[int, Dict[int, Reserva]] = {}
+        self.__reservado: Dict[int, int] = {}
+        # (expira_em, sequência, reserva); a sequência desempata sem
+        # comparar Reservas
+        self.__heap: List[Tuple[float, int, Reserva]] = []
+        self.__sequencia = itertools.count()
+        self.__ativas = 0
+
+        self.__reservas = 0
+        self.__expiradas = 0
+        self.__conflitos = 0
+        self.__liberadas = 0
+
+        self.__parar: Optional[threading.Event] = None
+
+    # ===================== CONSULTA =====================
+
+    def reservado(self, sku: int) -> int:
+        with self.__lock:
+            self.__varrer(self.__relogio())
+            return self.__reservado.get(sku, 0)
+
+    def disponivel(self, produto) -> int:
+        """Estoque do produto menos as reservas ativas do SKU (O(1))."""
+        return produto.estoque - self.reservado(produto.sku)
+
+    def reservas_de(self, dono: int) -> List[Reserva]:
+        with self.__lock:
+            self.__varrer(self.__relogio())
+            return list(self.__por_dono.get(dono, {}).values())
+
+    # ===================== RESERVA / LIBERAÇÃO =====================
+
+    def __gravar(self, dono: int, sku: int, quantidade: int, expira_em: float) -> None:
+        """Troca a reserva (dono, sku) e ajusta o total do SKU."""
+        reservas_dono = self.__por_dono.setdefault(dono, {})
+        anterior = reservas_dono.get(sku)
+        delta = quantidade - (anterior.quantidade if anterior is not None else 0)
+
+        reserva = Reserva(dono, sku, quantidade, expira_em)
+        reservas_dono[sku] = reserva
+        self.__reservado[sku] = self.__reservado.get(sku, 0) + delta
+        if anterior is None:
+            self.__ativas += 1
+        heapq.heappush(self.__heap, (expira_em, next(self.__sequencia), reserva))
+        if len(self.__heap) > 2 * self.__ativas:
+            self.__compactar()
+
+    def __compactar(self) -> None:
+        """Refaz o heap só com as reservas vigentes (O(n), amortizado nas gravações)."""
+        self.__heap = [
+            (reserva.expira_em, next(self.__sequencia), reserva)
+            for reservas_dono in self.__por_dono.values()
+            for reserva in reservas_dono.values()
+        ]
+        heapq.heapify(self.__heap)
+
+    def __remover(self, dono: int, sku: int) -> Optional[Reserva]:
+        reservas_dono = self.__por_dono.get(dono)
+        if not reservas_dono or sku not in reservas_dono:
+            return None
+        reserva = reservas_dono.pop(sku)
+        if not reservas_dono:
+            del self.__por_dono[dono]
+        self.__ativas -= 1
+
+        restante = self.__reservado[sku] - reserva.quantidade
+        if restante:
+            self.__reservado[sku] = restante
+        else:
+            del self.__reservado[sku]
+        return reserva
+
+    def reservar(self, produto, quantidade: int, dono: int, ttl: Optional[float] = None) -> Reserva:
+        """
+        Reserva `quantidade` unidades do produto para o dono (substitui a
+        reserva anterior do mesmo dono e SKU, renovando a validade).
+        Sem disponível suficiente, nada muda e sobe ValueError.
+        """
+        return self.reservar_itens(dono, [(produto, quantidade)], ttl=ttl)[0]
+
+    def reservar_itens(
+        self,
+        dono: int,
+        itens: Iterable[Tuple[object, int]],
+        ttl: Optional[float] = None,
+        liberar_de: Optional[int] = None,
+    ) -> List[Reserva]:
+        """
+        Reserva vários (produto, quantidade) para o dono, tudo ou nada.
+
+        Com `liberar_de`, as reservas desse outro dono (ex.: o carrinho que
+        virou pedido) contam como disponíveis e são liberadas no sucesso:
+        é a passagem das unidades do carrinho para o pedido.
+        """
+        pedidos: Dict[int, Tuple[object, int]] = {}
+        for produto, quantidade in itens:
+            if not isinstance(quantidade, int):
+                raise TypeError("Error: quantidade must be an integer.")
+            if quantidade < 1:
+                raise ValueError("Error: quantidade must be >= 1.")
+            _, acumulado = pedidos.get(produto.sku, (produto, 0))
+            pedidos[produto.sku] = (produto, acumulado + quantidade)
+
+        with self.__lock:
+            agora = self.__relogio()
+            self.__varrer(agora)
+
+            proprias = self.__por_dono.get(dono, {})
+            transferidas = self.__por_dono.get(liberar_de, {}) if liberar_de is not None else {}
+            for sku, (produto, quantidade) in pedidos.items():
+                livre = produto.estoque - self.__reservado.get(sku, 0)
+                for reservas in (proprias, transferidas):
+                    if sku in reservas:
+                        livre += reservas[sku].quantidade
+                if quantidade > livre:
+                    self.__conflitos += 1
+                    raise ValueError(
+                        f"Error: insufficient available stock for sku {sku}: "
+                        f"requested {quantidade}, available {max(livre, 0)}."
+                    )
+
+            if liberar_de is not None and liberar_de != dono:
+                for sku in list(transferidas):
+                    self.__remover(liberar_de, sku)
+                    self.__liberadas += 1
+
+            expira_em = agora + (self.__ttl if ttl is None else float(ttl))
+            for sku, (_produto, quantidade) in pedidos.items():
+                self.__gravar(dono, sku, quantidade, expira_em)
+                self.__reservas += 1
+            return [self.__por_dono[dono][sku] for sku in pedidos]
+
+    def liberar(self, dono: int, sku: Optional[int] = None) -> int:
+        """Libera as reservas do dono (só a do SKU, se informado). Retorna as unidades."""
+        with self.__lock:
+            skus = [sku] if sku is not None else list(self.__por_dono.get(dono, {}))
+            unidades = 0
+            for s in skus:
+                reserva = self.__remover(dono, s)
+                if reserva is not None:
+                    unidades += reserva.quantidade
+                    self.__liberadas += 1
+            return unidades
+
+    # ===================== VARREDURA =====================
+
+    def __varrer(self, agora: float) -> int:
+        heap = self.__heap
+        vencidas = 0
+        while heap and heap[0][0] <= agora:
+            _, _, reserva = heapq.heappop(heap)
+            # só vence se ainda é a reserva vigente (não foi trocada/liberada)
+            if self.__por_dono.get(reserva.dono, {}).get(reserva.sku) is reserva:
+                self.__remover(reserva.dono, reserva.sku)
+                vencidas += 1
+        self.__expiradas += vencidas
+        return vencidas
+
+    def varrer(self) -> int:
+        """Libera as reservas vencidas agora. Retorna quantas venceram."""
+        with self.__lock:
+            return self.__varrer(self.__relogio())
+
+    def iniciar_varredura(self, intervalo: float = 1.0) -> None:
+        """Varre em uma thread daemon a cada `intervalo` segundos."""
+        with self.__lock:
+            if self.__parar is not None:
+                return
+            parar = self.__parar = threading.Event()
+
+        def executar():
+            while not parar.wait(intervalo):
+                self.varrer()
+
+        threading.Thread(target=executar, name="varredura-reservas", daemon=True).start()
+
+    def parar_varredura(self) -> None:
+        with self.__lock:
+            parar, self.__parar = self.__parar, None
+        if parar is not None:
+            parar.set()
+
+    # ===================== MÉTRICAS =====================
+
+    def metricas(self) -> MetricasReservas:
+        with self.__lock:
+            return MetricasReservas(
+                reservas=self.__reservas,
+                expiradas=self.__expiradas,
+                conflitos=self.__conflitos,
+                liberadas=self.__liberadas,
+                ativas=self.__ativas,
+                entradas_heap=len(self.__heap),
+            )
+
+    def __repr__(self) -> str:
+        return f"LivroReservas(ttl={self.__ttl}, skus_reservados={len(self.__reservado)})"
+
+    def __reduce__(self):
+        # o livro do processo vai no pickle pelo nome (ex.: dentro de um
+        # Carrinho): quem carrega volta a usar o RESERVAS de lá
+        if self is RESERVAS:
+            return "RESERVAS"
+        return super().__reduce__()
+
+
+# Livro único do processo, usado por padrão pelo Carrinho (reservas=None
+# desliga as reservas); o pedido criado do carrinho continua no mesmo livro.
+RESERVAS = LivroReservas()
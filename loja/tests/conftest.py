@@ -0,0 +1,12 @@
+import pytest
+
+from loja.persistence import db
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """Banco SQLite novo (migrado) em tmp_path; o pool é fechado no fim."""
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "loja_teste.db")
+    db.init_db()
+    yield
+    db.fechar_pool()
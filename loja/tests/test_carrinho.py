@@ -1,3 +1,5 @@
+import pickle
+
 import pytest
 
 from src.carrinho import Carrinho
@@ -198,4 +200,76 @@ def test_str_carrinho(carrinho_vazio):
 def test_repr_carrinho(carrinho_vazio):
     texto = repr(carrinho_vazio)
     assert "Carrinho (id:" in texto
-    assert "cliente:" in texto
\ No newline at end of file
+    assert "cliente:" in texto
+
+# -------------------------
+# TESTES: totais incrementais
+# -------------------------
+def test_totais_acompanham_todas_as_operacoes(carrinho_com_itens, produto1, produto2):
+    carrinho_com_itens.adicionar_item(produto2, quantidade=4)
+    carrinho_com_itens.alterar_quantidade(produto1.sku, nova_quantidade=7)
+    esperado = sum(item.subtotal() for item in carrinho_com_itens.itens)
+    assert carrinho_com_itens.calcular_subtotal() == pytest.approx(esperado)
+    assert len(carrinho_com_itens) == 7 + 5
+
+    carrinho_com_itens.remover_item(produto1.sku)
+    assert carrinho_com_itens.calcular_subtotal() == pytest.approx(5 * produto2.preco)
+    assert len(carrinho_com_itens) == 5
+
+    carrinho_com_itens.remover_item(produto2.sku)
+    assert carrinho_com_itens.calcular_subtotal() == 0.0
+    assert len(carrinho_com_itens) == 0
+
+
+def test_itens_mantem_ordem_de_insercao(carrinho_vazio, produto1, produto2):
+    carrinho_vazio.adicionar_item(produto2)
+    carrinho_vazio.adicionar_item(produto1)
+    carrinho_vazio.adicionar_item(produto2)
+    assert [item.produto for item in carrinho_vazio.itens] == [produto2, produto1]
+
+
+def test_limpar_zera_totais(carrinho_com_itens):
+    carrinho_com_itens.limpar()
+    assert carrinho_com_itens.calcular_subtotal() == 0.0
+    assert len(carrinho_com_itens) == 0
+
+
+def test_quantidade_alterada_direto_no_item(carrinho_com_itens, produto1):
+    (item,) = [i for i in carrinho_com_itens.itens if i.produto is produto1]
+    item.quantidade = 9
+    esperado = sum(i.subtotal() for i in carrinho_com_itens.itens)
+    assert carrinho_com_itens.calcular_subtotal() == pytest.approx(esperado)
+    assert len(carrinho_com_itens) == sum(i.quantidade for i in carrinho_com_itens.itens)
+
+    # item removido não mexe mais nos totais
+    carrinho_com_itens.remover_item(produto1.sku)
+    antes = carrinho_com_itens.calcular_subtotal()
+    item.quantidade = 1
+    assert carrinho_com_itens.calcular_subtotal() == antes
+
+
+def test_subtotal_sem_residuo_de_ponto_flutuante(carrinho_vazio):
+    bala = Produto("Bala", "DOCES", 0.1, 1000)
+    chiclete = Produto("Chiclete", "DOCES", 0.2, 1000)
+    for _ in range(10):
+        carrinho_vazio.adicionar_item(bala)
+    carrinho_vazio.adicionar_item(chiclete)
+    assert carrinho_vazio.calcular_subtotal() == 1.2
+
+    carrinho_vazio.remover_item(bala.sku)
+    assert carrinho_vazio.calcular_subtotal() == 0.2
+
+
+def test_pickle_mantem_itens_ligados_ao_carrinho(carrinho_com_itens, produto1):
+    copia = pickle.loads(pickle.dumps(carrinho_com_itens))
+    assert copia.id == carrinho_com_itens.id
+    # o livro do processo não é copiado: a cópia reserva no mesmo RESERVAS
+    assert copia.reservas is carrinho_com_itens.reservas is not None
+    assert copia.calcular_subtotal() == carrinho_com_itens.calcular_subtotal()
+
+    (item,) = [i for i in copia.itens if i.produto.sku == produto1.sku]
+    item.quantidade += 1
+    assert copia.calcular_subtotal() == pytest.approx(
+        carrinho_com_itens.calcular_subtotal() + produto1.preco
+    )
+    assert len(copia) == len(carrinho_com_itens) + 1
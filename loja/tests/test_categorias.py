@@ -0,0 +1,111 @@
+from datetime import date
+
+import pytest
+
+from loja.src.carrinho import Carrinho
+from loja.src.categorias import CatalogoCategorias, mascara_de
+from loja.src.cliente import Cliente
+from loja.src.cupom import Cupom, compilar_cupons
+from loja.src.item_pedido import ItemPedido
+from loja.src.pedido import Pedido
+from loja.src.produto import Produto
+
+
+# -------------------------
+# FIXTURES
+# -------------------------
+@pytest.fixture
+def cliente():
+    return Cliente("Pedro", "pedro@example.com", "12345678901")
+
+
+@pytest.fixture
+def pedido_livros(cliente):
+    livro = Produto("Livro", "Livros", 80.0, 10)
+    return Pedido(
+        cliente=cliente,
+        itens=[ItemPedido(str(livro.sku), livro.nome, 1, livro.preco, produto=livro)],
+    )
+
+
+# -------------------------
+# TESTES: catálogo
+# -------------------------
+def test_catalogo_normaliza_e_mantem_ids():
+    catalogo = CatalogoCategorias()
+    assert catalogo.id_de("livros") == catalogo.id_de(" LIVROS ") == 0
+    assert catalogo.id_de("JOGOS") == 1
+    assert catalogo.mascara(["Jogos", None, "", "livros"]) == 0b11
+    assert catalogo.categorias(0b10) == ["JOGOS"]
+    assert len(catalogo) == 2
+
+
+def test_mascaras_com_categoria_em_comum():
+    assert mascara_de(["LIVROS", "JOGOS"]) & mascara_de(["livros "])
+    assert not mascara_de(["LIVROS"]) & mascara_de(["ELETRONICOS"])
+
+
+# -------------------------
+# TESTES: cupom
+# -------------------------
+def test_aplicavel_ignora_maiusculas():
+    cupom = Cupom("LIV", "VALOR", 5.0, None, categ_elegiveis=["livros"])
+    assert cupom.aplicavel("Livros")
+    assert cupom.aplicavel(" LIVROS ")
+    assert not cupom.aplicavel("jogos")
+
+
+def test_mascara_acompanha_categorias():
+    cupom = Cupom("LIV", "VALOR", 5.0, None)
+    assert cupom.mascara_categorias == 0
+    cupom.categorias_elegiveis = ["livros"]
+    assert cupom.mascara_categorias == mascara_de(["LIVROS"])
+
+
+def test_cupom_de_categoria_aplica_no_pedido(pedido_livros):
+    cupom = Cupom("LIV", "PERCENTUAL", 10.0, None, uso_maximo=5, categ_elegiveis=["LIVROS"])
+    outro = Cupom("JOG", "PERCENTUAL", 10.0, None, uso_maximo=5, categ_elegiveis=["JOGOS"])
+
+    assert cupom.esta_valido_para_pedido(pedido_livros)
+    assert cupom.calcular_desconto_para_pedido(pedido_livros) == 8.0
+    assert not outro.esta_valido_para_pedido(pedido_livros)
+    assert outro.calcular_desconto_para_pedido(pedido_livros) == 0.0
+
+
+def test_mascara_do_pedido_recalculada_ao_trocar_itens(pedido_livros):
+    assert pedido_livros.mascara_categorias == mascara_de(["LIVROS"])
+    jogo = Produto("Jogo", "JOGOS", 50.0, 1)
+    pedido_livros.itens = [ItemPedido("2", "Jogo", 1, 50.0, produto=jogo)]
+    assert pedido_livros.mascara_categorias == mascara_de(["JOGOS"])
+
+
+def test_criar_de_carrinho_guarda_produto_nos_itens(cliente):
+    livro = Produto("Livro", "LIVROS", 80.0, 10)
+    carrinho = Carrinho(cliente=cliente)
+    carrinho.adicionar_item(livro, quantidade=2)
+
+    pedido = Pedido.criar_de_carrinho(carrinho)
+    assert pedido.itens[0].produto is livro
+    assert pedido.itens[0].sku == str(livro.sku)
+    assert pedido.subtotal == 160.0
+    assert pedido.mascara_categorias == mascara_de(["LIVROS"])
+
+
+# -------------------------
+# TESTES: cupons compilados
+# -------------------------
+def test_compilar_cupons_filtra_por_categoria_e_validade():
+    geral = Cupom("GERAL", "VALOR", 5.0, None)
+    livros = Cupom("LIV", "VALOR", 5.0, None, categ_elegiveis=["LIVROS"])
+    jogos = Cupom("JOG", "VALOR", 5.0, None, categ_elegiveis=["JOGOS"])
+    vencido = Cupom("VENC", "VALOR", 5.0, date(2000, 1, 1), categ_elegiveis=["LIVROS"])
+
+    compilados = compilar_cupons([geral, livros, jogos, vencido])
+    assert len(compilados) == 4
+    assert compilados.elegiveis(mascara_de(["livros"])) == [geral, livros]
+    assert compilados.elegiveis(0) == [geral]
+
+
+def test_compilar_cupons_tipo_invalido():
+    with pytest.raises(TypeError):
+        compilar_cupons(["GERAL"])
@@ -0,0 +1,222 @@
+import sqlite3
+import threading
+
+import pytest
+
+from loja import services
+from loja.persistence import db
+from loja.src.carrinho import Carrinho
+from loja.src.cliente import Cliente
+from loja.src.cupom import Cupom
+from loja.src.endereco import Endereco
+from loja.src.pagamento import Pagamento
+from loja.src.pedido import Pedido
+from loja.src.reservas import LivroReservas, RESERVAS
+from loja.src.produto import Produto
+
+
+# -------------------------
+# FIXTURES
+# -------------------------
+@pytest.fixture
+def cliente(banco):
+    endereco = Endereco("60115000", "Fortaleza", "CE", "Rua A", "10", None)
+    c = Cliente("Pedro", "pedro@example.com", "12345678901", [endereco])
+    db.salvar_cliente(c)
+    return c
+
+
+def _produto(estoque, preco=50.0):
+    p = Produto("Caneca", "CASA", preco, estoque)
+    db.salvar_produto(p)
+    return p
+
+
+def _carrinho(cliente, *itens):
+    carrinho = Carrinho(cliente=cliente)
+    for produto, quantidade in itens:
+        carrinho.adicionar_item(produto, quantidade=quantidade)
+    return carrinho
+
+
+def _estoque(produto):
+    return db.buscar_produto_por_sku(produto.sku).estoque
+
+
+# -------------------------
+# TESTES
+# -------------------------
+def test_checkout_grava_tudo(cliente):
+    caneca, livro = _produto(5), _produto(2, preco=30.0)
+    cupom = Cupom("DEZ", "VALOR", 10.0, None, uso_maximo=3, usos_realizados=0)
+    db.salvar_cupom(cupom)
+
+    pedido = services.fechar_pedido(
+        _carrinho(cliente, (caneca, 2), (livro, 1)), cliente, cupom=cupom, persistir=True
+    )
+
+    assert (_estoque(caneca), _estoque(livro)) == (3, 1)
+    assert db.buscar_cupom_por_codigo("DEZ").usos_realizados == 1
+    (salvo,) = [p for p in db.listar_pedidos() if p.id == pedido.id]
+    assert salvo.total == pedido.total == 130.0 - 10.0 + pedido.valor_frete
+    assert sorted(i.quantidade for i in salvo.itens) == [1, 2]
+
+
+def test_sem_estoque_nao_grava_nada(cliente):
+    caneca, livro = _produto(5), _produto(1)
+    cupom = Cupom("DEZ", "VALOR", 10.0, None, uso_maximo=3, usos_realizados=0)
+    db.salvar_cupom(cupom)
+
+    with pytest.raises(ValueError, match="stock"):
+        services.fechar_pedido(
+            _carrinho(cliente, (caneca, 2), (livro, 2)), cliente, cupom=cupom, persistir=True
+        )
+
+    assert (_estoque(caneca), _estoque(livro)) == (5, 1)
+    assert db.buscar_cupom_por_codigo("DEZ").usos_realizados == 0
+    assert cupom.usos_realizados == 0
+    assert db.listar_pedidos() == []
+
+
+def test_cupom_esgotado_no_banco_desfaz_estoque(cliente):
+    caneca = _produto(5)
+    db.salvar_cupom(Cupom("DEZ", "VALOR", 10.0, None, uso_maximo=1, usos_realizados=1))
+    # cópia em memória desatualizada, ainda com uso disponível
+    cupom = Cupom("DEZ", "VALOR", 10.0, None, uso_maximo=1, usos_realizados=0)
+
+    with pytest.raises(ValueError, match="cupom"):
+        services.fechar_pedido(_carrinho(cliente, (caneca, 1)), cliente, cupom=cupom, persistir=True)
+    assert _estoque(caneca) == 5
+
+
+def test_checkout_recusado_devolve_reserva_ao_carrinho(cliente):
+    caneca = _produto(5)
+    # outro processo vendeu: no banco só resta 1
+    db.registrar_movimentos_estoque([db.MovimentoEstoque(caneca.sku, -4, db.MOTIVO_VENDA)])
+    livro = LivroReservas()
+    carrinho = Carrinho(cliente=cliente, reservas=livro)
+    carrinho.adicionar_item(caneca, quantidade=4)
+
+    with pytest.raises(ValueError, match="stock"):
+        services.fechar_pedido(carrinho, cliente, persistir=True)
+
+    assert livro.reservado(caneca.sku) == 4
+    assert [r.quantidade for r in livro.reservas_de(carrinho.id)] == [4]
+
+
+def test_pagamento_nao_baixa_de_novo_o_estoque_do_checkout(cliente):
+    caneca = _produto(5)
+    livro = LivroReservas()
+    carrinho = Carrinho(cliente=cliente, reservas=livro)
+    carrinho.adicionar_item(caneca, quantidade=2)
+
+    pedido = services.fechar_pedido(carrinho, cliente, persistir=True)
+    pedido.registrar_pagamento(Pagamento(1, pedido, None, "pix", pedido.total))
+
+    assert pedido.status == Pedido.STATUS_PAGO
+    assert _estoque(caneca) == 3
+    assert caneca.estoque == 3  # saldo copiado do banco, sem baixa em memória
+    assert livro.reservado(caneca.sku) == 0
+
+
+def test_carrinho_padrao_nao_vende_alem_do_saldo_do_banco(cliente):
+    caneca = _produto(3)
+    pedido = services.fechar_pedido(_carrinho(cliente, (caneca, 2)), cliente, persistir=True)
+
+    assert (_estoque(caneca), caneca.estoque) == (1, 1)
+    assert RESERVAS.reservado(caneca.sku) == 0
+    with pytest.raises(ValueError, match="available"):
+        _carrinho(cliente, (caneca, 2))
+
+    # outro processo vendeu a última unidade: o checkout confere o banco
+    carrinho = _carrinho(cliente, (caneca, 1))
+    db.registrar_movimentos_estoque([db.MovimentoEstoque(caneca.sku, -1, db.MOTIVO_VENDA)])
+    with pytest.raises(ValueError, match="available"):
+        services.fechar_pedido(carrinho, cliente, persistir=True)
+    assert caneca.estoque == 0
+    assert [p.id for p in db.listar_pedidos()] == [pedido.id]
+
+
+def test_cancelar_devolve_ao_banco_o_estoque_do_checkout(cliente):
+    caneca = _produto(5)
+    pago = services.fechar_pedido(_carrinho(cliente, (caneca, 2)), cliente, persistir=True)
+    pago.registrar_pagamento(Pagamento(1, pago, None, "pix", pago.total))
+    pendente = services.fechar_pedido(_carrinho(cliente, (caneca, 1)), cliente, persistir=True)
+    assert _estoque(caneca) == 2
+
+    services.cancelar_pedido(pago)
+    services.cancelar_pedido(pendente)
+
+    assert (_estoque(caneca), caneca.estoque) == (5, 5)
+    assert [m.motivo for m in db.listar_movimentos_estoque(caneca.sku)][-2:] == [
+        db.MOTIVO_ESTORNO, db.MOTIVO_ESTORNO,
+    ]
+    assert db.buscar_pedido_por_id(pago.id).status == Pedido.STATUS_CANCELADO
+    # um segundo estorno do mesmo pedido não devolve de novo
+    assert db.estornar_pedido(pago) is False
+    assert _estoque(caneca) == 5
+
+
+def test_pedido_recarregado_lembra_que_o_checkout_baixou(cliente):
+    caneca = _produto(5)
+    pedido = services.fechar_pedido(_carrinho(cliente, (caneca, 2)), cliente, persistir=True)
+
+    recarregado = db.buscar_pedido_por_id(pedido.id)
+    # itens do banco não têm o Produto: baixar em memória falharia
+    recarregado.registrar_pagamento(Pagamento(1, recarregado, None, "pix", recarregado.total))
+    assert recarregado.status == Pedido.STATUS_PAGO
+    assert _estoque(caneca) == 3
+
+
+def test_repete_quando_banco_ocupado(cliente, monkeypatch):
+    monkeypatch.setattr(db, "CHECKOUT_ESPERA_INICIAL", 0.0)
+    caneca = _produto(5)
+    pedido = Pedido.criar_de_carrinho(_carrinho(cliente, (caneca, 1)))
+
+    original = db._executar_checkout
+    falhas = []
+
+    def ocupado_na_primeira(conn, pedido, cabecalho):
+        if not falhas:
+            falhas.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        original(conn, pedido, cabecalho)
+
+    monkeypatch.setattr(db, "_executar_checkout", ocupado_na_primeira)
+    db.registrar_checkout(pedido)
+    assert falhas == [1]
+    assert _estoque(caneca) == 4
+
+    def sempre_ocupado(conn, pedido, cabecalho):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(db, "_executar_checkout", sempre_ocupado)
+    with pytest.raises(sqlite3.OperationalError):
+        db.registrar_checkout(Pedido.criar_de_carrinho(_carrinho(cliente, (caneca, 1))), tentativas=2)
+
+
+def test_checkouts_concorrentes_nao_vendem_alem_do_estoque(cliente):
+    caneca = _produto(20)
+    vendidos, recusados = [], []
+
+    def comprar():
+        for _ in range(5):
+            # sem reservas: quem segura a venda aqui é só o banco
+            carrinho = Carrinho(cliente=cliente, reservas=None)
+            carrinho.adicionar_item(caneca, quantidade=1)
+            pedido = Pedido.criar_de_carrinho(carrinho)
+            try:
+                db.registrar_checkout(pedido)
+                vendidos.append(pedido.id)
+            except ValueError:
+                recusados.append(pedido.id)
+
+    threads = [threading.Thread(target=comprar) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(vendidos) == 20 and len(recusados) == 20
+    assert _estoque(caneca) == 0
+    assert len(db.listar_pedidos()) == 20
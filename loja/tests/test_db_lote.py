@@ -0,0 +1,80 @@
+import pytest
+
+from loja.persistence import db
+from loja.src.cliente import Cliente
+from loja.src.cupom import Cupom
+from loja.src.item_pedido import ItemPedido
+from loja.src.pedido import Pedido
+from loja.src.produto import Produto
+
+
+# -------------------------
+# FIXTURES
+# -------------------------
+def gerar_produtos(n):
+    for i in range(n):
+        yield Produto(f"Produto {i}", "GERAL", 10.0 + i, i)
+
+
+# -------------------------
+# TESTES: salvar_*_em_lote
+# -------------------------
+def test_salvar_produtos_em_lote_aceita_gerador(banco):
+    produtos = list(gerar_produtos(25))
+    estatisticas = db.salvar_produtos_em_lote(iter(produtos), tamanho_lote=10)
+
+    assert [e.linhas for e in estatisticas] == [10, 10, 5]
+    assert [e.numero for e in estatisticas] == [1, 2, 3]
+    assert all(e.segundos >= 0 for e in estatisticas)
+    assert len({p.sku for p in db.listar_produtos()}) == len({p.sku for p in produtos})
+
+
+def test_salvar_produtos_em_lote_atualiza_existentes(banco):
+    produto = Produto("Caneta", "ESCRITORIO", 2.5, 10)
+    db.salvar_produto(produto)
+    produto.preco = 3.0
+    db.salvar_produtos_em_lote([produto])
+
+    assert db.buscar_produto_por_sku(produto.sku).preco == 3.0
+
+
+def test_salvar_em_lote_vazio(banco):
+    assert db.salvar_clientes_em_lote([]) == []
+
+
+def test_falha_em_um_lote_desfaz_todos(banco):
+    clientes = [
+        Cliente("Pedro", "pedro@example.com", "12345678901"),
+        Cliente("Ana", "ana@example.com", "10987654321"),
+        # email repetido viola o UNIQUE da tabela
+        Cliente("Outro", "pedro@example.com", "11111111111"),
+    ]
+    with pytest.raises(Exception):
+        db.salvar_clientes_em_lote(clientes, tamanho_lote=1)
+    assert db.listar_clientes() == []
+
+
+def test_salvar_cupons_em_lote(banco):
+    cupons = [Cupom(f"CUPOM{i}", "PERCENTUAL", 5.0, None) for i in range(3)]
+    db.salvar_cupons_em_lote(cupons)
+    assert db.buscar_cupom_por_codigo("CUPOM2").valor == 5.0
+
+
+def test_salvar_pedidos_em_lote_grava_itens(banco):
+    cliente = Cliente("Pedro", "pedro@example.com", "12345678901")
+    db.salvar_cliente(cliente)
+    pedidos = [
+        Pedido(cliente=cliente, itens=[ItemPedido("SKU1", "Produto", 2, 5.0), ItemPedido("SKU2", "Outro", 1, 3.0)])
+        for _ in range(3)
+    ]
+    estatisticas = db.salvar_pedidos_em_lote(pedidos, tamanho_lote=2)
+
+    assert [e.linhas for e in estatisticas] == [2, 1]
+    carregados = db.listar_pedidos()
+    assert len(carregados) == 3
+    assert all(len(p.itens) == 2 for p in carregados)
+
+
+def test_tamanho_lote_invalido(banco):
+    with pytest.raises(ValueError):
+        db.salvar_produtos_em_lote([], tamanho_lote=0)
@@ -0,0 +1,325 @@
+from datetime import datetime
+
+import pytest
+
+from loja.persistence import db
+from loja.services import relatorio_ocupacao_periodo
+from loja.src.cliente import Cliente
+from loja.src.cupom import Cupom
+from loja.src.item_pedido import ItemPedido
+from loja.src.pedido import Pedido
+from loja.src.produto import Produto
+
+
+# -------------------------
+# FIXTURES
+# -------------------------
+@pytest.fixture
+def clientes(banco):
+    lista = [
+        Cliente("Pedro", "pedro@example.com", "12345678901"),
+        Cliente("Ana", "ana@example.com", "10987654321"),
+    ]
+    for c in lista:
+        db.salvar_cliente(c)
+    return lista
+
+
+@pytest.fixture
+def cupom(banco):
+    c = Cupom("DEZ", "VALOR", 10.0, None, uso_maximo=50, usos_realizados=3)
+    db.salvar_cupom(c)
+    return c
+
+
+def criar_pedido(cliente, n_itens=2, cupom=None):
+    itens = [
+        ItemPedido(sku=f"SKU{i}", nome=f"Produto {i}", quantidade=i + 1, preco_unitario=10.0)
+        for i in range(n_itens)
+    ]
+    pedido = Pedido(cliente=cliente, itens=itens)
+    if cupom is not None:
+        pedido.cupom = cupom
+    return pedido
+
+
+@pytest.fixture
+def contador_consultas(monkeypatch):
+    """Conta os comandos SQL executados pelas conexões de db.get_connection()."""
+    consultas = []
+    original = db.get_connection
+
+    def get_connection_com_trace():
+        conn = original()
+        conn.set_trace_callback(consultas.append)
+        return conn
+
+    monkeypatch.setattr(db, "get_connection", get_connection_com_trace)
+    return consultas
+
+
+# -------------------------
+# TESTES: listar_pedidos
+# -------------------------
+def test_listar_pedidos_sem_pedidos(banco):
+    assert db.listar_pedidos() == []
+
+
+def test_listar_pedidos_reconstroi_campos(clientes, cupom):
+    pedido = criar_pedido(clientes[0], n_itens=3, cupom=cupom)
+    pedido.descontos = 10.0
+    pedido.calcular_total()
+    db.salvar_pedido(pedido)
+
+    carregados = db.listar_pedidos()
+    assert len(carregados) == 1
+    p = carregados[0]
+    assert p.id == pedido.id
+    assert p.cliente.id == clientes[0].id
+    assert p.status == pedido.status
+    assert p.subtotal == pedido.subtotal
+    assert p.descontos == 10.0
+    assert p.total == pedido.total
+    assert p.criado_em.replace(microsecond=0) == pedido.criado_em.replace(microsecond=0)
+    assert [i.sku for i in p.itens] == ["SKU0", "SKU1", "SKU2"]
+    assert [i.quantidade for i in p.itens] == [1, 2, 3]
+    assert p.cupom.codigo == "DEZ"
+
+
+def test_listar_pedidos_nao_registra_uso_do_cupom_de_novo(clientes, cupom):
+    for _ in range(3):
+        db.salvar_pedido(criar_pedido(clientes[0], cupom=cupom))
+
+    pedidos = db.listar_pedidos()
+    assert all(p.cupom.usos_realizados == 3 for p in pedidos)
+
+
+def test_listar_pedidos_compartilha_cliente_e_cupom(clientes, cupom):
+    for _ in range(4):
+        db.salvar_pedido(criar_pedido(clientes[0], cupom=cupom))
+    db.salvar_pedido(criar_pedido(clientes[1]))
+
+    pedidos = db.listar_pedidos()
+    do_pedro = [p for p in pedidos if p.cliente.id == clientes[0].id]
+
+    assert len(do_pedro) == 4
+    assert len({id(p.cliente) for p in do_pedro}) == 1
+    assert len({id(p.cupom) for p in do_pedro}) == 1
+
+
+def test_listar_pedidos_numero_fixo_de_consultas(clientes, cupom, contador_consultas):
+    for i in range(10):
+        db.salvar_pedido(criar_pedido(clientes[i % 2], cupom=cupom if i % 3 else None))
+
+    contador_consultas.clear()
+    pedidos = db.listar_pedidos()
+    selects = [q for q in contador_consultas if q.lstrip().upper().startswith("SELECT")]
+
+    assert len(pedidos) == 10
+    assert len(selects) == 4
+
+
+# -------------------------
+# TESTES: iteradores
+# -------------------------
+def test_iterar_pedidos_em_varios_lotes(clientes, cupom):
+    for i in range(5):
+        db.salvar_pedido(criar_pedido(clientes[i % 2], cupom=cupom))
+
+    pedidos = list(db.iterar_pedidos(tamanho_lote=2))
+    assert len(pedidos) == 5
+    assert [p.criado_em for p in pedidos] == sorted(p.criado_em for p in pedidos)
+
+
+def test_iterar_pedidos_filtra_periodo_e_status(clientes):
+    for dia in (1, 5, 10, 20):
+        pedido = Pedido(
+            cliente=clientes[0],
+            itens=[ItemPedido("SKU1", "Produto", 1, 10.0)],
+            criado_em=datetime(2025, 1, dia, 12, 0, 0),
+            status=Pedido.STATUS_PAGO if dia % 2 == 0 else Pedido.STATUS_CRIADO,
+        )
+        db.salvar_pedido(pedido)
+
+    no_periodo = list(db.iterar_pedidos(inicio=datetime(2025, 1, 5), fim=datetime(2025, 1, 10, 23, 59)))
+    assert [p.criado_em.day for p in no_periodo] == [5, 10]
+
+    pagos = list(db.iterar_pedidos(status=Pedido.STATUS_PAGO))
+    assert [p.criado_em.day for p in pagos] == [10, 20]
+
+
+def test_iterar_pedidos_tamanho_lote_invalido(banco):
+    with pytest.raises(ValueError):
+        list(db.iterar_pedidos(tamanho_lote=0))
+
+
+def test_iterar_produtos_filtra_categoria(banco):
+    for nome, categoria in [("A", "LIVROS"), ("B", "JOGOS"), ("C", "LIVROS")]:
+        db.salvar_produto(Produto(nome, categoria, 10.0, 5))
+
+    livros = list(db.iterar_produtos(categoria="LIVROS", tamanho_lote=1))
+    assert sorted(p.nome for p in livros) == ["A", "C"]
+    assert len(db.listar_produtos()) == 3
+
+
+def test_iterar_clientes(clientes):
+    ids = sorted(c.id for c in clientes)
+    assert [c.id for c in db.iterar_clientes(tamanho_lote=1)] == ids
+
+
+def test_relatorio_ocupacao_periodo(clientes):
+    for dia in (1, 2, 3):
+        db.salvar_pedido(
+            Pedido(
+                cliente=clientes[0],
+                itens=[ItemPedido("SKU1", "Produto", 1, 10.0)],
+                criado_em=datetime(2025, 3, dia, 9, 0, 0),
+            )
+        )
+
+    relatorio = relatorio_ocupacao_periodo(datetime(2025, 3, 2), datetime(2025, 3, 31))
+    assert relatorio["total_pedidos"] == 2
+    assert relatorio["quantidade_por_status"] == {Pedido.STATUS_CRIADO: 2}
+    assert relatorio["percentual_por_status"] == {Pedido.STATUS_CRIADO: 100.0}
+
+
+# -------------------------
+# TESTES: paginação por chave
+# -------------------------
+def test_paginar_pedidos_percorre_tudo_sem_repetir(clientes):
+    # vários pedidos no mesmo segundo: o id desempata
+    for i in range(7):
+        db.salvar_pedido(
+            Pedido(
+                cliente=clientes[0],
+                itens=[ItemPedido("SKU1", "Produto", 1, 10.0)],
+                criado_em=datetime(2025, 2, 1, 10, 0, i // 3),
+            )
+        )
+
+    vistos = []
+    token = None
+    paginas = 0
+    while True:
+        pagina = db.paginar_pedidos(limite=3, token=token)
+        vistos.extend(p.id for p in pagina.itens)
+        paginas += 1
+        token = pagina.proximo_token
+        if token is None:
+            break
+
+    assert paginas == 3
+    assert len(vistos) == len(set(vistos)) == 7
+
+
+def test_paginar_pedidos_por_status(clientes):
+    for i in range(4):
+        db.salvar_pedido(
+            Pedido(
+                cliente=clientes[0],
+                itens=[ItemPedido("SKU1", "Produto", 1, 10.0)],
+                status=Pedido.STATUS_PAGO if i % 2 else Pedido.STATUS_CRIADO,
+            )
+        )
+
+    pagina = db.paginar_pedidos(limite=10, status=Pedido.STATUS_PAGO)
+    assert len(pagina.itens) == 2
+    assert pagina.proximo_token is None
+
+
+def test_paginar_produtos(banco):
+    for i in range(5):
+        db.salvar_produto(Produto(f"Produto {i}", "LIVROS" if i % 2 else "JOGOS", 10.0, 1))
+
+    primeira = db.paginar_produtos(limite=2)
+    segunda = db.paginar_produtos(limite=2, token=primeira.proximo_token)
+    skus = [p.sku for p in primeira.itens + segunda.itens]
+    assert skus == sorted(skus)
+
+    livros = db.paginar_produtos(limite=10, categoria="LIVROS")
+    assert {p.categoria for p in livros.itens} == {"LIVROS"}
+
+
+def test_token_invalido(banco):
+    with pytest.raises(ValueError):
+        db.paginar_produtos(token="nao-e-um-token")
+
+    token_pedidos = db._codificar_token("pedidos", ["2025-01-01T00:00:00", 1])
+    with pytest.raises(ValueError):
+        db.paginar_produtos(token=token_pedidos)
+
+
+# -------------------------
+# TESTES: salvar_pedido com diff
+# -------------------------
+def comandos_de_escrita(consultas):
+    return [
+        " ".join(q.split())
+        for q in consultas
+        if q.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE"))
+    ]
+
+
+def test_mudanca_so_de_status_vira_um_update(clientes, contador_consultas):
+    pedido = criar_pedido(clientes[0], n_itens=3)
+    db.salvar_pedido(pedido)
+
+    pedido.status = Pedido.STATUS_ENVIADO
+    pedido.codigo_rastreio = "BR123"
+    contador_consultas.clear()
+    db.salvar_pedido(pedido)
+
+    escritas = comandos_de_escrita(contador_consultas)
+    assert len(escritas) == 1
+    assert escritas[0].startswith("UPDATE pedidos SET status = 'ENVIADO', codigo_rastreio = 'BR123'")
+
+    carregado = db.listar_pedidos()[0]
+    assert carregado.status == Pedido.STATUS_ENVIADO
+    assert carregado.codigo_rastreio == "BR123"
+
+
+def test_pedido_sem_mudancas_nao_acessa_banco(clientes, contador_consultas):
+    pedido = criar_pedido(clientes[0])
+    db.salvar_pedido(pedido)
+
+    contador_consultas.clear()
+    db.salvar_pedido(pedido)
+    assert contador_consultas == []
+
+
+def test_pedido_carregado_atualiza_so_status(clientes, contador_consultas):
+    db.salvar_pedido(criar_pedido(clientes[0], n_itens=2))
+    pedido = db.listar_pedidos()[0]
+
+    pedido.status = Pedido.STATUS_CANCELADO
+    contador_consultas.clear()
+    db.salvar_pedido(pedido)
+
+    escritas = comandos_de_escrita(contador_consultas)
+    assert len(escritas) == 1
+    assert escritas[0].startswith("UPDATE pedidos SET status")
+
+
+def test_diff_de_itens(clientes, contador_consultas):
+    pedido = criar_pedido(clientes[0], n_itens=3)  # SKU0, SKU1, SKU2
+    db.salvar_pedido(pedido)
+
+    pedido.itens = [
+        pedido.itens[0],                                   # igual
+        ItemPedido("SKU1", "Produto 1", 9, 10.0),           # quantidade mudou
+        ItemPedido("SKU9", "Novo", 1, 99.0),                # novo
+    ]                                                      # SKU2 removido
+    pedido.calcular_subtotal()
+    pedido.calcular_total()
+    contador_consultas.clear()
+    db.salvar_pedido(pedido)
+
+    escritas = comandos_de_escrita(contador_consultas)
+    assert any(e.startswith("UPDATE pedidos SET subtotal") for e in escritas)
+    assert sum(e.startswith("DELETE FROM itens_pedido") for e in escritas) == 1
+    assert sum(e.startswith("UPDATE itens_pedido") for e in escritas) == 1
+    assert sum(e.startswith("INSERT INTO itens_pedido") for e in escritas) == 1
+
+    carregado = db.listar_pedidos()[0]
+    assert {i.sku: i.quantidade for i in carregado.itens} == {"SKU0": 1, "SKU1": 9, "SKU9": 1}
+    assert carregado.subtotal == pedido.subtotal
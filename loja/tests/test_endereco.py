@@ -32,7 +32,7 @@ def test_criacao_endereco(endereco_valido):
 # ------------------------------
 def test_id_gerado_automaticamente(endereco_valido):
     assert isinstance(endereco_valido.id, int)
-    assert 0 <= endereco_valido.id <= 9999
+    assert endereco_valido.id > 0
 
 # ------------------------------
 # TESTE: CEP VÁLIDO
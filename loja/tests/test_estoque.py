@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+from loja.src.estoque import GerenciadorEstoque
+from loja.src.produto import Produto
+
+
+class ProdutoLento:
+    """Produto cujo estoque demora a ser lido: abre a janela da corrida."""
+
+    def __init__(self, sku, estoque):
+        self.sku = sku
+        self.nome = f"P{sku}"
+        self._estoque = estoque
+
+    @property
+    def estoque(self):
+        valor = self._estoque
+        time.sleep(0.001)
+        return valor
+
+    @estoque.setter
+    def estoque(self, valor):
+        if valor < 0:
+            raise ValueError("Error: estoque must be non-negative.")
+        self._estoque = valor
+
+
+def _em_threads(n, alvo):
+    erros = []
+
+    def executar(i):
+        try:
+            alvo(i)
+        except ValueError as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=executar, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert not any(t.is_alive() for t in threads), "deadlock"
+    return erros
+
+
+# -------------------------
+# TESTES
+# -------------------------
+def test_baixas_concorrentes_nao_deixam_estoque_negativo():
+    gerenciador = GerenciadorEstoque()
+    produto = ProdutoLento(1, 10)
+
+    erros = _em_threads(30, lambda _i: gerenciador.baixar([(produto, 1)]))
+
+    assert produto.estoque == 0
+    assert len(erros) == 20
+    assert gerenciador.metricas().recusas == 20
+    assert gerenciador.metricas().operacoes == 10
+
+
+def test_ordens_opostas_de_skus_nao_travam():
+    gerenciador = GerenciadorEstoque(n_listras=8)
+    a, b = ProdutoLento(1, 1000), ProdutoLento(2, 1000)
+
+    def alvo(i):
+        itens = [(a, 1), (b, 1)] if i % 2 else [(b, 1), (a, 1)]
+        for _ in range(5):
+            gerenciador.baixar(itens)
+            gerenciador.estornar(itens)
+
+    assert _em_threads(8, alvo) == []
+    assert (a.estoque, b.estoque) == (1000, 1000)
+
+
+def test_baixa_e_tudo_ou_nada():
+    gerenciador = GerenciadorEstoque()
+    caneca = Produto("Caneca", "CASA", 10.0, 5)
+    livro = Produto("Livro", "LIVROS", 30.0, 1)
+
+    with pytest.raises(ValueError):
+        gerenciador.baixar([(caneca, 2), (livro, 2)])
+    assert (caneca.estoque, livro.estoque) == (5, 1)
+
+
+def test_itens_repetidos_sao_somados():
+    gerenciador = GerenciadorEstoque()
+    caneca = Produto("Caneca", "CASA", 10.0, 3)
+
+    with pytest.raises(ValueError):
+        gerenciador.baixar([(caneca, 2), (caneca, 2)])
+    gerenciador.baixar([(caneca, 1), (caneca, 2)])
+    assert caneca.estoque == 0
+
+
+def test_skus_distintos_pegam_listras_em_ordem():
+    gerenciador = GerenciadorEstoque(n_listras=4)
+    primeiro, *outros = range(10)
+    mesma = next(sku for sku in outros if gerenciador.listra(sku) == gerenciador.listra(primeiro))
+    with gerenciador.travar([7, primeiro, mesma]):
+        # a mesma listra não é presa duas vezes (Lock não é reentrante)
+        pass
+
+
+def test_skus_do_gerador_se_espalham_pelas_listras():
+    gerenciador = GerenciadorEstoque()
+    skus = []
+    for _ in range(20):
+        skus.append(Produto("Caneca", "CASA", 10.0, 1).sku)
+        time.sleep(0.001)  # ms diferentes: sequência 0 em todos
+    assert len({gerenciador.listra(sku) for sku in skus}) > 1
+
+
+def test_produto_sem_estoque():
+    gerenciador = GerenciadorEstoque()
+    with pytest.raises(AttributeError):
+        gerenciador.baixar([(None, 1)])
+
+
+def test_n_listras_invalido():
+    with pytest.raises(ValueError):
+        GerenciadorEstoque(n_listras=0)
+    with pytest.raises(TypeError):
+        GerenciadorEstoque(n_listras="8")
@@ -0,0 +1,243 @@
+import datetime
+import os
+import sqlite3
+import time
+
+import pytest
+
+from loja import services
+from loja.persistence import db
+from loja.persistence.migrations import MIGRACOES, aplicar_migracoes
+from loja.src.carrinho import Carrinho
+from loja.src.cliente import Cliente
+from loja.src.endereco import Endereco
+from loja.src.produto import Produto
+
+
+# -------------------------
+# FIXTURES
+# -------------------------
+def _produto(estoque):
+    p = Produto("Caneca", "CASA", 50.0, estoque)
+    db.salvar_produto(p)
+    return p
+
+
+def _estoque(produto):
+    return db.buscar_produto_por_sku(produto.sku).estoque
+
+
+def _instante(minuto):
+    return datetime.datetime(2025, 3, 1, 10, minuto)
+
+
+@pytest.fixture
+def fuso_atras_do_utc():
+    if not hasattr(time, "tzset"):
+        pytest.skip("time.tzset() indisponível nesta plataforma")
+    anterior = os.environ.get("TZ")
+    os.environ["TZ"] = "<-03>3"  # UTC-3 (como America/Fortaleza), sem depender do tzdata
+    time.tzset()
+    yield
+    if anterior is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = anterior
+    time.tzset()
+
+
+# -------------------------
+# TESTES
+# -------------------------
+def test_salvar_produto_registra_saldo_e_ajustes(banco):
+    p = _produto(10)
+    p.estoque = 7
+    db.salvar_produto(p)
+    db.salvar_produto(p)  # sem mudança: nenhum movimento
+
+    movimentos = db.listar_movimentos_estoque(p.sku)
+    assert [(m.delta, m.motivo) for m in movimentos] == [(10, "AJUSTE"), (-3, "AJUSTE")]
+
+
+def test_movimentos_somam_na_coluna_materializada(banco):
+    p = _produto(10)
+    db.registrar_movimentos_estoque(
+        [
+            db.MovimentoEstoque(p.sku, -4, db.MOTIVO_VENDA, pedido_id=1),
+            db.MovimentoEstoque(p.sku, 2, db.MOTIVO_ESTORNO, pedido_id=1),
+        ]
+    )
+    assert _estoque(p) == 8
+
+
+def test_copias_em_memoria_nao_se_sobrescrevem(banco):
+    p = _produto(10)
+    copia_a = db.buscar_produto_por_sku(p.sku)
+    copia_b = db.buscar_produto_por_sku(p.sku)
+
+    for copia, delta in ((copia_a, -3), (copia_b, -5)):
+        db.registrar_movimentos_estoque([db.MovimentoEstoque(copia.sku, delta, db.MOTIVO_AJUSTE)])
+
+    assert _estoque(p) == 2
+
+
+def test_saldo_negativo_desfaz_o_lote_inteiro(banco):
+    p, q = _produto(5), _produto(5)
+    with pytest.raises(ValueError):
+        db.registrar_movimentos_estoque(
+            [
+                db.MovimentoEstoque(q.sku, -1, db.MOTIVO_AJUSTE),
+                db.MovimentoEstoque(p.sku, -6, db.MOTIVO_AJUSTE),
+            ]
+        )
+    assert (_estoque(p), _estoque(q)) == (5, 5)
+    assert len(db.listar_movimentos_estoque(q.sku)) == 1
+
+
+def test_movimento_invalido(banco):
+    p = _produto(5)
+    with pytest.raises(ValueError):
+        db.registrar_movimentos_estoque([db.MovimentoEstoque(p.sku, 0, db.MOTIVO_AJUSTE)])
+    with pytest.raises(TypeError):
+        db.registrar_movimentos_estoque([(p.sku, 1, db.MOTIVO_AJUSTE)])
+
+
+def test_livro_nao_aceita_update_nem_delete(banco):
+    _produto(5)
+    with db.connection() as conn:
+        with pytest.raises(sqlite3.DatabaseError):
+            conn.execute("UPDATE estoque_movimentos SET delta = 99")
+        with pytest.raises(sqlite3.DatabaseError):
+            conn.execute("DELETE FROM estoque_movimentos")
+
+
+def test_estoque_em_com_e_sem_checkpoint(banco):
+    p = _produto(0)
+    movimentos = [
+        db.MovimentoEstoque(p.sku, 10, db.MOTIVO_AJUSTE, ts=_instante(0)),
+        db.MovimentoEstoque(p.sku, -3, db.MOTIVO_VENDA, ts=_instante(10)),
+        db.MovimentoEstoque(p.sku, -2, db.MOTIVO_VENDA, ts=_instante(20)),
+    ]
+    db.registrar_movimentos_estoque(movimentos[:2])
+    esperado = {5: 10, 15: 7, 25: 5}
+
+    assert db.criar_checkpoints_estoque() == 1
+    db.registrar_movimentos_estoque(movimentos[2:])
+
+    for minuto, estoque in esperado.items():
+        assert db.estoque_em(p.sku, _instante(minuto)) == estoque
+    assert db.estoque_em(p.sku, _instante(0) - datetime.timedelta(days=1)) == 0
+
+    # a segunda rodada só cobre o que veio depois da primeira
+    assert db.criar_checkpoints_estoque() == 1
+    assert db.criar_checkpoints_estoque() == 0
+    for minuto, estoque in esperado.items():
+        assert db.estoque_em(p.sku, _instante(minuto)) == estoque
+
+
+def test_checkpoint_automatico(banco, monkeypatch):
+    monkeypatch.setattr(db, "INTERVALO_CHECKPOINT", 3)
+    p = _produto(0)  # saldo 0: nenhum movimento
+    db.registrar_movimentos_estoque(
+        db.MovimentoEstoque(p.sku, 1, db.MOTIVO_AJUSTE) for _ in range(3)
+    )
+    with db.connection() as conn:
+        linhas = conn.execute("SELECT estoque FROM estoque_checkpoints").fetchall()
+    assert [r[0] for r in linhas] == [3]
+
+
+def test_checkout_registra_venda(banco):
+    endereco = Endereco("60115000", "Fortaleza", "CE", "Rua A", "10", None)
+    cliente = Cliente("Pedro", "pedro@example.com", "12345678901", [endereco])
+    db.salvar_cliente(cliente)
+    p = _produto(5)
+    carrinho = Carrinho(cliente=cliente)
+    carrinho.adicionar_item(p, quantidade=2)
+
+    pedido = services.fechar_pedido(carrinho, cliente, persistir=True)
+
+    venda = db.listar_movimentos_estoque(p.sku)[-1]
+    assert (venda.delta, venda.motivo, venda.pedido_id) == (-2, "VENDA", pedido.id)
+    assert _estoque(p) == 3
+
+
+def test_migracao_abre_saldo_dos_produtos_existentes(tmp_path):
+    conn = sqlite3.connect(tmp_path / "antigo.db")
+    aplicar_migracoes(conn, [m for m in MIGRACOES if m.versao <= 3])
+    conn.execute(
+        "INSERT INTO produtos (sku, nome, categoria, preco, estoque, ativo) "
+        "VALUES (1, 'Caneca', 'CASA', 10.0, 4, 1)"
+    )
+    conn.commit()
+    aplicar_migracoes(conn)
+    assert conn.execute(
+        "SELECT sku, delta, motivo FROM estoque_movimentos"
+    ).fetchall() == [(1, 4, "SALDO_INICIAL")]
+    conn.close()
+
+
+def test_saldo_de_abertura_usa_o_relogio_local(tmp_path, monkeypatch, fuso_atras_do_utc):
+    caminho = tmp_path / "antigo.db"
+    conn = sqlite3.connect(caminho)
+    aplicar_migracoes(conn, [m for m in MIGRACOES if m.versao <= 3])
+    conn.execute(
+        "INSERT INTO produtos (sku, nome, categoria, preco, estoque, ativo) "
+        "VALUES (1, 'Caneca', 'CASA', 10.0, 4, 1)"
+    )
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(db, "DB_PATH", caminho)
+    db.init_db()
+    try:
+        db.registrar_movimentos_estoque([db.MovimentoEstoque(1, 4, db.MOTIVO_AJUSTE)])
+        assert db.buscar_produto_por_sku(1).estoque == 8
+        assert db.estoque_em(1, datetime.datetime.now()) == 8
+    finally:
+        db.fechar_pool()
+
+
+def test_migracao_marca_pedidos_com_venda_no_livro(tmp_path):
+    conn = sqlite3.connect(tmp_path / "antigo.db")
+    aplicar_migracoes(conn, [m for m in MIGRACOES if m.versao <= 5])
+    for pedido_id in (1, 2):
+        conn.execute(
+            "INSERT INTO pedidos (id, cliente_id, status, subtotal, descontos, valor_frete, "
+            "total, criado_em, endereco_entrega_json) "
+            "VALUES (?, 1, 'PAGO', 10, 0, 0, 10, '2025-01-01T00:00:00', 'null')",
+            (pedido_id,),
+        )
+    conn.execute(
+        "INSERT INTO estoque_movimentos (sku, delta, motivo, pedido_id, ts) "
+        "VALUES (1, -1, 'VENDA', 1, '2025-01-01T00:00:00.000000')"
+    )
+    conn.commit()
+    aplicar_migracoes(conn)
+    assert conn.execute(
+        "SELECT id, estoque_no_banco FROM pedidos ORDER BY id"
+    ).fetchall() == [(1, 1), (2, 0)]
+    conn.close()
+
+
+def test_ts_anterior_ao_ultimo_movimento_e_recusado(banco):
+    p = _produto(0)
+    db.registrar_movimentos_estoque([db.MovimentoEstoque(p.sku, 5, db.MOTIVO_AJUSTE, ts=_instante(30))])
+    with pytest.raises(ValueError):
+        db.registrar_movimentos_estoque(
+            [db.MovimentoEstoque(p.sku, 1, db.MOTIVO_AJUSTE, ts=_instante(10))]
+        )
+    assert _estoque(p) == 5
+
+
+def test_lote_com_sku_repetido_fecha_com_a_coluna(banco):
+    p = _produto(10)
+    cinco = Produto.from_row({"sku": p.sku, "nome": "Caneca", "categoria": "CASA",
+                              "preco": 50.0, "estoque": 5, "ativo": 1})
+    sete = Produto.from_row({"sku": p.sku, "nome": "Caneca", "categoria": "CASA",
+                             "preco": 50.0, "estoque": 7, "ativo": 1})
+
+    db.salvar_produtos_em_lote([cinco, sete])
+
+    assert _estoque(p) == 7
+    assert sum(m.delta for m in db.listar_movimentos_estoque(p.sku)) == 7
+    assert db.estoque_em(p.sku, datetime.datetime.now()) == 7
@@ -0,0 +1,178 @@
+import json
+import os
+
+import pytest
+
+from loja import settings as configuracao
+from loja.src import frete
+from loja.src.frete import Frete, TabelaFrete
+
+
+def _escrever(caminho, tabela, default=(30.0, 10), mtime_ns=None):
+    caminho.write_text(json.dumps({
+        "frete": {
+            "uf_origem": "CE",
+            "tabela_por_uf": {uf: {"valor": v, "prazo": p} for uf, (v, p) in tabela.items()},
+            "default": {"valor": default[0], "prazo": default[1]},
+        }
+    }), encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(caminho, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    caminho = tmp_path / "settings.json"
+    _escrever(caminho, {"CE": (10.0, 3), "SP": (25.0, 7)}, mtime_ns=1_000_000_000)
+    monkeypatch.setattr(configuracao, "SETTINGS_PATH", caminho)
+    monkeypatch.setattr(configuracao, "INTERVALO_VERIFICACAO", 0.0)
+    return caminho
+
+
+def test_tabela_compilada_e_imutavel(settings):
+    tabela = frete.tabela_frete()
+    assert isinstance(tabela, TabelaFrete)
+    assert tabela.cotar("SP") == (25.0, 7)
+    assert tabela.cotar("XX") == (30.0, 10)
+    with pytest.raises(TypeError):
+        tabela.por_uf["SP"] = (0.0, 0)
+
+
+def test_from_uf_destino_usa_tabela(settings):
+    f = Frete.from_uf_destino(" sp ")
+    assert (f.uf_origem, f.uf_destino, f.valor, f.prazo_dias) == ("CE", "SP", 25.0, 7)
+    padrao = Frete.from_uf_destino("AM")
+    assert (padrao.valor, padrao.prazo_dias) == (30.0, 10)
+
+
+def test_recarrega_quando_mtime_muda(settings):
+    antiga = frete.tabela_frete()
+    recargas = frete.metricas_settings().recargas
+
+    _escrever(settings, {"SP": (40.0, 9)}, mtime_ns=2_000_000_000)
+
+    assert Frete.from_uf_destino("SP").valor == 40.0
+    assert frete.metricas_settings().recargas == recargas + 1
+    assert frete.metricas_settings().mtime_ns == 2_000_000_000
+    # quem guardou a tabela antiga continua com ela inteira
+    assert antiga.cotar("SP") == (25.0, 7)
+
+
+def test_sem_mudanca_nao_reler(settings):
+    frete.tabela_frete()
+    recargas = frete.metricas_settings().recargas
+    for _ in range(10):
+        frete.tabela_frete()
+    assert frete.metricas_settings().recargas == recargas
+
+
+def test_json_invalido_mantem_tabela_anterior(settings):
+    frete.tabela_frete()
+    falhas = frete.metricas_settings().falhas
+
+    settings.write_text("{ invalido", encoding="utf-8")
+    os.utime(settings, ns=(3_000_000_000, 3_000_000_000))
+
+    assert Frete.from_uf_destino("SP").valor == 25.0
+    assert frete.metricas_settings().falhas == falhas + 1
+
+    _escrever(settings, {"SP": (50.0, 9)}, mtime_ns=4_000_000_000)
+    assert Frete.from_uf_destino("SP").valor == 50.0
+
+
+def test_json_invalido_sem_tabela_anterior_falha(tmp_path, monkeypatch):
+    caminho = tmp_path / "settings.json"
+    caminho.write_text("{ invalido", encoding="utf-8")
+    monkeypatch.setattr(configuracao, "SETTINGS_PATH", caminho)
+    with pytest.raises(ValueError):
+        frete.tabela_frete()
+
+
+def test_arquivo_inexistente(tmp_path, monkeypatch):
+    monkeypatch.setattr(configuracao, "SETTINGS_PATH", tmp_path / "nao_existe.json")
+    with pytest.raises(FileNotFoundError):
+        frete.carregar_settings()
+
+
+def test_intervalo_evita_stat(settings, monkeypatch):
+    frete.tabela_frete()
+    monkeypatch.setattr(configuracao, "INTERVALO_VERIFICACAO", 3600.0)
+    frete.recarregar_settings()  # agenda a próxima conferência para daqui a 1h
+
+    verificacoes = frete.metricas_settings().verificacoes
+    _escrever(settings, {"SP": (99.0, 1)}, mtime_ns=5_000_000_000)
+    for _ in range(100):
+        assert frete.tabela_frete().cotar("SP") == (25.0, 7)
+    assert frete.metricas_settings().verificacoes == verificacoes
+
+    assert frete.recarregar_settings().cotar("SP") == (99.0, 1)
+
+
+# ===================== FAIXAS DE CEP =====================
+
+from loja.src.endereco import Endereco
+from loja.src.frete import compilar_faixas_cep
+
+
+@pytest.fixture
+def faixas(tmp_path, monkeypatch, settings):
+    caminho = tmp_path / "faixas_cep.csv"
+    caminho.write_text(
+        "cep_inicio,cep_fim,uf,valor,prazo\n"
+        "60000000,60999999,CE,8.50,2\n"
+        "01000000,05999999,SP,19.90,5\n"
+        "61000000,61999999,CE,12.00,4\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(frete, "FAIXAS_CEP_PATH", caminho)
+    return caminho
+
+
+def test_from_cep_dentro_das_faixas(faixas):
+    f = Frete.from_cep("60115000")
+    assert (f.uf_destino, f.valor, f.prazo_dias) == ("CE", 8.5, 2)
+    assert f.faixa_cep == ("60000000", "60999999")
+
+    assert Frete.from_cep("01000000").valor == 19.9   # início da faixa
+    assert Frete.from_cep("05999999").valor == 19.9   # fim da faixa
+    assert Frete.from_cep("61000000").valor == 12.0
+
+
+def test_from_cep_fora_das_faixas_usa_uf(faixas):
+    f = Frete.from_cep("30130000", uf_destino="SP")
+    assert (f.valor, f.prazo_dias, f.faixa_cep) == (25.0, 7, None)
+    with pytest.raises(ValueError):
+        Frete.from_cep("30130000")
+
+
+def test_from_cep_valida_como_endereco(faixas):
+    with pytest.raises(TypeError):
+        Frete.from_cep(60115000)
+    with pytest.raises(ValueError):
+        Frete.from_cep("60115-000")
+
+
+def test_from_endereco_e_sem_arquivo(faixas, monkeypatch, tmp_path):
+    endereco = Endereco("60115000", "Fortaleza", "CE", "Rua A", "10", None)
+    assert Frete.from_endereco(endereco).valor == 8.5
+
+    monkeypatch.setattr(frete, "FAIXAS_CEP_PATH", tmp_path / "nao_existe.csv")
+    assert len(frete.tabela_faixas_cep()) == 0
+    assert Frete.from_endereco(endereco).valor == 10.0  # tabela por UF
+
+
+def test_faixas_sobrepostas_sao_erro():
+    with pytest.raises(ValueError):
+        compilar_faixas_cep([
+            {"cep_inicio": "01000000", "cep_fim": "01999999", "uf": "SP", "valor": "1", "prazo": "1"},
+            {"cep_inicio": "01500000", "cep_fim": "02999999", "uf": "SP", "valor": "1", "prazo": "1"},
+        ])
+
+
+def test_faixas_recarregam_quando_arquivo_muda(faixas):
+    assert Frete.from_cep("60115000").valor == 8.5
+    faixas.write_text(
+        "cep_inicio,cep_fim,uf,valor,prazo\n60000000,60999999,CE,9.00,2\n", encoding="utf-8"
+    )
+    os.utime(faixas, ns=(6_000_000_000, 6_000_000_000))
+    assert Frete.from_cep("60115000").valor == 9.0
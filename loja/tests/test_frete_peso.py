@@ -0,0 +1,259 @@
+import json
+import os
+
+import pytest
+
+from loja import services
+from loja import settings as configuracao
+from loja.src import frete
+from loja.src.carrinho import Carrinho
+from loja.src.cliente import Cliente
+from loja.src.endereco import Endereco
+from loja.src.frete_peso import MotorFrete
+from loja.src.item_pedido import ItemPedido
+from loja.src.produto_digital import ProdutoDigital
+from loja.src.produto_fisico import ProdutoFisico
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    caminho = tmp_path / "settings.json"
+    caminho.write_text(json.dumps({
+        "frete": {
+            "uf_origem": "CE",
+            "tabela_por_uf": {"SP": {"valor": 20.0, "prazo": 7}},
+            "default": {"valor": 30.0, "prazo": 10},
+            "fator_cubagem": 6000,
+            "faixas_peso": {
+                "limites_kg": [1, 5, 10],
+                "multiplicadores": [1.0, 1.5, 2.0],
+                "adicional_por_kg": 0.1,
+            },
+        }
+    }), encoding="utf-8")
+    monkeypatch.setattr(configuracao, "SETTINGS_PATH", caminho)
+    monkeypatch.setattr(configuracao, "INTERVALO_VERIFICACAO", 0.0)
+    return caminho
+
+
+def _fisico(peso, a=10.0, l=10.0, p=10.0):
+    return ProdutoFisico("Caixa", "CASA", 50.0, 100, True, peso, a, l, p)
+
+
+def _digital():
+    return ProdutoDigital("Ebook", "LIVROS", 30.0, 100, True, "https://x/y")
+
+
+def test_peso_real_e_cubico():
+    motor = MotorFrete()
+    leve_e_grande = _fisico(0.5, 60.0, 50.0, 40.0)   # 120000 cm³ / 6000 = 20 kg
+    assert motor.peso_envio(leve_e_grande) == (0.5, 20.0)
+    assert motor.peso_envio(_digital()) == (0.0, 0.0)
+
+
+def test_itens_digitais_nao_pesam(settings):
+    motor = MotorFrete()
+    carrinho = Carrinho(cliente=None)
+    carrinho.adicionar_item(_digital(), quantidade=3)
+    f = motor.cotar(carrinho.itens, "SP")
+    assert (f.valor, f.prazo_dias) == (0.0, 0)
+
+    carrinho.adicionar_item(_fisico(2.0), quantidade=1)
+    assert motor.peso_taxavel(carrinho.itens) == 2.0
+    assert motor.cotar(carrinho.itens, "SP").valor == 30.0   # 20 * 1.5
+
+
+def test_faixas_por_uf_e_excedente(settings):
+    motor = MotorFrete()
+    itens = [ItemPedido("1", "Caixa", 1, 50.0, produto=_fisico(0.8))]
+    assert motor.cotar(itens, "sp").valor == 20.0
+    assert motor.cotar(itens, "AM").valor == 30.0            # padrão
+
+    pesados = [ItemPedido("2", "Caixa", 2, 50.0, produto=_fisico(5.6))]  # 11.2 kg
+    assert motor.cotar(pesados, "SP").valor == 44.0          # 40 + 2 kg (1,2 -> 2) * 2.0
+
+
+def test_cache_por_uf_e_faixa(settings):
+    motor = MotorFrete()
+    a = [ItemPedido("1", "A", 1, 10.0, produto=_fisico(2.0))]
+    b = [ItemPedido("2", "B", 1, 10.0, produto=_fisico(4.5))]
+    motor.cotar(a, "SP")
+    motor.cotar(b, "SP")   # mesma faixa (1-5 kg)
+    motor.cotar(b, "RJ")
+    assert (motor.faltas_cache, motor.acertos_cache) == (2, 1)
+
+
+def test_atualizar_produto_refaz_peso(settings):
+    motor = MotorFrete()
+    produto = _fisico(0.5)
+    itens = [ItemPedido("1", "A", 1, 10.0, produto=produto)]
+    assert motor.cotar(itens, "SP").valor == 20.0
+
+    produto.peso = 3.0
+    motor.atualizar_produto(produto)
+    assert motor.cotar(itens, "SP").valor == 30.0
+
+
+def test_recarga_do_settings_limpa_caches(settings):
+    motor = MotorFrete()
+    itens = [ItemPedido("1", "A", 1, 10.0, produto=_fisico(0.5))]
+    assert motor.cotar(itens, "SP").valor == 20.0
+
+    dados = json.loads(settings.read_text(encoding="utf-8"))
+    dados["frete"]["tabela_por_uf"]["SP"]["valor"] = 22.0
+    settings.write_text(json.dumps(dados), encoding="utf-8")
+    os.utime(settings, ns=(7_000_000_000, 7_000_000_000))
+    assert motor.cotar(itens, "SP").valor == 22.0
+
+
+def test_sem_faixas_de_peso_usa_valor_fixo(tmp_path, monkeypatch):
+    caminho = tmp_path / "settings.json"
+    caminho.write_text(json.dumps({
+        "frete": {"tabela_por_uf": {"SP": {"valor": 20.0, "prazo": 7}}}
+    }), encoding="utf-8")
+    monkeypatch.setattr(configuracao, "SETTINGS_PATH", caminho)
+    itens = [ItemPedido("1", "A", 3, 10.0, produto=_fisico(9.0))]
+    assert MotorFrete().cotar(itens, "SP").valor == 20.0
+
+
+# ===================== MÚLTIPLAS ORIGENS =====================
+
+from loja.src.frete import Frete
+from loja.src.frete_peso import CRITERIO_PRAZO
+
+
+@pytest.fixture
+def origens(tmp_path, monkeypatch):
+    caminho = tmp_path / "settings.json"
+    caminho.write_text(json.dumps({
+        "frete": {
+            "uf_origem": "CE",
+            "tabela_por_uf": {"SP": {"valor": 25.0, "prazo": 7}, "CE": {"valor": 10.0, "prazo": 3}},
+            "default": {"valor": 30.0, "prazo": 10},
+            "faixas_peso": {"limites_kg": [1, 5], "multiplicadores": [1.0, 2.0]},
+            "origens_adicionais": {
+                "SP": {
+                    "tabela_por_uf": {"SP": {"valor": 12.0, "prazo": 2}, "RJ": {"valor": 16.0, "prazo": 3}},
+                    "default": {"valor": 32.0, "prazo": 9},
+                },
+                "MG": {
+                    "tabela_por_uf": {"SP": {"valor": 11.0, "prazo": 4}},
+                    "default": {"valor": 28.0, "prazo": 8},
+                },
+            },
+        }
+    }), encoding="utf-8")
+    monkeypatch.setattr(configuracao, "SETTINGS_PATH", caminho)
+    monkeypatch.setattr(configuracao, "INTERVALO_VERIFICACAO", 0.0)
+    return caminho
+
+
+def _itens(*pesos):
+    return [
+        ItemPedido(str(i), "Caixa", 1, 10.0, produto=_fisico(peso)) for i, peso in enumerate(pesos)
+    ]
+
+
+def test_matriz_precompilada(origens):
+    tabela = frete.tabela_frete()
+    assert [o.uf_origem for o in tabela.origens] == ["CE", "SP", "MG"]
+    assert tabela.cotar_origens("SP") == ((25.0, 7), (12.0, 2), (11.0, 4))
+    assert tabela.cotar_origens("RJ") == ((30.0, 10), (16.0, 3), (28.0, 8))
+    assert tabela.cotar_origens("AM") == ((30.0, 10), (32.0, 9), (28.0, 8))
+    assert Frete.from_uf_destino("SP", uf_origem="sp").valor == 12.0
+    with pytest.raises(ValueError):
+        Frete.from_uf_destino("SP", uf_origem="RS")
+
+
+def test_melhor_origem_por_preco_e_prazo(origens):
+    motor = MotorFrete()
+    itens = _itens(0.5)
+    barato = motor.cotar_melhor_origem(itens, "SP")
+    assert (barato.uf_origem, barato.valor, barato.prazo_dias) == ("MG", 11.0, 4)
+    rapido = motor.cotar_melhor_origem(itens, "SP", criterio=CRITERIO_PRAZO)
+    assert (rapido.uf_origem, rapido.valor, rapido.prazo_dias) == ("SP", 12.0, 2)
+
+    # faixas de peso herdadas valem sobre o valor de cada origem
+    assert motor.cotar_melhor_origem(_itens(3.0), "SP").valor == 22.0
+
+
+def test_melhor_origem_respeita_estoque(origens):
+    motor = MotorFrete()
+    itens = _itens(0.5, 0.5)   # skus "0" e "1"
+    estoques = {"CE": {"0": 5, "1": 5}, "SP": {"0": 5, "1": 5}, "MG": {"0": 5}}
+    escolhido = motor.cotar_melhor_origem(itens, "SP", estoques=estoques)
+    assert escolhido.uf_origem == "SP"
+
+    with pytest.raises(ValueError):
+        motor.cotar_melhor_origem(itens, "SP", estoques={"MG": {"0": 1}})
+
+
+def test_melhor_origem_ignora_digitais(origens):
+    motor = MotorFrete()
+    itens = _itens(0.5) + [ItemPedido("D", "Ebook", 1, 30.0, produto=_digital())]
+    escolhido = motor.cotar_melhor_origem(itens, "SP", estoques={"MG": {"0": 1}})
+    assert escolhido.uf_origem == "MG"
+
+
+def test_checkout_cobra_frete_pelo_peso(settings, monkeypatch):
+    monkeypatch.setattr(services, "MOTOR_FRETE", MotorFrete())
+    endereco = Endereco("01310000", "São Paulo", "SP", "Av. Paulista", "1000", None)
+    cliente = Cliente("Pedro", "pedro@example.com", "12345678901", [endereco])
+
+    def frete_de(*itens):
+        carrinho = Carrinho(cliente=cliente)
+        for produto, quantidade in itens:
+            carrinho.adicionar_item(produto, quantidade=quantidade)
+        return services.fechar_pedido(carrinho, cliente).valor_frete
+
+    assert frete_de((_digital(), 2)) == 0.0
+    assert frete_de((_fisico(0.5), 1)) == 20.0                     # faixa de 1 kg
+    assert frete_de((_fisico(2.0), 1)) == 30.0                     # 20 * 1.5
+    assert frete_de((_fisico(20.0), 8)) == round(40.0 + 150 * 2.0, 2)  # 160 kg
+
+
+def test_checkout_sai_da_melhor_origem(origens, monkeypatch):
+    monkeypatch.setattr(services, "MOTOR_FRETE", MotorFrete())
+    endereco = Endereco("01310000", "São Paulo", "SP", "Av. Paulista", "1000", None)
+    cliente = Cliente("Pedro", "pedro@example.com", "12345678901", [endereco])
+    caixa = _fisico(0.5)
+    carrinho = Carrinho(cliente=cliente)
+    carrinho.adicionar_item(caixa, quantidade=1)
+
+    pedido = services.fechar_pedido(carrinho, cliente)
+    assert (pedido.frete.uf_origem, pedido.valor_frete) == ("MG", 11.0)
+
+    # MG sem estoque da caixa: a próxima mais barata é SP
+    estoques = {"MG": {}, "SP": {str(caixa.sku): 5}, "CE": {str(caixa.sku): 5}}
+    carrinho = Carrinho(cliente=cliente)
+    carrinho.adicionar_item(caixa, quantidade=1)
+    pedido = services.fechar_pedido(carrinho, cliente, estoques_por_origem=estoques)
+    assert (pedido.frete.uf_origem, pedido.valor_frete) == ("SP", 12.0)
+
+
+def test_checkout_usa_a_faixa_de_cep_da_transportadora(settings, monkeypatch, tmp_path):
+    faixas = tmp_path / "faixas_cep.csv"
+    faixas.write_text(
+        "cep_inicio,cep_fim,uf,valor,prazo\n"
+        "01000000,05999999,SP,10.00,3\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(frete, "FAIXAS_CEP_PATH", faixas)
+    monkeypatch.setattr(services, "MOTOR_FRETE", MotorFrete())
+
+    def pedido_para(cep):
+        endereco = Endereco(cep, "São Paulo", "SP", "Av. Paulista", "1000", None)
+        cliente = Cliente("Pedro", "pedro@example.com", "12345678901", [endereco])
+        carrinho = Carrinho(cliente=cliente)
+        carrinho.adicionar_item(_fisico(2.0), quantidade=1)
+        return services.fechar_pedido(carrinho, cliente)
+
+    # dentro da faixa: base 10.00 (e não os 20.00 da UF), escalada pelo peso
+    dentro = pedido_para("01310000")
+    assert (dentro.valor_frete, dentro.frete.prazo_dias) == (15.0, 3)   # 10 * 1.5
+    assert dentro.frete.faixa_cep == ("01000000", "05999999")
+
+    # fora de toda faixa: tabela por UF
+    fora = pedido_para("08000000")
+    assert (fora.valor_frete, fora.frete.prazo_dias) == (30.0, 7)       # 20 * 1.5
+    assert fora.frete.faixa_cep is None
@@ -0,0 +1,97 @@
+from datetime import date, datetime
+
+import pytest
+
+from loja.src.cliente import Cliente
+from loja.src.cupom import Cupom
+from loja.src.item_pedido import ItemPedido
+from loja.src.pedido import Pedido
+from loja.src.produto import Produto
+
+
+# -------------------------
+# FIXTURES
+# -------------------------
+@pytest.fixture
+def cliente():
+    return Cliente.from_row(
+        {"id": 7, "nome": "Pedro", "email": "pedro@example.com", "cpf": "12345678901"}
+    )
+
+
+@pytest.fixture
+def cupom():
+    return Cupom.from_row({
+        "codigo": "DEZ",
+        "tipo": "VALOR",
+        "valor": 10,
+        "data_validade": "2030-12-31",
+        "uso_maximo": 5,
+        "usos_realizados": 5,
+        "categorias_elegiveis": '["LIVROS"]',
+    })
+
+
+@pytest.fixture
+def linha_pedido():
+    return {
+        "id": 42,
+        "status": Pedido.STATUS_ENVIADO,
+        "subtotal": 100.0,
+        "descontos": 10.0,
+        "valor_frete": 15.0,
+        "total": 105.0,
+        "criado_em": "2025-03-01T10:00:00",
+        "pago_em": "2025-03-01T11:00:00",
+        "enviado_em": "2025-03-02T09:00:00",
+        "entregue_em": None,
+        "cancelado_em": None,
+        "codigo_rastreio": "ABC123",
+        "endereco_entrega_json": '{"uf": "CE"}',
+    }
+
+
+# -------------------------
+# TESTES
+# -------------------------
+def test_produto_from_row_mantem_sku():
+    produto = Produto.from_row(
+        {"sku": 99, "nome": "Caneta", "categoria": "PAPELARIA",
+         "preco": 3, "estoque": 0, "ativo": 1}
+    )
+    assert produto.sku == 99
+    assert produto.preco == 3.0
+    assert produto.ativo is True
+    assert produto.estoque == 0
+
+
+def test_cliente_from_row(cliente):
+    assert cliente.id == 7
+    assert cliente.email == "pedro@example.com"
+    assert cliente.enderecos == []
+
+
+def test_cupom_from_row(cupom):
+    assert cupom.data_validade == date(2030, 12, 31)
+    assert cupom.categorias_elegiveis == ["LIVROS"]
+    assert cupom.usos_realizados == 5
+
+
+def test_pedido_from_row_nao_recalcula_nem_reaplica_cupom(cliente, cupom, linha_pedido):
+    itens = [ItemPedido("1", "Livro", 2, 50.0)]
+    # o cupom já está no limite: reaplicar chamaria registrar_uso() e falharia
+    pedido = Pedido.from_row(linha_pedido, cliente, itens, cupom)
+
+    assert pedido.id == 42
+    assert pedido.cliente is cliente
+    assert pedido.cupom is cupom
+    assert cupom.usos_realizados == 5
+    assert pedido.status == Pedido.STATUS_ENVIADO
+    assert (pedido.subtotal, pedido.descontos, pedido.valor_frete, pedido.total) == (
+        100.0, 10.0, 15.0, 105.0
+    )
+    assert pedido.criado_em == datetime(2025, 3, 1, 10, 0, 0)
+    assert pedido.entregue_em is None
+    assert pedido.codigo_rastreio == "ABC123"
+    assert pedido.endereco_entrega == {"uf": "CE"}
+    assert pedido.pagamentos == []
@@ -0,0 +1,95 @@
+import os
+import threading
+
+import pytest
+
+from loja.src.gerador_id import MAX_NO, GeradorId, arrendar_no, decompor_id, gerar_id
+from loja.src.produto import Produto
+from loja.src.carrinho import Carrinho
+
+
+# -------------------------
+# TESTES: GeradorId
+# -------------------------
+def test_ids_crescentes_e_unicos():
+    gerador = GeradorId(no=7)
+    ids = [gerador.proximo() for _ in range(20000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_id_cabe_em_inteiro_do_sqlite():
+    assert 0 < gerar_id() < 2 ** 63
+
+
+def test_decompor_id():
+    gerador = GeradorId(no=42)
+    ts, no, seq = decompor_id(gerador.proximo())
+    assert no == 42
+    assert seq == 0
+    assert ts > 1735689600000
+
+
+def test_nos_diferentes_nunca_colidem():
+    a, b = GeradorId(no=1), GeradorId(no=2)
+    ids_a = {a.proximo() for _ in range(5000)}
+    ids_b = {b.proximo() for _ in range(5000)}
+    assert not ids_a & ids_b
+
+
+def test_varias_threads_sem_colisao():
+    gerador = GeradorId(no=3)
+    resultados = [[] for _ in range(8)]
+
+    def gerar(lista):
+        for _ in range(5000):
+            lista.append(gerador.proximo())
+
+    threads = [threading.Thread(target=gerar, args=(lista,)) for lista in resultados]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    todos = [i for lista in resultados for i in lista]
+    assert len(set(todos)) == len(todos)
+    assert all(lista == sorted(lista) for lista in resultados)
+
+
+def test_no_invalido():
+    with pytest.raises(ValueError):
+        GeradorId(no=MAX_NO + 1)
+
+
+def test_node_id_por_variavel_de_ambiente(monkeypatch):
+    monkeypatch.setenv("LOJA_NODE_ID", "5")
+    assert GeradorId().no == 5
+
+
+def test_arrendamento_nao_repete_no_ocupado(tmp_path):
+    no_a, fd_a = arrendar_no(str(tmp_path))
+    no_b, fd_b = arrendar_no(str(tmp_path))
+    assert no_a != no_b
+
+    os.close(fd_a)
+    no_c, fd_c = arrendar_no(str(tmp_path))
+    assert no_c == no_a
+    os.close(fd_b)
+    os.close(fd_c)
+
+
+def test_processo_mantem_o_no_arrendado(monkeypatch):
+    monkeypatch.delenv("LOJA_NODE_ID", raising=False)
+    assert GeradorId().no == GeradorId().no
+
+
+# -------------------------
+# TESTES: entidades
+# -------------------------
+def test_entidades_usam_ids_unicos_e_ordenados():
+    produtos = [Produto(f"P{i}", "GERAL", 1.0, 1) for i in range(2000)]
+    skus = [p.sku for p in produtos]
+    assert len(set(skus)) == len(skus)
+    assert skus == sorted(skus)
+
+    assert Carrinho(cliente=None).id < Carrinho(cliente=None).id
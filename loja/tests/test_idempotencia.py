@@ -0,0 +1,196 @@
+import threading
+import time
+
+import pytest
+
+from loja import services
+from loja.persistence import db
+from loja.src.carrinho import Carrinho
+from loja.src.cliente import Cliente
+from loja.src.cupom import Cupom
+from loja.src.endereco import Endereco
+from loja.src.idempotencia import CacheIdempotencia
+from loja.src.produto import Produto
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+# -------------------------
+# FIXTURES
+# -------------------------
+@pytest.fixture(autouse=True)
+def cache_novo(monkeypatch):
+    monkeypatch.setattr(services, "IDEMPOTENCIA", CacheIdempotencia())
+
+
+@pytest.fixture
+def cliente(banco):
+    endereco = Endereco("60115000", "Fortaleza", "CE", "Rua A", "10", None)
+    c = Cliente("Pedro", "pedro@example.com", "12345678901", [endereco])
+    db.salvar_cliente(c)
+    return c
+
+
+def _carrinho(cliente, produto, quantidade=1):
+    carrinho = Carrinho(cliente=cliente)
+    carrinho.adicionar_item(produto, quantidade=quantidade)
+    return carrinho
+
+
+def _estoque(produto):
+    return db.buscar_produto_por_sku(produto.sku).estoque
+
+
+# -------------------------
+# CACHE
+# -------------------------
+def test_repeticao_nao_executa_de_novo():
+    cache = CacheIdempotencia()
+    chamadas = []
+
+    def operacao():
+        chamadas.append(1)
+        return 42
+
+    assert cache.executar("k1", operacao) == (42, False)
+    assert cache.executar("k1", operacao) == (42, True)
+    assert len(chamadas) == 1
+    assert cache.metricas().acertos_cache == 1
+
+
+def test_falha_nao_fica_guardada():
+    cache = CacheIdempotencia()
+
+    def falhar():
+        raise ValueError("sem estoque")
+
+    with pytest.raises(ValueError):
+        cache.executar("k1", falhar)
+    assert cache.executar("k1", lambda: 7) == (7, False)
+
+
+def test_busca_duravel_quando_o_lru_falha():
+    cache = CacheIdempotencia(tamanho_cache=1)
+    cache.executar("a", lambda: 1)
+    cache.executar("b", lambda: 2)  # tira "a" do LRU
+
+    resultado = cache.executar("a", lambda: 99, buscar={"a": 1}.get)
+    assert resultado == (1, True)
+    assert cache.metricas().acertos_banco == 1
+
+
+def test_resultado_vence():
+    relogio = Relogio()
+    cache = CacheIdempotencia(validade=10, relogio=relogio)
+    cache.executar("k1", lambda: 1)
+    relogio.agora = 10
+    assert cache.executar("k1", lambda: 2) == (2, False)
+
+
+def test_mesma_chave_em_paralelo_espera_a_primeira():
+    cache = CacheIdempotencia()
+    execucoes = []
+
+    def operacao():
+        execucoes.append(1)
+        time.sleep(0.05)
+        return 5
+
+    resultados = []
+    threads = [
+        threading.Thread(target=lambda: resultados.append(cache.executar("k1", operacao)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(execucoes) == 1
+    assert sorted(resultados) == [(5, False)] + [(5, True)] * 7
+    assert cache.metricas().esperas >= 1
+
+
+def test_chave_invalida():
+    cache = CacheIdempotencia()
+    with pytest.raises(ValueError):
+        cache.executar("  ", lambda: 1)
+    with pytest.raises(TypeError):
+        cache.executar(123, lambda: 1)
+
+
+# -------------------------
+# CHECKOUT
+# -------------------------
+def test_checkout_repetido_devolve_o_pedido_original(cliente):
+    caneca = Produto("Caneca", "CASA", 50.0, 5)
+    db.salvar_produto(caneca)
+    cupom = Cupom("DEZ", "VALOR", 10.0, None, uso_maximo=5, usos_realizados=0)
+    db.salvar_cupom(cupom)
+
+    primeiro = services.fechar_pedido(
+        _carrinho(cliente, caneca, 2), cliente, cupom=cupom, persistir=True,
+        chave_idempotencia="req-1",
+    )
+    segundo = services.fechar_pedido(
+        _carrinho(cliente, caneca, 2), cliente, cupom=cupom, persistir=True,
+        chave_idempotencia="req-1",
+    )
+
+    assert segundo.id == primeiro.id
+    assert _estoque(caneca) == 3
+    assert cupom.usos_realizados == 1
+    assert db.buscar_cupom_por_codigo("DEZ").usos_realizados == 1
+
+
+def test_chave_sobrevive_ao_cache_em_memoria(cliente, monkeypatch):
+    caneca = Produto("Caneca", "CASA", 50.0, 5)
+    db.salvar_produto(caneca)
+    primeiro = services.fechar_pedido(
+        _carrinho(cliente, caneca), cliente, persistir=True, chave_idempotencia="req-2"
+    )
+
+    # processo novo: LRU vazio, a chave vem da tabela
+    monkeypatch.setattr(services, "IDEMPOTENCIA", CacheIdempotencia())
+    segundo = services.fechar_pedido(
+        _carrinho(cliente, caneca), cliente, persistir=True, chave_idempotencia="req-2"
+    )
+
+    assert segundo.id == primeiro.id
+    assert _estoque(caneca) == 4
+    assert len(db.listar_pedidos()) == 1
+
+
+def test_registrar_checkout_com_chave_usada_nao_grava(cliente):
+    caneca = Produto("Caneca", "CASA", 50.0, 5)
+    db.salvar_produto(caneca)
+    primeiro = services.fechar_pedido(_carrinho(cliente, caneca), cliente)
+    segundo = services.fechar_pedido(_carrinho(cliente, caneca), cliente)
+
+    assert db.registrar_checkout(primeiro, chave_idempotencia="req-3") == primeiro.id
+    assert db.registrar_checkout(segundo, chave_idempotencia="req-3") == primeiro.id
+    assert _estoque(caneca) == 4
+    assert db.buscar_pedido_da_chave("req-3") == primeiro.id
+
+
+def test_chaves_vencidas_sao_expurgadas(cliente, monkeypatch):
+    monkeypatch.setattr(db, "VALIDADE_CHAVE_IDEMPOTENCIA", -1)
+    caneca = Produto("Caneca", "CASA", 50.0, 5)
+    db.salvar_produto(caneca)
+    pedido = services.fechar_pedido(_carrinho(cliente, caneca), cliente)
+    db.registrar_checkout(pedido, chave_idempotencia="req-4")
+
+    assert db.buscar_pedido_da_chave("req-4") is None
+    assert db.expurgar_chaves_idempotencia() == 1
+
+
+def test_chave_sem_persistir(cliente):
+    caneca = Produto("Caneca", "CASA", 50.0, 5)
+    with pytest.raises(ValueError):
+        services.fechar_pedido(_carrinho(cliente, caneca), cliente, chave_idempotencia="req-5")
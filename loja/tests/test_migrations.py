@@ -0,0 +1,94 @@
+import sqlite3
+
+import pytest
+
+from loja.persistence import db
+from loja.persistence.migrations import (
+    MIGRACOES,
+    Migracao,
+    aplicar_migracoes,
+    plano_consulta,
+    verificar_planos,
+    versao_atual,
+)
+
+
+# -------------------------
+# FIXTURES
+# -------------------------
+@pytest.fixture
+def conn(tmp_path):
+    c = sqlite3.connect(tmp_path / "migracoes.db")
+    yield c
+    c.close()
+
+
+# -------------------------
+# TESTES: aplicar_migracoes
+# -------------------------
+def test_banco_novo_recebe_todas_as_migracoes(conn):
+    aplicadas = aplicar_migracoes(conn)
+    assert aplicadas == [m.versao for m in MIGRACOES]
+    assert versao_atual(conn) == MIGRACOES[-1].versao
+
+
+def test_aplicar_duas_vezes_nao_faz_nada(conn):
+    aplicar_migracoes(conn)
+    assert aplicar_migracoes(conn) == []
+
+
+def test_banco_antigo_sem_schema_version_recebe_indices(conn):
+    # banco criado pelo init_db antigo: tabelas existem, mas sem índices
+    conn.execute("CREATE TABLE pedidos (id INTEGER PRIMARY KEY, cliente_id INTEGER NOT NULL, "
+                 "status TEXT NOT NULL, subtotal REAL NOT NULL, descontos REAL NOT NULL, "
+                 "valor_frete REAL NOT NULL, total REAL NOT NULL, criado_em TEXT NOT NULL, "
+                 "pago_em TEXT, enviado_em TEXT, entregue_em TEXT, cancelado_em TEXT, "
+                 "codigo_rastreio TEXT, endereco_entrega_json TEXT NOT NULL, cupom_codigo TEXT)")
+    conn.execute("INSERT INTO pedidos VALUES (1, 1, 'PAGO', 10, 0, 0, 10, '2025-01-01T00:00:00', "
+                 "NULL, NULL, NULL, NULL, NULL, 'null', NULL)")
+    conn.commit()
+
+    aplicar_migracoes(conn)
+
+    indices = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_pedidos_status_criado_em" in indices
+    assert conn.execute("SELECT COUNT(*) FROM pedidos").fetchone()[0] == 1
+
+
+def test_migracao_com_erro_desfaz_tudo(conn):
+    migracoes = MIGRACOES + [
+        Migracao(99, "quebrada", ("CREATE TABLE nova (x INTEGER)", "SELEC errado")),
+    ]
+    with pytest.raises(sqlite3.OperationalError):
+        aplicar_migracoes(conn, migracoes)
+
+    assert versao_atual(conn) == 0
+    tabelas = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "nova" not in tabelas
+
+
+def test_versoes_fora_de_ordem_sao_rejeitadas(conn):
+    with pytest.raises(ValueError):
+        aplicar_migracoes(conn, [MIGRACOES[1], MIGRACOES[0]])
+
+
+# -------------------------
+# TESTES: planos de consulta
+# -------------------------
+def test_consultas_quentes_usam_indices(conn):
+    aplicar_migracoes(conn)
+    assert all(verificar_planos(conn).values()), verificar_planos(conn)
+
+
+def test_sem_indices_consulta_faz_scan(conn):
+    aplicar_migracoes(conn, MIGRACOES[:1])
+    plano = plano_consulta(conn, "SELECT id FROM pedidos WHERE status = ?", ("PAGO",))
+    assert any(linha.startswith("SCAN") for linha in plano)
+
+
+def test_init_db_aplica_migracoes(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "loja_teste.db")
+    db.init_db()
+    with db.connection() as c:
+        assert versao_atual(c) == MIGRACOES[-1].versao
+    db.fechar_pool()
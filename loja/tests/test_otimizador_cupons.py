@@ -0,0 +1,132 @@
+import random
+from datetime import date
+
+import pytest
+
+from loja.src.carrinho import Carrinho
+from loja.src.cupom import Cupom
+from loja.src.otimizador_cupons import OtimizadorCupons
+from loja.src.produto import Produto
+
+CATEGORIAS = ["LIVROS", "JOGOS", "PAPELARIA", "CASA"]
+TIPOS = [Cupom.TIPO_VALOR, Cupom.TIPO_PERCENTUAL, Cupom.TIPO_FRETE_GRATIS]
+
+
+def _carrinho(*itens):
+    carrinho = Carrinho(cliente=None)
+    for categoria, preco, qtd in itens:
+        carrinho.adicionar_item(Produto("Item", categoria, preco, 100), quantidade=qtd)
+    return carrinho
+
+
+def _forca_bruta(cupons, carrinho, valor_frete, hoje):
+    """Melhor desconto testando todos os cupons, um a um."""
+    categorias = {item.produto.categoria for item in carrinho.itens}
+    melhor = 0.0
+    for cupom in cupons:
+        categoria = None
+        if cupom.categorias_elegiveis:
+            comuns = categorias & set(cupom.categorias_elegiveis)
+            if not comuns:
+                continue
+            categoria = comuns.pop()
+        melhor = max(melhor, cupom.calcular_desconto(
+            carrinho.calcular_subtotal(), categoria, hoje, valor_frete
+        ))
+    return melhor
+
+
+# -------------------------
+# TESTES: escolha
+# -------------------------
+def test_escolhe_o_maior_desconto_entre_tipos():
+    cupons = [
+        Cupom("VALOR10", "VALOR", 10.0, None),
+        Cupom("PCT20", "PERCENTUAL", 20.0, None),
+        Cupom("FRETE", "FRETE_GRATIS", 0.0, None),
+    ]
+    otimizador = OtimizadorCupons(cupons)
+
+    assert otimizador.melhor_cupom(_carrinho(("CASA", 100.0, 1))).cupom.codigo == "PCT20"
+    assert otimizador.melhor_cupom(_carrinho(("CASA", 20.0, 1))).cupom.codigo == "VALOR10"
+    melhor = otimizador.melhor_cupom(_carrinho(("CASA", 20.0, 1)), valor_frete=30.0)
+    assert (melhor.cupom.codigo, melhor.desconto) == ("FRETE", 30.0)
+
+
+def test_ignora_invalidos_e_categorias_de_fora():
+    cupons = [
+        Cupom("VENCIDO", "VALOR", 90.0, date(2000, 1, 1)),
+        Cupom("ESGOTADO", "VALOR", 80.0, None, uso_maximo=1, usos_realizados=1),
+        Cupom("JOGOS", "VALOR", 70.0, None, categ_elegiveis=["JOGOS"]),
+        Cupom("LIVROS", "VALOR", 15.0, None, categ_elegiveis=["livros"]),
+        Cupom("GERAL", "VALOR", 5.0, None),
+    ]
+    otimizador = OtimizadorCupons(cupons)
+    melhor = otimizador.melhor_cupom(_carrinho(("LIVROS", 100.0, 1)))
+    assert (melhor.cupom.codigo, melhor.desconto) == ("LIVROS", 15.0)
+
+
+def test_sem_cupom_aplicavel():
+    otimizador = OtimizadorCupons([Cupom("JOGOS", "VALOR", 5.0, None, categ_elegiveis=["JOGOS"])])
+    assert otimizador.melhor_cupom(_carrinho(("CASA", 10.0, 1))) is None
+
+
+def test_igual_a_forca_bruta():
+    gerador = random.Random(99)
+    hoje = date.today()
+    cupons = []
+    for i in range(400):
+        tipo = gerador.choice(TIPOS)
+        valor = gerador.choice([0.0, 5.0, 12.5, 30.0, 80.0]) if tipo == "FRETE_GRATIS" \
+            else round(gerador.uniform(1, 60), 2)
+        cupons.append(Cupom(
+            f"C{i}", tipo, valor, gerador.choice([None, date(2000, 1, 1)]),
+            uso_maximo=2, usos_realizados=gerador.randint(0, 2),
+            categ_elegiveis=gerador.sample(CATEGORIAS, gerador.randint(0, 2)),
+        ))
+    otimizador = OtimizadorCupons(cupons)
+
+    for _ in range(300):
+        itens = [
+            (gerador.choice(CATEGORIAS), round(gerador.uniform(1, 200), 2), gerador.randint(1, 3))
+            for _ in range(gerador.randint(1, 4))
+        ]
+        carrinho = _carrinho(*itens)
+        frete = gerador.choice([0.0, 10.0, 35.0])
+
+        melhor = otimizador.melhor_cupom(carrinho, valor_frete=frete, data_referencia=hoje)
+        esperado = _forca_bruta(cupons, carrinho, frete, hoje)
+        assert (melhor.desconto if melhor else 0.0) == esperado
+
+
+# -------------------------
+# TESTES: cache
+# -------------------------
+def test_cache_por_carrinho():
+    otimizador = OtimizadorCupons([Cupom("VALOR10", "VALOR", 10.0, None)])
+    carrinho = _carrinho(("CASA", 50.0, 1))
+
+    otimizador.melhor_cupom(carrinho)
+    otimizador.melhor_cupom(carrinho)
+    assert (otimizador.acertos_cache, otimizador.faltas_cache) == (1, 1)
+
+    # conteúdo mudou: chave nova
+    carrinho.alterar_quantidade(carrinho.itens[0].produto.sku, 2)
+    otimizador.melhor_cupom(carrinho)
+    assert otimizador.faltas_cache == 2
+
+
+def test_cache_descarta_cupom_que_esgotou():
+    unico = Cupom("UNICO", "VALOR", 20.0, None, uso_maximo=1)
+    reserva = Cupom("RESERVA", "VALOR", 5.0, None)
+    otimizador = OtimizadorCupons([unico, reserva])
+    carrinho = _carrinho(("CASA", 50.0, 1))
+
+    assert otimizador.melhor_cupom(carrinho).cupom is unico
+    unico.registrar_uso()
+    assert otimizador.melhor_cupom(carrinho).cupom is reserva
+
+
+def test_tamanho_cache_invalido():
+    with pytest.raises(ValueError):
+        OtimizadorCupons([], tamanho_cache=-1)
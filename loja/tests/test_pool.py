@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from loja.persistence import db
+from loja.persistence.pool import ConnectionPool
+
+
+# -------------------------
+# FIXTURES
+# -------------------------
+@pytest.fixture
+def pool(tmp_path):
+    p = ConnectionPool(tmp_path / "pool.db", tamanho_maximo=2, timeout=0.2)
+    yield p
+    p.close_all()
+
+
+# -------------------------
+# TESTES: checkout / devolução
+# -------------------------
+def test_conexao_devolvida_e_reutilizada(pool):
+    conn1 = pool.acquire()
+    conn1.close()
+    conn2 = pool.acquire()
+    assert conn2 is conn1
+    conn2.close()
+
+    metricas = pool.metrics()
+    assert metricas.checkouts == 2
+    assert metricas.criadas == 1
+    assert metricas.ociosas == 1
+
+
+def test_context_manager_devolve_conexao(pool):
+    with pool.connection() as conn:
+        assert pool.metrics().em_uso == 1
+        conn.execute("SELECT 1")
+    assert pool.metrics().em_uso == 0
+
+
+def test_fechar_duas_vezes_nao_duplica_conexao(pool):
+    conn = pool.acquire()
+    conn.close()
+    conn.close()
+    assert pool.metrics().ociosas == 1
+
+
+def test_transacao_pendente_e_desfeita_ao_devolver(pool):
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+        # sem commit
+
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+# -------------------------
+# TESTES: limite e esperas
+# -------------------------
+def test_pool_esgotado_dispara_timeout(pool):
+    c1 = pool.acquire()
+    c2 = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    assert pool.metrics().esperas == 1
+    c1.close()
+    c2.close()
+
+
+def test_espera_ate_conexao_ser_devolvida(pool):
+    c1 = pool.acquire()
+    c2 = pool.acquire()
+    resultado = []
+
+    def pegar():
+        with pool.connection() as conn:
+            resultado.append(conn)
+
+    t = threading.Thread(target=pegar)
+    t.start()
+    while pool.metrics().esperas == 0:
+        time.sleep(0.001)
+    c1.close()
+    t.join(timeout=1)
+
+    assert resultado == [c1]
+    assert pool.metrics().esperas == 1
+    assert pool.metrics().tamanho == 2
+    c2.close()
+
+
+def test_tamanho_maximo_invalido(tmp_path):
+    with pytest.raises(ValueError):
+        ConnectionPool(tmp_path / "x.db", tamanho_maximo=0)
+
+
+# -------------------------
+# TESTES: integração com db.py
+# -------------------------
+def test_get_connection_usa_pool(banco):
+    antes = db.pool_metrics()
+    for _ in range(10):
+        conn = db.get_connection()
+        conn.execute("SELECT 1")
+        conn.close()
+    depois = db.pool_metrics()
+
+    assert depois.checkouts - antes.checkouts == 10
+    assert depois.criadas == antes.criadas
+
+
+def test_pool_recriado_quando_db_path_muda(banco, tmp_path, monkeypatch):
+    pool_antigo = db.get_pool()
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "outro.db")
+    assert db.get_pool() is not pool_antigo
@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+from loja.persistence import db, pragmas
+from loja.src.produto import Produto
+
+
+# -------------------------
+# TESTES: perfis
+# -------------------------
+def test_perfis_definem_todos_os_pragmas():
+    chaves = set(pragmas.PERFIS_PRAGMA["oltp"])
+    for perfil in pragmas.PERFIS_PRAGMA.values():
+        assert set(perfil) == chaves
+
+
+def test_conexao_padrao_usa_wal(banco):
+    with db.connection() as conn:
+        valores = pragmas.ler_pragmas(conn)
+    assert valores["journal_mode"] == "wal"
+    assert valores["synchronous"] == 1  # NORMAL
+    assert valores["busy_timeout"] == 5000
+    assert valores["query_only"] == 0
+
+
+def test_troca_de_perfil_na_mesma_conexao(banco):
+    with db.connection(perfil="bulk_load") as conn:
+        assert pragmas.ler_pragmas(conn)["synchronous"] == 0  # OFF
+        primeira = conn
+
+    with db.connection() as conn:
+        assert conn is primeira
+        assert pragmas.ler_pragmas(conn)["synchronous"] == 1
+
+
+def test_perfil_readonly_bloqueia_escrita(banco):
+    with db.connection(perfil="readonly_reports") as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM produtos")
+
+    # a conexão volta a aceitar escrita no perfil padrão
+    db.salvar_produto(Produto("Caneta", "ESCRITORIO", 2.5, 10))
+
+
+def test_perfil_invalido(banco):
+    with pytest.raises(ValueError):
+        db.get_connection(perfil="turbo")
+    assert db.pool_metrics().em_uso == 0
+
+
+def test_perfil_lido_do_settings(monkeypatch):
+    monkeypatch.setattr(pragmas, "carregar_settings", lambda: {"banco": {"perfil_pragma": "bulk_load"}})
+    assert pragmas.perfil_configurado() == "bulk_load"
+
+    monkeypatch.setattr(pragmas, "carregar_settings", lambda: {})
+    assert pragmas.perfil_configurado() == pragmas.PERFIL_PADRAO
+
+
+def test_carga_em_lote_usa_perfil_bulk(banco, monkeypatch):
+    perfis = []
+    original = db.get_connection
+
+    def espiao(perfil=None):
+        perfis.append(perfil)
+        return original(perfil)
+
+    monkeypatch.setattr(db, "get_connection", espiao)
+    db.salvar_produtos_em_lote([Produto("Caneta", "ESCRITORIO", 2.5, 10)])
+    assert perfis == ["bulk_load"]
@@ -0,0 +1,144 @@
+import random
+from datetime import date
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from loja.src.cliente import Cliente
+from loja.src.cupom import Cupom
+from loja.src.frete import Frete
+from loja.src.item_pedido import ItemPedido
+from loja.src.pedido import Pedido
+from loja.src.precificacao_lote import _arredondar_2, precificar_lote
+from loja.src.produto import Produto
+
+UFS = ["CE", "SP", "AM", "RS", "XX", None]
+CATEGORIAS = ["LIVROS", "JOGOS", "PAPELARIA", None]
+
+
+# -------------------------
+# FIXTURES
+# -------------------------
+@pytest.fixture
+def cliente():
+    return Cliente("Pedro", "pedro@example.com", "12345678901")
+
+
+@pytest.fixture
+def cupons():
+    ilimitado = 10 ** 9
+    return [
+        Cupom("VALOR5", "VALOR", 5.0, None, uso_maximo=ilimitado),
+        Cupom("VALOR500", "VALOR", 500.0, None, uso_maximo=ilimitado),
+        Cupom("PCT15", "PERCENTUAL", 15.0, None, uso_maximo=ilimitado),
+        Cupom("PCT33", "PERCENTUAL", 33.3, None, uso_maximo=ilimitado),
+        Cupom("FRETE0", "FRETE_GRATIS", 0.0, None, uso_maximo=ilimitado),
+        Cupom("FRETE12", "FRETE_GRATIS", 12.0, None, uso_maximo=ilimitado),
+        Cupom("VENCIDO", "VALOR", 5.0, date(2000, 1, 1), uso_maximo=ilimitado),
+        Cupom("ESGOTADO", "VALOR", 5.0, None, uso_maximo=1, usos_realizados=1),
+        Cupom("LIVROS", "PERCENTUAL", 10.0, None, uso_maximo=ilimitado,
+              categ_elegiveis=["LIVROS"]),
+        Cupom("JOGOS", "VALOR", 20.0, None, uso_maximo=ilimitado,
+              categ_elegiveis=["jogos", "Papelaria "]),
+    ]
+
+
+# -------------------------
+# TESTES: diferencial contra o caminho escalar
+# -------------------------
+def test_lote_identico_ao_caminho_escalar(cliente, cupons):
+    gerador = random.Random(1234)
+    pedido_por_item, quantidades, precos = [], [], []
+    ufs, cupom_por_pedido, mascaras = [], [], []
+    esperados = []
+
+    for i in range(2000):
+        itens = []
+        for _ in range(gerador.randint(1, 6)):
+            qtd = gerador.randint(1, 20)
+            preco = round(gerador.uniform(0.01, 300.0), gerador.choice([2, 3, 7]))
+            categoria = gerador.choice(CATEGORIAS)
+            produto = Produto("Item", categoria, preco, 1) if categoria else None
+            itens.append(ItemPedido(str(i), "Item", qtd, preco, produto=produto))
+            pedido_por_item.append(i)
+            quantidades.append(qtd)
+            precos.append(preco)
+
+        uf = gerador.choice(UFS)
+        idx = gerador.randint(-1, len(cupons) - 1)
+        ufs.append(uf)
+        cupom_por_pedido.append(idx)
+
+        pedido = Pedido(
+            cliente=cliente,
+            itens=itens,
+            frete=Frete.from_uf_destino(uf) if uf else None,
+            cupom=cupons[idx] if idx >= 0 else None,
+        )
+        esperados.append((pedido.subtotal, pedido.descontos, pedido.valor_frete, pedido.total))
+        mascaras.append(pedido.mascara_categorias)
+
+    resultado = precificar_lote(
+        pedido_por_item, quantidades, precos, ufs, cupom_por_pedido, cupons,
+        mascara_por_pedido=mascaras,
+    )
+
+    obtidos = list(zip(
+        resultado.subtotal.tolist(),
+        resultado.descontos.tolist(),
+        resultado.valor_frete.tolist(),
+        resultado.total.tolist(),
+    ))
+    assert obtidos == esperados
+
+
+def test_arredondamento_igual_ao_round_do_python():
+    valores = [1.005, 2.675, 0.285, 1.115, 5.015, 1234567.125, 0.125, -2.675, 1e17]
+    gerador = random.Random(7)
+    valores += [gerador.uniform(0, 10_000) for _ in range(10_000)]
+    valores += [k / 1000 for k in range(0, 100_000, 5)]
+
+    obtidos = _arredondar_2(np.array(valores)).tolist()
+    assert obtidos == [round(v, 2) for v in valores]
+
+
+def test_cupom_com_categoria_exige_mascara_do_pedido(cupons):
+    cupom_livros = cupons.index(next(c for c in cupons if c.codigo == "LIVROS"))
+    livros = Pedido(
+        cliente=Cliente("Ana", "ana@example.com", "10987654321"),
+        itens=[ItemPedido("1", "Livro", 1, 100.0, produto=Produto("Livro", "livros", 100.0, 1))],
+    ).mascara_categorias
+
+    sem_mascara = precificar_lote([0], [1], [100.0], [None], [cupom_livros], cupons)
+    com_mascara = precificar_lote(
+        [0], [1], [100.0], [None], [cupom_livros], cupons, mascara_por_pedido=[livros]
+    )
+    assert sem_mascara.descontos.tolist() == [0.0]
+    assert com_mascara.descontos.tolist() == [10.0]
+
+
+def test_lote_nao_registra_uso_dos_cupons(cupons):
+    cupom = cupons[0]
+    usos = cupom.usos_realizados
+    resultado = precificar_lote([0, 1], [1, 1], [50.0, 50.0], ["CE", "CE"], [0, 0], cupons)
+    assert resultado.descontos.tolist() == [5.0, 5.0]
+    assert cupom.usos_realizados == usos
+
+
+# -------------------------
+# TESTES: validação de entrada
+# -------------------------
+def test_colunas_de_tamanhos_diferentes():
+    with pytest.raises(ValueError):
+        precificar_lote([0, 0], [1], [10.0], ["CE"])
+
+
+def test_indice_de_pedido_fora_do_intervalo():
+    with pytest.raises(ValueError):
+        precificar_lote([1], [1], [10.0], ["CE"])
+
+
+def test_indice_de_cupom_fora_do_intervalo(cupons):
+    with pytest.raises(ValueError):
+        precificar_lote([0], [1], [10.0], ["CE"], [len(cupons)], cupons)
@@ -0,0 +1,173 @@
+import threading
+
+import pytest
+
+from loja.src.carrinho import Carrinho
+from loja.src.cliente import Cliente
+from loja.src.cupom import Cupom
+from loja.src.pedido import Pedido
+from loja.src.produto import Produto
+from loja.src.reservas import LivroReservas
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio():
+    return Relogio()
+
+
+@pytest.fixture
+def livro(relogio):
+    return LivroReservas(ttl=60.0, relogio=relogio)
+
+
+@pytest.fixture
+def cliente():
+    return Cliente("Pedro", "pedro@example.com", "12345678901")
+
+
+def test_disponivel_desconta_reservas(livro):
+    produto = Produto("Caneca", "CASA", 50.0, 10)
+    livro.reservar(produto, 3, dono=1)
+    livro.reservar(produto, 4, dono=2)
+    assert livro.disponivel(produto) == 3
+
+    livro.reservar(produto, 1, dono=1)   # substitui a reserva do dono 1
+    assert livro.disponivel(produto) == 5
+
+
+def test_conflito_nao_altera_nada(livro):
+    produto = Produto("Caneca", "CASA", 50.0, 5)
+    livro.reservar(produto, 4, dono=1)
+    with pytest.raises(ValueError, match="available 1"):
+        livro.reservar(produto, 2, dono=2)
+    assert livro.disponivel(produto) == 1
+    assert livro.metricas().conflitos == 1
+
+
+def test_reservas_vencidas_sao_liberadas(livro, relogio):
+    produto = Produto("Caneca", "CASA", 50.0, 5)
+    livro.reservar(produto, 2, dono=1)
+    relogio.agora += 30
+    livro.reservar(produto, 2, dono=2)
+
+    relogio.agora += 31   # dono 1 venceu, dono 2 não
+    assert livro.disponivel(produto) == 3
+    relogio.agora += 30
+    assert livro.disponivel(produto) == 5
+    assert livro.metricas().expiradas == 2
+
+
+def test_renovar_reserva_ignora_validade_antiga(livro, relogio):
+    produto = Produto("Caneca", "CASA", 50.0, 5)
+    livro.reservar(produto, 2, dono=1)
+    relogio.agora += 50
+    livro.reservar(produto, 2, dono=1)   # renova
+    relogio.agora += 20                  # a validade antiga já passou
+    assert livro.disponivel(produto) == 3
+    assert livro.metricas().expiradas == 0
+
+
+def test_renovacoes_nao_incham_o_heap(livro, relogio):
+    produto = Produto("Caneca", "CASA", 50.0, 5)
+    outro = Produto("Livro", "LIVROS", 30.0, 5)
+    livro.reservar(outro, 1, dono=2)
+    for _ in range(1000):
+        livro.reservar(produto, 2, dono=1)
+        relogio.agora += 0.01
+
+    metricas = livro.metricas()
+    assert metricas.ativas == 2
+    assert metricas.entradas_heap <= 2 * metricas.ativas
+    relogio.agora += 60   # as duas vencem mesmo depois de o heap ser refeito
+    assert livro.disponivel(produto) == 5
+    assert livro.metricas().expiradas == 2
+
+
+def test_carrinho_reserva_e_libera(livro, cliente):
+    produto = Produto("Caneca", "CASA", 50.0, 5)
+    carrinho = Carrinho(cliente, reservas=livro)
+    carrinho.adicionar_item(produto, quantidade=2)
+    carrinho.adicionar_item(produto, quantidade=1)
+    assert livro.disponivel(produto) == 2
+
+    outro = Carrinho(cliente, reservas=livro)
+    with pytest.raises(ValueError):
+        outro.adicionar_item(produto, quantidade=3)
+    assert len(outro) == 0
+
+    carrinho.alterar_quantidade(produto.sku, 1)
+    assert livro.disponivel(produto) == 4
+    carrinho.remover_item(produto.sku)
+    assert livro.disponivel(produto) == 5
+
+
+def test_pedido_herda_reserva_do_carrinho(livro, cliente, relogio):
+    produto = Produto("Caneca", "CASA", 50.0, 5)
+    carrinho = Carrinho(cliente, reservas=livro)
+    carrinho.adicionar_item(produto, quantidade=5)
+
+    pedido = Pedido.criar_de_carrinho(carrinho)
+    assert livro.reservas_de(carrinho.id) == []
+    assert [r.quantidade for r in livro.reservas_de(pedido.id)] == [5]
+
+    relogio.agora += 61   # a reserva do pedido dura mais que a do carrinho
+    assert livro.disponivel(produto) == 0
+
+    pedido.cancelar()
+    assert livro.disponivel(produto) == 5
+
+
+def test_reserva_recusada_nao_gasta_cupom(livro, cliente):
+    produto = Produto("Caneca", "CASA", 50.0, 5)
+    livro.reservar(produto, 4, dono=1)
+    carrinho = Carrinho(cliente)
+    carrinho.adicionar_item(produto, quantidade=3)
+    cupom = Cupom("DEZ", "VALOR", 10.0, None, uso_maximo=5, usos_realizados=0)
+
+    with pytest.raises(ValueError):
+        Pedido.criar_de_carrinho(carrinho, cupom=cupom, reservas=livro)
+    assert cupom.usos_realizados == 0
+
+
+def test_pagamento_troca_reserva_por_baixa(livro, cliente):
+    produto = Produto("Caneca", "CASA", 50.0, 5)
+    carrinho = Carrinho(cliente, reservas=livro)
+    carrinho.adicionar_item(produto, quantidade=2)
+    pedido = Pedido.criar_de_carrinho(carrinho)
+
+    pedido._baixar_estoque()   # o que acontece quando o pedido vira PAGO
+    assert produto.estoque == 3
+    assert livro.disponivel(produto) == 3
+
+
+def test_reservas_concorrentes_nao_passam_do_estoque(cliente):
+    livro = LivroReservas(ttl=60.0)
+    produto = Produto("Caneca", "CASA", 50.0, 50)
+    aceitas = []
+
+    def comprar(dono):
+        for i in range(20):
+            try:
+                livro.reservar(produto, 1, dono=dono * 100 + i)
+                aceitas.append(1)
+            except ValueError:
+                pass
+
+    threads = [threading.Thread(target=comprar, args=(t,)) for t in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(aceitas) == 50
+    assert livro.disponivel(produto) == 0
+    metricas = livro.metricas()
+    assert (metricas.reservas, metricas.conflitos, metricas.ativas) == (50, 110, 50)
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from loja.persistence import db
+from loja.src.cupom import Cupom
+
+
+# -------------------------
+# FIXTURES
+# -------------------------
+@pytest.fixture
+def cupom(banco):
+    c = Cupom("DEZ", "VALOR", 10.0, None, uso_maximo=3, usos_realizados=0)
+    db.salvar_cupom(c)
+    return c
+
+
+def _usos(codigo):
+    return db.buscar_cupom_por_codigo(codigo).usos_realizados
+
+
+# -------------------------
+# TESTES: resgate
+# -------------------------
+def test_resgata_ate_o_limite(cupom):
+    assert [db.resgatar_cupom("dez ") for _ in range(5)] == [True, True, True, False, False]
+    assert _usos("DEZ") == 3
+
+
+def test_cupom_inexistente(banco):
+    assert db.resgatar_cupom("NAOEXISTE") is False
+
+
+def test_devolver_uso_nao_fica_negativo(cupom):
+    assert db.resgatar_cupom("DEZ")
+    assert db.devolver_uso_cupom("DEZ")
+    assert not db.devolver_uso_cupom("DEZ")
+    assert _usos("DEZ") == 0
+
+
+def test_resgate_na_transacao_do_chamador_desfeito_no_rollback(cupom):
+    with db.connection() as conn:
+        assert db.resgatar_cupom("DEZ", conn=conn)
+        conn.rollback()
+    assert _usos("DEZ") == 0
+
+
+def test_context_manager_devolve_uso_se_checkout_falhar(cupom):
+    with pytest.raises(RuntimeError):
+        with db.resgate_de_cupom("DEZ") as resgatado:
+            assert resgatado
+            raise RuntimeError("falha no pagamento")
+    assert _usos("DEZ") == 0
+
+    with db.resgate_de_cupom("DEZ") as resgatado:
+        assert resgatado
+    assert _usos("DEZ") == 1
+
+
+def test_salvar_cupom_desatualizado_nao_apaga_resgates(cupom):
+    db.resgatar_cupom("DEZ")
+    db.resgatar_cupom("DEZ")
+    db.salvar_cupom(cupom)  # objeto em memória ainda com usos_realizados=0
+    assert _usos("DEZ") == 2
+
+
+# -------------------------
+# TESTES: concorrência
+# -------------------------
+def test_varias_threads_nunca_passam_do_limite(banco):
+    db.salvar_cupom(Cupom("CORRIDA", "VALOR", 5.0, None, uso_maximo=50))
+    sucessos = []
+    inicio = threading.Barrier(8)
+
+    def resgatar():
+        inicio.wait()
+        for _ in range(20):
+            if db.resgatar_cupom("CORRIDA"):
+                sucessos.append(1)
+
+    threads = [threading.Thread(target=resgatar) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(sucessos) == 50
+    assert _usos("CORRIDA") == 50
@@ -0,0 +1,93 @@
+import json
+import pickle
+
+import pytest
+
+from loja.persistence import db
+from loja.src.cliente import Cliente
+from loja.src.endereco import Endereco
+from loja.src.item_carrinho import ItemCarrinho
+from loja.src.item_pedido import ItemPedido
+from loja.src.pedido import Pedido
+from loja.src.produto import Produto
+from loja.src.produto_digital import ProdutoDigital
+from loja.src.produto_fisico import ProdutoFisico
+
+
+# -------------------------
+# FIXTURES
+# -------------------------
+@pytest.fixture
+def endereco():
+    return Endereco("63000000", "Juazeiro do Norte", "CE", "Rua A", "123", None)
+
+
+@pytest.fixture
+def pedido(endereco):
+    return Pedido(
+        cliente=Cliente("Pedro", "pedro@example.com", "12345678901"),
+        itens=[ItemPedido("1", "Caneta", 2, 3.5)],
+        endereco_entrega=endereco,
+    )
+
+
+@pytest.fixture
+def objetos(endereco, pedido):
+    produto = Produto("Caneta", "PAPELARIA", 3.5, 10)
+    return [
+        produto,
+        ProdutoFisico("Livro", "LIVROS", 50.0, 5, True, 0.5, 20.0, 14.0, 3.0),
+        ProdutoDigital("Ebook", "LIVROS", 30.0, 99, True, "https://example.com/ebook"),
+        ItemCarrinho(produto, 2, produto.preco),
+        ItemPedido("1", "Caneta", 2, 3.5),
+        endereco,
+        pedido,
+    ]
+
+
+# -------------------------
+# TESTES: layout
+# -------------------------
+def test_objetos_nao_tem_dict(objetos):
+    for obj in objetos:
+        assert not hasattr(obj, "__dict__"), type(obj).__name__
+        with pytest.raises(AttributeError):
+            obj.atributo_inexistente = 1
+
+
+def test_validacao_continua_nos_setters():
+    fisico = ProdutoFisico("Livro", "LIVROS", 50.0, 5, True, 0.5, 20.0, 14.0, 3.0)
+    with pytest.raises(ValueError):
+        fisico.preco = 0
+    with pytest.raises(TypeError):
+        fisico.peso = "leve"
+    assert fisico.calcular_cubagem() == 20.0 * 14.0 * 3.0
+
+
+# -------------------------
+# TESTES: pickle
+# -------------------------
+def test_pickle_preserva_estado(objetos):
+    for obj in objetos:
+        dados = pickle.dumps(obj)
+        copia = pickle.loads(dados)
+        assert type(copia) is type(obj)
+        assert pickle.dumps(copia) == dados
+
+
+def test_pickle_pedido(pedido):
+    copia = pickle.loads(pickle.dumps(pedido))
+    assert copia.id == pedido.id
+    assert copia.total == pedido.total
+    assert copia.endereco_entrega.cep == "63000000"
+
+
+# -------------------------
+# TESTES: persistência do endereço
+# -------------------------
+def test_endereco_serializado_com_as_mesmas_chaves(pedido, endereco):
+    endereco_json = db._params_pedido(pedido)[13]
+    dados = json.loads(endereco_json)
+    assert dados["_Endereco__cep"] == "63000000"
+    assert dados["_Endereco__id"] == endereco.id
+    assert dados["_Endereco__complemento"] is None